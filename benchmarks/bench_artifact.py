@@ -0,0 +1,159 @@
+"""Loading a trained pipeline: joblib pickle versus model artifact
+
+Fits the logistic regression and gradient boosting pipelines of the model
+search (largest grid point, no early stopping, ``--trees`` trees) and
+saves each as a joblib pickle and as an artifact (src/models/artifact.py).
+Every load runs in a fresh interpreter, as at pod start:
+
+- joblib: ``joblib.load`` + ``compile_pipeline`` (what the API did)
+- artifact: ``load_artifact`` with the checksum verified, memory-mapped
+- artifact (no verify): memory-mapped without reading the whole file
+
+and reports the file size, the time to import what loading needs, the load
+time itself and the process RSS afterwards. The scores of all loaders are
+compared on a sample.
+
+Usage: python benchmarks/bench_artifact.py [--trees 200] [--repeat 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, "tests"))
+
+from conftest import make_credit_frame
+
+LOADERS = {
+    "joblib": """
+import joblib
+from src.models.compiled import compile_pipeline
+""", "artifact": """
+from src.models.artifact import load_artifact
+""", "artifact (no verify)": """
+from src.models.artifact import load_artifact
+""",
+}
+LOAD = {
+    "joblib": "model = compile_pipeline(joblib.load(path))",
+    "artifact": "model = load_artifact(path)",
+    "artifact (no verify)": "model = load_artifact(path, verify=False)",
+}
+
+PROBE = """
+import json, sys, time
+import numpy as np
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        line = next(line for line in f if line.startswith("VmRSS:"))
+        return int(line.split()[1]) / 1024
+
+path, sample = sys.argv[1], np.load(sys.argv[2])
+start = time.perf_counter()
+{imports}
+imported = time.perf_counter()
+{load}
+loaded = time.perf_counter()
+print(json.dumps({{"import_s": imported - start,
+                   "load_s": loaded - imported, "rss_mb": rss_mb(),
+                   "scores": model.predict_proba(sample).tolist()}}))
+"""
+
+
+def fit_pipelines(n_rows, trees):
+    from sklearn.pipeline import Pipeline
+
+    from src.models.search import default_specs
+
+    frame = make_credit_frame(n_rows)
+    X, y = frame.drop(columns="DEFAULT"), frame["DEFAULT"]
+    pipelines = {}
+    for spec in default_specs(["logistic_regression", "gradient_boosting"]):
+        classifier = spec.classifier
+        if spec.name == "gradient_boosting":
+            classifier.set_params(
+                n_estimators=trees, max_depth=4, n_iter_no_change=None
+            )
+        pipelines[spec.name] = Pipeline(
+            [
+                ("preprocessor", spec.preprocessor(X)),
+                ("classifier", classifier),
+            ]
+        ).fit(X, y)
+    return pipelines, X.to_numpy(dtype=np.float64)[:256]
+
+
+def probe(loader, path, sample_path):
+    script = PROBE.format(imports=LOADERS[loader].strip(), load=LOAD[loader])
+    env = dict(os.environ, PYTHONPATH=ROOT_DIR)
+    output = subprocess.run(
+        [sys.executable, "-c", script, path, sample_path],
+        cwd=ROOT_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--trees", type=int, default=200)
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    import joblib
+
+    from src.models.artifact import save_artifact
+
+    pipelines, sample = fit_pipelines(args.rows, args.trees)
+    print(
+        f"{'model':<20} {'format':<21} {'size':>9} {'import ms':>10} "
+        f"{'load ms':>9} {'RSS':>9} {'max diff':>9}"
+    )
+    with tempfile.TemporaryDirectory() as root:
+        sample_path = os.path.join(root, "sample.npy")
+        np.save(sample_path, sample)
+        for name, pipeline in pipelines.items():
+            paths = {"joblib": os.path.join(root, f"{name}.pkl")}
+            joblib.dump(pipeline, paths["joblib"])
+            paths["artifact"] = paths["artifact (no verify)"] = os.path.join(
+                root, f"{name}.artifact"
+            )
+            save_artifact(pipeline, paths["artifact"])
+
+            reference = None
+            for loader, path in paths.items():
+                runs = [
+                    probe(loader, path, sample_path)
+                    for _ in range(args.repeat)
+                ]
+                scores = np.asarray(runs[0]["scores"])
+                reference = scores if reference is None else reference
+                size_kb = os.path.getsize(path) / 1024
+                import_ms, load_ms, rss = (
+                    statistics.median(run[key] for run in runs)
+                    for key in ("import_s", "load_s", "rss_mb")
+                )
+                print(
+                    f"{name:<20} {loader:<21} {size_kb:7.0f}KB "
+                    f"{import_ms * 1e3:10.1f} {load_ms * 1e3:9.2f} "
+                    f"{rss:7.1f}MB {np.abs(scores - reference).max():9.1e}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Responsiveness of the services while inference is saturated
+
+Starts a service with uvicorn (see load_test.py), keeps ``--concurrency``
+clients sending 500-row /predict/batch requests back to back and, at the
+same time, polls /health at 20 Hz. Reports the batch throughput, how many
+batch requests were refused with 429/503 and the /health latency; the
+run is repeated for each ``INFERENCE_EXECUTOR`` kind and queue depth.
+
+Usage: python benchmarks/bench_backpressure.py [--target api] [--duration 10]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import load_test
+
+BATCH_ROWS = 500
+
+
+def batch_requests(target, n_features):
+    scenarios = load_test.build_scenarios(target, n_features)
+    rows = load_test.BATCH_ROWS
+    chunks = BATCH_ROWS // rows
+    requests = []
+    for start in range(0, 64, chunks):
+        group = scenarios["batch_json"][start:start + chunks]
+        instances = [
+            row for _, kwargs in group for row in kwargs["json"]["instances"]
+        ]
+        requests.append(("/predict/batch", {"json": {"instances": instances}}))
+    return requests
+
+
+async def measure(server, requests, concurrency, duration):
+    import httpx
+
+    async with httpx.AsyncClient(
+        base_url=server.url,
+        timeout=60,
+        limits=httpx.Limits(max_connections=concurrency + 4),
+    ) as client:
+        await server.wait_ready(client)
+        statuses = {}
+        health = []
+        deadline = time.perf_counter() + duration
+
+        async def load(offset):
+            i = offset
+            while time.perf_counter() < deadline:
+                response = await client.post(
+                    requests[i % len(requests)][0],
+                    **requests[i % len(requests)][1],
+                )
+                statuses[response.status_code] = (
+                    statuses.get(response.status_code, 0) + 1
+                )
+                i += 1
+
+        async def probe():
+            while time.perf_counter() < deadline:
+                sent = time.perf_counter()
+                await client.get("/health")
+                health.append(time.perf_counter() - sent)
+                await asyncio.sleep(0.05)
+
+        await asyncio.gather(
+            probe(), *(load(offset) for offset in range(concurrency))
+        )
+    return statuses, np.asarray(health) * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--target", choices=sorted(load_test.TARGETS), default="api"
+    )
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--kinds", nargs="+", default=["thread", "process"])
+    parser.add_argument(
+        "--queue-depths", type=load_test._ints, default=[64, 2]
+    )
+    args = parser.parse_args()
+
+    n_features = None
+    if args.target == "onnx":
+        n_features = load_test.onnx_input_width(
+            os.getenv(
+                "MODEL_PATH",
+                os.path.join(load_test.ROOT_DIR, "credit_model.onnx"),
+            )
+        )
+    requests = batch_requests(args.target, n_features)
+    print(
+        f"{args.target}: {args.concurrency} clients x {BATCH_ROWS}-row "
+        f"batches, {os.cpu_count()} cores"
+    )
+    print(
+        f"{'executor':<9} {'queue':>5} {'batch/s':>8} "
+        f"{'200':>6} {'429':>6} {'503':>6} "
+        f"{'health p50':>11} {'health p99':>11} {'health max':>11}"
+    )
+    with tempfile.TemporaryDirectory() as root:
+        env = load_test.target_env(args.target, root)
+        for kind in args.kinds:
+            if args.target == "onnx" and kind == "process":
+                continue
+            for depth in args.queue_depths:
+                server = load_test.UvicornServer(
+                    args.target,
+                    dict(
+                        env,
+                        INFERENCE_EXECUTOR=kind,
+                        INFERENCE_QUEUE_DEPTH=str(depth),
+                        INFERENCE_WORKERS="1",
+                    ),
+                )
+                try:
+                    statuses, health = asyncio.run(measure(
+                        server, requests, args.concurrency, args.duration
+                    ))
+                finally:
+                    server.stop()
+                ok, busy, unavailable = (
+                    statuses.get(status, 0) for status in (200, 429, 503)
+                )
+                print(
+                    f"{kind:<9} {depth:>5} {ok / args.duration:8.1f} "
+                    f"{ok:>6} {busy:>6} {unavailable:>6} "
+                    f"{np.percentile(health, 50):9.1f}ms "
+                    f"{np.percentile(health, 99):9.1f}ms "
+                    f"{health.max():9.1f}ms"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Cost of the derived behaviour features (src/features/behavior.py)
+
+Times derive_features alone at several batch sizes, then the compiled
+per-request scoring path (compile_pipeline, as the sklearn API serves it)
+of the same model family with and without the BehaviorFeatures step, and
+with a warm FeatureCache.
+
+Usage: python benchmarks/bench_behavior_features.py [--repeats 2000]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, "tests"))
+
+from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+
+from conftest import make_credit_frame
+from src.features.behavior import (
+    BehaviorFeatures,
+    FeatureCache,
+    derive_features,
+)
+from src.features.build_features import create_feature_pipeline
+from src.features.schema import FEATURE_COLUMNS
+from src.models.compiled import compile_pipeline
+
+BATCH_SIZES = (1, 32, 1000, 100_000)
+
+
+def median_us(fn, repeats):
+    fn()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1e6
+
+
+def fit(classifier, X, y, derived):
+    steps = [
+        ("preprocessor", create_feature_pipeline(X)),
+        ("classifier", classifier),
+    ]
+    if derived:
+        features = BehaviorFeatures()
+        steps = [
+            ("features", features),
+            (
+                "preprocessor",
+                create_feature_pipeline(features.fit_transform(X)),
+            ),
+            ("classifier", classifier),
+        ]
+    return Pipeline(steps).fit(X, y)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeats", type=int, default=2000)
+    args = parser.parse_args()
+
+    frame = make_credit_frame(max(BATCH_SIZES))
+    X, y = frame[FEATURE_COLUMNS], frame["DEFAULT"]
+    matrix = X.to_numpy(dtype=np.float64)
+
+    print("derive_features")
+    print(f"{'rows':>8} {'per call':>10} {'rows/s':>14}")
+    for batch_size in BATCH_SIZES:
+        batch = matrix[:batch_size]
+        repeats = max(5, args.repeats * 32 // max(batch_size, 32))
+        us = median_us(lambda: derive_features(batch), repeats)
+        print(f"{batch_size:>8,} {us:8.1f}us {batch_size / us * 1e6:14,.0f}")
+
+    print("\ncompiled predict_proba per request")
+    print(
+        f"{'model':<20} {'rows':>6} {'raw':>9} {'derived':>9} "
+        f"{'cached':>9} {'extra':>9}"
+    )
+    train = slice(0, 20_000)
+    classifiers = {
+        "logistic_regression": LogisticRegression(max_iter=1000),
+        "gradient_boosting": GradientBoostingClassifier(
+            n_estimators=100, max_depth=3, random_state=42
+        ),
+    }
+    for name, classifier in classifiers.items():
+        raw = compile_pipeline(
+            fit(classifier, X.iloc[train], y.iloc[train], derived=False)
+        )
+        pipeline = fit(classifier, X.iloc[train], y.iloc[train], derived=True)
+        derived = compile_pipeline(pipeline)
+        cached = compile_pipeline(pipeline, feature_cache=FeatureCache())
+        for batch_size in (1, 32, 1000):
+            batch = matrix[:batch_size]
+            repeats = max(20, args.repeats * 32 // max(batch_size, 32))
+            raw_us = median_us(lambda: raw.predict_proba(batch), repeats)
+            derived_us = median_us(
+                lambda: derived.predict_proba(batch), repeats
+            )
+            cached_us = median_us(lambda: cached.predict_proba(batch), repeats)
+            print(
+                f"{name:<20} {batch_size:>6,} {raw_us:7.1f}us "
+                f"{derived_us:7.1f}us {cached_us:7.1f}us "
+                f"{derived_us - raw_us:+7.1f}us"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Throughput of the bulk scoring CLI (src/models/score_model.py) by worker
+count
+
+Trains a small gradient boosting pipeline on synthetic data, writes a
+synthetic applicant file and scores it with 1, 2, 4, ... workers up to the
+number of cores.
+
+Usage: python benchmarks/bench_bulk_scoring.py [--rows 2000000]
+           [--format parquet]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+import joblib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests"
+    ),
+)
+
+from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.pipeline import Pipeline
+
+from conftest import make_credit_frame
+from src.features.build_features import create_feature_pipeline
+from src.models.score_model import score_file
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    parser.add_argument(
+        "--format", choices=("csv", "parquet"), default="parquet"
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        train = make_credit_frame(5_000)
+        X = train.drop(columns="DEFAULT")
+        pipeline = Pipeline(
+            [
+                ("preprocessor", create_feature_pipeline(X)),
+                (
+                    "classifier",
+                    GradientBoostingClassifier(
+                        n_estimators=100, max_depth=3, random_state=0
+                    ),
+                ),
+            ]
+        ).fit(X, train["DEFAULT"])
+        model_path = os.path.join(root, "model.pkl")
+        joblib.dump(pipeline, model_path)
+
+        applicants = make_credit_frame(args.rows, seed=1)
+        input_path = os.path.join(root, f"applicants.{args.format}")
+        if args.format == "csv":
+            applicants.to_csv(input_path, index=False)
+        else:
+            applicants.to_parquet(input_path, index=False)
+        size_mb = os.path.getsize(input_path) / 2**20
+        del applicants
+
+        cores = os.cpu_count() or 1
+        print(
+            f"{args.rows:,} rows, {size_mb:.0f} MiB {args.format}, "
+            f"{cores} cores\n"
+        )
+        baseline = None
+        workers = 1
+        while workers <= cores:
+            output = os.path.join(root, f"out-{workers}")
+            summary = score_file(
+                input_path, output, model_path,
+                workers=workers, chunksize=args.chunksize,
+            )
+            rate = summary["rows_per_second"]
+            baseline = baseline or rate
+            print(
+                f"workers={workers:<3} {rate:>12,} rows/s   "
+                f"speed-up x{rate / baseline:.2f}"
+            )
+            shutil.rmtree(output)
+            workers *= 2
+
+
+if __name__ == "__main__":
+    main()
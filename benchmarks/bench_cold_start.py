@@ -0,0 +1,138 @@
+"""Cold start of the serving entry points
+
+For each service, in fresh interpreters:
+
+- import: median wall time of ``import <module>``, the RSS afterwards,
+  the number of modules loaded and which heavy libraries came with them
+- ready: seconds from starting uvicorn until the readiness probe answers
+  200 (interpreter start, imports, model load and warm-up) and the RSS of
+  the server at that point
+
+The api target serves a small fitted pipeline (see load_test.py); src.api.app
+loads it at import time, so its import figures include unpickling it (and
+with it sklearn and pandas). tests/test_import_budget.py checks the import
+graphs without a model.
+
+Usage: python benchmarks/bench_cold_start.py [--repeat 5] [--targets onnx api]
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import load_test
+
+MODULES = {"onnx": "src.app", "api": "src.api.app"}
+
+# Libraries a serving process should only load when it needs them
+HEAVY = [
+    "pandas",
+    "sklearn",
+    "scipy",
+    "mlflow",
+    "matplotlib",
+    "onnx",
+    "skl2onnx",
+    "onnxruntime",
+    "pyarrow",
+]
+
+PROBE = """
+import importlib, json, sys, time
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+seconds = time.perf_counter() - start
+# VmRSS, not ru_maxrss: the peak survives exec and would be the parent's
+with open("/proc/self/status") as f:
+    rss = next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+print(json.dumps({"seconds": seconds, "rss_mb": rss / 1024,
+                  "modules": sorted(sys.modules)}))
+"""
+
+
+def probe_import(module, env):
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE, module],
+        cwd=load_test.ROOT_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def rss_mb(pid):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+async def time_to_ready(target, env):
+    import httpx
+
+    start = time.perf_counter()
+    server = load_test.UvicornServer(target, env)
+    try:
+        async with httpx.AsyncClient(
+            base_url=server.url, timeout=10
+        ) as client:
+            await server.wait_ready(client)
+        return time.perf_counter() - start, rss_mb(server.process.pid)
+    finally:
+        server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        "--targets", nargs="+", choices=sorted(MODULES), default=list(MODULES)
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(
+        f"{'target':<7} {'import s':>9} {'import RSS':>11} {'modules':>8} "
+        f"{'ready s':>8} {'ready RSS':>10}  heavy"
+    )
+    with tempfile.TemporaryDirectory() as root:
+        for target in args.targets:
+            env = dict(
+                load_test.target_env(target, root),
+                MLFLOW_DISABLE_AGENT_HINT="1",
+                PYTHONPATH=load_test.ROOT_DIR,
+            )
+            imports = [
+                probe_import(MODULES[target], env) for _ in range(args.repeat)
+            ]
+            ready = [
+                asyncio.run(time_to_ready(target, env))
+                for _ in range(args.repeat)
+            ]
+            modules = set(imports[-1]["modules"])
+            heavy = [name for name in HEAVY if name in modules]
+            import_s = np.median([run["seconds"] for run in imports])
+            import_mb = np.median([run["rss_mb"] for run in imports])
+            ready_s, ready_mb = np.median(ready, axis=0)
+            print(
+                f"{target:<7} {import_s:9.2f} {import_mb:9.1f}MB "
+                f"{len(modules):>8} {ready_s:8.2f} {ready_mb:8.1f}MB  "
+                f"{', '.join(heavy) or '-'}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""read_csv versus the compact Parquet data layer (src/data/dataset.py)
+
+Writes a synthetic processed CSV the size of the UCI training split (or
+larger with --rows) and times the ways the trainer and monitor can load it.
+
+Usage: python benchmarks/bench_data_loading.py [--rows 24000]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, "tests"))
+
+from conftest import make_credit_frame
+from src.data import dataset
+
+
+def timed(fn, repeats=5):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=24_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, "train.csv")
+        make_credit_frame(args.rows).to_csv(path, index=False)
+        size_mb = os.path.getsize(path) / 2**20
+        print(f"{args.rows:,} rows, CSV {size_mb:.1f} MiB\n")
+
+        csv_time, csv_frame = timed(lambda: pd.read_csv(path))
+        convert_time, _ = timed(lambda: dataset.convert(path), repeats=1)
+
+        def cold():
+            dataset.clear_cache()
+            return dataset.load_table(path)
+
+        parquet_time, parquet_frame = timed(cold)
+        columns_time, _ = timed(
+            lambda: (
+                dataset.clear_cache(),
+                dataset.load_table(path, ["AGE", "PAY_0"]),
+            )[1]
+        )
+        dataset.load_table(path)
+        cached_time, _ = timed(lambda: dataset.load_table(path), repeats=100)
+
+        print(f"{'pd.read_csv':<32}{csv_time * 1e3:>10.2f} ms")
+        print(
+            f"{'one-off CSV -> Parquet':<32}{convert_time * 1e3:>10.2f} ms  "
+            f"({os.path.getsize(dataset.parquet_path(path)) / 2**20:.1f} MiB)"
+        )
+        print(f"{'load_table, cold':<32}{parquet_time * 1e3:>10.2f} ms")
+        print(f"{'load_table, 2 columns':<32}{columns_time * 1e3:>10.2f} ms")
+        print(f"{'load_table, cached':<32}{cached_time * 1e3:>10.3f} ms")
+        csv_mb, compact_mb = (
+            frame.memory_usage(deep=True).sum() / 2**20
+            for frame in (csv_frame, parquet_frame)
+        )
+        print(
+            f"\nframe memory: read_csv {csv_mb:.1f} MiB, "
+            f"compact {compact_mb:.1f} MiB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Request-path cost of the in-process drift tap (src/serving/drift_tap.py)
+
+Times DriftTap.offer for single rows and batches while the background
+thread drains the ring buffer, and reports how fast the drain keeps up.
+
+Usage: python benchmarks/bench_drift_tap.py [--calls 200000] [--features 34]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.monitoring.sketches import DriftEngine
+from src.serving.drift_tap import DriftTap
+
+
+def percentiles_us(timings):
+    p50, p99, p999 = np.percentile(np.asarray(timings) * 1e6, [50, 99, 99.9])
+    return f"p50 {p50:6.2f} us   p99 {p99:6.2f} us   p99.9 {p999:6.2f} us"
+
+
+def time_calls(fn, args, calls):
+    timings = np.empty(calls)
+    clock = time.perf_counter
+    for i in range(calls):
+        start = clock()
+        fn(*args)
+        timings[i] = clock() - start
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=200_000)
+    parser.add_argument("--features", type=int, default=34)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    names = [f"f{i}" for i in range(args.features)]
+    reference = DriftEngine.reference_from(
+        rng.normal(size=(20_000, args.features)), rng.random(20_000), names
+    )
+    tap = DriftTap(reference, interval=0.05)
+    tap.start()
+
+    row = rng.normal(size=args.features).astype(np.float32)
+    batch = rng.normal(size=(1000, args.features)).astype(np.float32)
+    batch_scores = rng.random(1000).astype(np.float32)
+
+    def no_tap(features, scores):
+        pass
+
+    print(
+        f"features: {args.features}, calls: {args.calls}, "
+        f"drain interval: {tap.interval}s\n"
+    )
+    cases = [
+        ("empty call", no_tap, (row, 0.5), args.calls),
+        ("offer, 1 row", tap.offer, (row, 0.5), args.calls),
+        ("offer, 1000 rows", tap.offer, (batch, batch_scores),
+         args.calls // 100),
+    ]
+    for name, fn, call_args, calls in cases:
+        timings = time_calls(fn, call_args, calls)
+        print(f"{name:<22}{percentiles_us(timings)}")
+
+    tap.stop()
+    start = time.perf_counter()
+    for _ in range(1000):
+        tap.offer(batch, batch_scores)
+    rows = tap.process()
+    elapsed = time.perf_counter() - start
+    print(
+        f"\ndrain: {rows:,} rows in {elapsed * 1e3:.0f} ms "
+        f"({rows / elapsed:,.0f} rows/s), "
+        f"dropped blocks: {tap.buffer.dropped}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""ColumnTransformer.transform versus the compiled FeaturePlan
+(src/features/plan.py)
+
+Fits create_feature_pipeline on synthetic rows, once with the numeric UCI
+columns only and once with an extra one-hot encoded string column, and
+times the transform of batches of increasing size: sklearn versus the plan
+with float64 and float32 arithmetic. The plan gets a float matrix for the
+numeric pipeline and the DataFrame when there is a string column.
+
+Usage: python benchmarks/bench_feature_plan.py [--repeats 200]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, "tests"))
+
+from conftest import make_credit_frame
+from src.features.build_features import create_feature_pipeline
+from src.features.plan import compile_preprocessor
+
+BATCH_SIZES = (1, 10, 100, 1000, 10_000, 100_000)
+
+
+def median_us(fn, repeats):
+    fn()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1e6
+
+
+def frames(n_rows):
+    numeric = (
+        make_credit_frame(n_rows).drop(columns="DEFAULT").astype("float64")
+    )
+    numeric.iloc[::9, 0] = np.nan
+    mixed = numeric.assign(
+        REGION=np.random.default_rng(0).choice(
+            ["north", "south", "east"], n_rows
+        )
+    )
+    return {"numeric": numeric, "one-hot": mixed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+
+    for name, frame in frames(max(BATCH_SIZES)).items():
+        preprocessor = create_feature_pipeline(frame).fit(frame)
+        plan = compile_preprocessor(preprocessor, list(frame.columns))
+        print(f"\n{name}: {plan.n_outputs} outputs")
+        print(
+            f"{'rows':>8} {'sklearn':>12} {'plan f64':>12} "
+            f"{'plan f32':>12} {'speedup':>8}"
+        )
+        for batch_size in BATCH_SIZES:
+            batch = frame.head(batch_size)
+            matrix = batch
+            if name != "one-hot":
+                matrix = batch.to_numpy(dtype=np.float64)
+            np.testing.assert_allclose(
+                plan.transform(matrix), preprocessor.transform(batch),
+                atol=1e-12
+            )
+            repeats = max(5, args.repeats * 100 // max(batch_size, 100))
+            sklearn_us = median_us(
+                lambda: preprocessor.transform(batch), repeats
+            )
+            plan_us = median_us(lambda: plan.transform(matrix), repeats)
+            plan32_us = median_us(
+                lambda: plan.transform(matrix, dtype=np.float32), repeats
+            )
+            print(
+                f"{batch_size:>8,} {sklearn_us:10.0f}us {plan_us:10.0f}us "
+                f"{plan32_us:10.0f}us "
+                f"{sklearn_us / plan_us:7.0f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Per-request cost of the prediction metrics in src/serving/metrics.py
+
+Replays what /predict and /predict/batch record for one request (counters,
+stage timers, batch size and score histograms) without any scoring work.
+
+Usage: python benchmarks/bench_metrics_overhead.py [--repeats 20000]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.serving.metrics import PredictionMetrics
+
+BATCH_SIZES = (1, 32, 1000)
+
+
+def record_request(metrics, scores, endpoint="predict_batch", version="bench"):
+    started = time.perf_counter()
+    with metrics.time_deserialization(endpoint):
+        pass
+    metrics.observe_inference(0.0)
+    metrics.count("success", version, len(scores))
+    if len(scores) == 1:
+        metrics.observe_score(scores[0], version)
+    else:
+        metrics.observe_scores(scores, version)
+    with metrics.time_serialization(endpoint):
+        pass
+    metrics.observe_request(
+        endpoint, len(scores), time.perf_counter() - started
+    )
+
+
+def per_value_scores(scores, version="bench"):
+    """The naive alternative: one Histogram.observe call per score"""
+    from prometheus_client import CollectorRegistry, Histogram
+    from src.serving.metrics import SCORE_BUCKETS
+
+    histogram = Histogram(
+        "bench_score",
+        "",
+        ["model_version"],
+        buckets=SCORE_BUCKETS,
+        registry=CollectorRegistry(),
+    ).labels(version)
+
+    def observe():
+        for score in scores:
+            histogram.observe(score)
+    return observe
+
+
+def median_us(fn, repeats):
+    for _ in range(100):
+        fn()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeats", type=int, default=20000)
+    args = parser.parse_args()
+
+    metrics = PredictionMetrics()
+    rng = np.random.default_rng(0)
+    print(
+        f"{'rows':>6}{'all metrics (us)':>20}"
+        f"{'score hist, bulk (us)':>24}{'score hist, per value (us)':>29}"
+    )
+    for rows in BATCH_SIZES:
+        scores = rng.random(rows).astype(np.float32)
+        total = median_us(
+            lambda: record_request(metrics, scores), args.repeats
+        )
+        bulk = median_us(
+            lambda: metrics.observe_scores(scores, "bench"), args.repeats
+        )
+        naive = median_us(
+            per_value_scores(scores.tolist()), max(args.repeats // 10, 100)
+        )
+        print(f"{rows:>6}{total:>20.1f}{bulk:>24.1f}{naive:>29.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Decision policy on large batches: per-row Python versus the compiled table
+
+Labels ``--rows`` synthetic applicants with random probabilities:
+
+- if-chain: the API's former per-row ``if p < 0.3 ... elif p < 0.7`` and
+  a fixed 0.5 cut-off (``--python-rows`` rows, reported per row)
+- row loop: the segmented table evaluated row by row in Python
+- default: DecisionPolicy without segments (one np.searchsorted)
+- segmented: segments on an AGE band, EDUCATION codes and a product column,
+  with their own thresholds and band sets (a mask per condition and a
+  searchsorted per segment)
+
+plus the cost of compiling the table (what a policy reload does) and of
+PolicyStore.get() between file checks and with a stat on every call.
+
+Usage: python benchmarks/bench_policy.py [--rows 1000000] [--repeat 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, "tests"))
+
+from conftest import make_credit_frame
+from test_policy import SEGMENTED, reference
+
+from src.models.policy import PolicyStore, compile_policy
+
+
+def if_chain(probabilities):
+    levels, predictions = [], []
+    for probability in probabilities:
+        if probability < 0.3:
+            risk_level = "low"
+        elif probability < 0.7:
+            risk_level = "medium"
+        else:
+            risk_level = "high"
+        levels.append(risk_level)
+        predictions.append(int(probability > 0.5))
+    return predictions, levels
+
+
+def timed(fn, repeat):
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        runs.append(time.perf_counter() - start)
+    return statistics.median(runs), result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--python-rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    frame = make_credit_frame(args.rows, seed=0)
+    frame["PRODUCT"] = np.where(np.arange(args.rows) % 3, "card", "loan")
+    probabilities = np.random.default_rng(1).random(args.rows)
+    default, segmented = compile_policy(), compile_policy(SEGMENTED)
+    columns = {
+        column: frame[column].to_numpy() for column in segmented.columns
+    }
+    head_rows = frame.head(args.python_rows)[segmented.columns]
+    records = head_rows.to_dict("records")
+    head = probabilities[:args.python_rows].tolist()
+
+    cases = [
+        ("if-chain", args.python_rows, lambda: if_chain(head)),
+        ("row loop", args.python_rows,
+         lambda: [reference(SEGMENTED, p, row)
+                  for p, row in zip(head, records)]),
+        ("default", args.rows,
+         lambda: default.apply(probabilities).risk_levels()),
+        ("segmented", args.rows,
+         lambda: segmented.apply(probabilities, columns).risk_levels()),
+    ]
+    print(
+        f"{'policy':<10} {'rows':>10} {'ms':>9} {'ns/row':>8} {'rows/s':>14}"
+    )
+    results = {}
+    for name, rows, fn in cases:
+        repeat = args.repeat if rows == args.rows else 1
+        seconds, results[name] = timed(fn, repeat)
+        print(
+            f"{name:<10} {rows:>10,} {seconds * 1e3:9.1f} "
+            f"{seconds / rows * 1e9:8.1f} {rows / seconds:14,.0f}"
+        )
+
+    head_levels = results["default"][:args.python_rows].tolist()
+    assert head_levels == results["if-chain"][1]
+    assert results["segmented"][:args.python_rows].tolist() == [
+        level for _, level in results["row loop"]
+    ]
+
+    seconds, _ = timed(lambda: compile_policy(SEGMENTED), 100)
+    print(f"\ncompile segmented table: {seconds * 1e6:.0f} us")
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, "policy.json")
+        with open(path, "w") as f:
+            json.dump(SEGMENTED, f)
+        for poll_interval in (5.0, 0.0):
+            store = PolicyStore(path, poll_interval=poll_interval)
+            seconds, _ = timed(lambda: [store.get() for _ in range(10_000)], 3)
+            print(
+                f"PolicyStore.get(), poll every {poll_interval:g}s: "
+                f"{seconds / 10_000 * 1e9:.0f} ns"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""Per-stage cost of a scoring request, without HTTP or the event loop
+
+Times separately what load_test.py measures end to end:
+
+- inference: InferenceSession.run and OnnxScorer.score on the ONNX model
+- validation: pydantic parsing of the request bodies of both services and
+  decoding of the binary batch formats
+- serialization: the response bodies /predict and /predict/batch build
+
+Usage: python benchmarks/bench_request_stages.py [--repeats 5000]
+"""
+import argparse
+import io
+import json
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, "tests"))
+MODEL_PATH = os.environ.setdefault(
+    "MODEL_PATH", os.path.join(ROOT_DIR, "credit_model.onnx")
+)
+
+from conftest import make_credit_frame
+from src.features.schema import FEATURE_COLUMNS
+from src.serving import (
+    OnnxScorer,
+    build_feature_matrix,
+    create_session,
+    decode_matrix,
+    encode_scores,
+)
+from src.serving import codecs
+
+BATCH_SIZES = (1, 32, 1000)
+
+
+def median_us(fn, repeats):
+    fn()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1e6
+
+
+def report(stage, name, rows, us):
+    print(
+        f"{stage:<14} {name:<40} {rows:>6,} {us:10.1f}us "
+        f"{us / rows:9.2f}us/row"
+    )
+
+
+def batch_json_body(scores, errors=()):
+    """/predict/batch JSON response as src/app.py builds it"""
+    predictions = [
+        {"index": index, "score": score, "error": None}
+        for index, score in enumerate(scores.tolist())
+    ]
+    return json.dumps(
+        {
+            "predictions": predictions,
+            "scored": len(predictions),
+            "failed": len(errors),
+        }
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeats", type=int, default=5000)
+    args = parser.parse_args()
+
+    # The service modules define the request/response models; importing
+    # them loads their models as in production
+    from src.app import BatchPredictionRequest, PredictionRequest
+    from src.api.app import CreditData, PredictionResponse
+
+    session = create_session(MODEL_PATH)
+    scorer = OnnxScorer(session)
+    input_name = session.get_inputs()[0].name
+    rng = np.random.default_rng(0)
+    matrix = (
+        rng.normal(size=(max(BATCH_SIZES), scorer.n_features))
+        .round(3)
+        .astype(np.float32)
+    )
+    records = (
+        make_credit_frame(1, seed=0)[FEATURE_COLUMNS]
+        .astype(object)
+        .to_dict(orient="records")
+    )
+
+    print(
+        f"{'stage':<14} {'operation':<40} {'rows':>6} {'median':>12} "
+        f"{'per row':>13}"
+    )
+    for rows in BATCH_SIZES:
+        batch = matrix[:rows]
+        repeats = max(50, args.repeats * 32 // max(rows, 32))
+        report(
+            "inference",
+            "session.run",
+            rows,
+            median_us(lambda: session.run(None, {input_name: batch}), repeats),
+        )
+        report(
+            "inference",
+            "OnnxScorer.score",
+            rows,
+            median_us(lambda: scorer.score(batch), repeats),
+        )
+
+    single = json.dumps({"features": matrix[0].tolist()}).encode()
+    report(
+        "validation",
+        "PredictionRequest (onnx /predict)",
+        1,
+        median_us(
+            lambda: PredictionRequest.model_validate_json(single), args.repeats
+        ),
+    )
+    report(
+        "validation",
+        "  + np.array float32",
+        1,
+        median_us(
+            lambda: np.array(
+                PredictionRequest.model_validate_json(single).features,
+                dtype=np.float32,
+            ),
+            args.repeats,
+        ),
+    )
+    credit = json.dumps(records[0]).encode()
+    report(
+        "validation",
+        "CreditData (api /predict)",
+        1,
+        median_us(
+            lambda: CreditData.model_validate_json(credit), args.repeats
+        ),
+    )
+    for rows in BATCH_SIZES[1:]:
+        repeats = max(50, args.repeats * 32 // max(rows, 32))
+        body = json.dumps({"instances": matrix[:rows].tolist()}).encode()
+
+        def parse_json():
+            build_feature_matrix(
+                BatchPredictionRequest.model_validate_json(body).instances,
+                scorer.n_features,
+            )
+
+        report(
+            "validation",
+            "BatchPredictionRequest + rows",
+            rows,
+            median_us(parse_json, repeats),
+        )
+        buffer = io.BytesIO()
+        np.save(buffer, matrix[:rows])
+        npy = buffer.getvalue()
+        raw = matrix[:rows].tobytes()
+        shape = f"{rows},{scorer.n_features}"
+        report(
+            "validation",
+            "decode_matrix npy",
+            rows,
+            median_us(lambda: decode_matrix(codecs.NPY, npy), repeats),
+        )
+        report(
+            "validation",
+            "decode_matrix raw float32",
+            rows,
+            median_us(
+                lambda: decode_matrix(codecs.OCTET_STREAM, raw, shape), repeats
+            ),
+        )
+
+    score = float(scorer.score(matrix[:1])[0])
+    report(
+        "serialization",
+        "json.dumps (onnx /predict)",
+        1,
+        median_us(
+            lambda: json.dumps(
+                {"score": score, "features_used": scorer.n_features}
+            ).encode(),
+            args.repeats,
+        ),
+    )
+    response = PredictionResponse(
+        prediction=0, probability=round(score, 4), risk_level="low"
+    )
+    report("serialization", "PredictionResponse.model_dump_json (api)", 1,
+           median_us(response.model_dump_json, args.repeats))
+    for rows in BATCH_SIZES[1:]:
+        repeats = max(50, args.repeats * 32 // max(rows, 32))
+        scores = scorer.score(matrix[:rows])
+        report(
+            "serialization",
+            "batch JSON body",
+            rows,
+            median_us(lambda: batch_json_body(scores), repeats),
+        )
+        report("serialization", "encode_scores npy", rows,
+               median_us(lambda: encode_scores(scores, codecs.NPY), repeats))
+        report(
+            "serialization",
+            "encode_scores raw float32",
+            rows,
+            median_us(
+                lambda: encode_scores(scores, codecs.OCTET_STREAM), repeats
+            ),
+        )
+
+
+if __name__ == "__main__":
+    main()
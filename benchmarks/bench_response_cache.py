@@ -0,0 +1,131 @@
+"""Repeat-payload latency of /predict with the response cache
+(src/serving/response_cache.py)
+
+Times the cache operations alone (key, hit, miss + store), then /predict of
+the ONNX service through TestClient with the cache off and on for a stream
+of payloads where a given share repeats a small pool of applicants.
+
+Usage: python benchmarks/bench_response_cache.py [--requests 3000]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+# src.app loads the model when imported
+os.environ.setdefault(
+    "MODEL_PATH", os.path.join(ROOT_DIR, "credit_model.onnx")
+)
+
+from src.serving.response_cache import (
+    InMemoryStore,
+    RemoteBackend,
+    ResponseCache,
+)
+
+REPEAT_SHARES = (0.0, 0.5, 0.9)
+
+
+def median_us(fn, repeats):
+    fn()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1e6
+
+
+def payloads(n_requests, n_features, repeat_share, rng):
+    """Request bodies; ``repeat_share`` of them come from a pool of 50
+    applicants
+    """
+    pool = rng.normal(size=(50, n_features)).round(3)
+    bodies = []
+    for _ in range(n_requests):
+        if rng.random() < repeat_share:
+            row = pool[rng.integers(len(pool))]
+        else:
+            row = rng.normal(size=n_features).round(3)
+        bodies.append({"features": row.tolist()})
+    return bodies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=3000)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    row = rng.normal(size=23).astype(np.float32)
+    body = b'{"score": 0.2137, "features_used": 23}'
+    print("cache operations")
+    caches = {
+        "local": ResponseCache(),
+        "local + shared": ResponseCache(
+            backend=RemoteBackend(InMemoryStore())
+        ),
+    }
+    for name, cache in caches.items():
+        key = cache.key(row, "v1")
+        cache.set(key, body)
+        key_us = median_us(lambda: cache.key(row, "v1"), 20_000)
+        hit_us = median_us(lambda: cache.get(key), 20_000)
+        miss_us = median_us(lambda: cache.get("absent"), 20_000)
+        set_us = median_us(lambda: cache.set(key, body), 20_000)
+        print(
+            f"{name:<16} key {key_us:5.2f}us  hit {hit_us:5.2f}us  "
+            f"miss {miss_us:5.2f}us  set {set_us:5.2f}us"
+        )
+
+    from fastapi.testclient import TestClient
+
+    import src.app
+
+    with TestClient(src.app.app) as client:
+        deadline = time.monotonic() + 60
+        while client.get("/startup").status_code != 200:
+            if time.monotonic() > deadline:
+                raise SystemExit("model did not start")
+            time.sleep(0.05)
+        n_features = src.app.manager.get().n_features
+
+        print(f"\n/predict through TestClient, {args.requests} requests")
+        print(
+            f"{'repeats':>8} {'off p50':>9} {'on p50':>9} "
+            f"{'off mean':>9} {'on mean':>9} {'hit rate':>9}"
+        )
+        for share in REPEAT_SHARES:
+            bodies = payloads(args.requests, n_features, share, rng)
+            results = {}
+            for label, cache in (("off", None),
+                                 ("on", ResponseCache(maxsize=10_000))):
+                src.app.response_cache = cache
+                timings = []
+                for payload in bodies:
+                    start = time.perf_counter()
+                    client.post("/predict", json=payload)
+                    timings.append(time.perf_counter() - start)
+                results[label] = (
+                    statistics.median(timings) * 1e6,
+                    statistics.fmean(timings) * 1e6,
+                )
+            hits = args.requests - len(cache)
+            (off_p50, off_mean), (on_p50, on_mean) = (
+                results["off"], results["on"]
+            )
+            print(
+                f"{share:>8.0%} {off_p50:7.0f}us {on_p50:7.0f}us "
+                f"{off_mean:7.0f}us {on_mean:7.0f}us "
+                f"{hits / args.requests:>9.0%}"
+            )
+        src.app.response_cache = None
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Previous sequential GridSearchCV/RandomizedSearchCV versus
+src/models/search.py
+
+Runs both on the same synthetic split and prints wall-clock time, CPU time
+and the selected parameters and test ROC-AUC of each family.
+
+Usage: python benchmarks/bench_search.py [--rows 24000] [--n-jobs N]
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, "tests"))
+
+from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import GridSearchCV, RandomizedSearchCV
+from sklearn.pipeline import Pipeline
+
+from conftest import make_credit_frame
+from src.features.build_features import create_feature_pipeline
+from src.models.search import default_specs, run_searches
+
+
+def previous_searches(X, y, n_jobs):
+    """ModelTrainer's searches before successive halving, one after the
+    other
+    """
+    specs = {spec.name: spec for spec in default_specs()}
+
+    def pipeline(classifier):
+        return Pipeline([
+            ("preprocessor", create_feature_pipeline(X)),
+            ("classifier", classifier),
+        ])
+
+    searches = {
+        "logistic_regression": GridSearchCV(
+            pipeline(LogisticRegression(random_state=42, max_iter=1000)),
+            specs["logistic_regression"].param_grid,
+            cv=5, scoring="roc_auc", n_jobs=n_jobs,
+        ),
+        "gradient_boosting": RandomizedSearchCV(
+            pipeline(GradientBoostingClassifier(random_state=42)),
+            specs["gradient_boosting"].param_grid,
+            n_iter=4, cv=3, scoring="roc_auc", random_state=42,
+            n_jobs=n_jobs,
+        ),
+    }
+    results = {}
+    for name, search in searches.items():
+        wall = time.perf_counter()
+        search.fit(X, y)
+        results[name] = (search.best_estimator_, search.best_params_,
+                         time.perf_counter() - wall)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=24_000)
+    parser.add_argument("--n-jobs", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    frame = make_credit_frame(args.rows + 6_000)
+    train, test = frame.iloc[:args.rows], frame.iloc[args.rows:]
+    X, y = train.drop(columns="DEFAULT"), train["DEFAULT"]
+    X_test, y_test = test.drop(columns="DEFAULT"), test["DEFAULT"]
+    print(
+        f"{args.rows:,} training rows, n_jobs={args.n_jobs}, "
+        f"{os.cpu_count()} cores\n"
+    )
+
+    start = time.perf_counter()
+    previous = previous_searches(X, y, args.n_jobs)
+    previous_total = time.perf_counter() - start
+    print(f"previous: {previous_total:.1f}s wall")
+    for name, (estimator, params, wall) in previous.items():
+        auc = roc_auc_score(y_test, estimator.predict_proba(X_test)[:, 1])
+        print(f"  {name:<20} {wall:7.1f}s  test auc {auc:.4f}  {params}")
+
+    start = time.perf_counter()
+    results = run_searches(
+        default_specs(("logistic_regression", "gradient_boosting")),
+        X, y, n_jobs=args.n_jobs,
+    )
+    total = time.perf_counter() - start
+    print(
+        f"\nhalving, concurrent: {total:.1f}s wall "
+        f"(x{previous_total / total:.1f})"
+    )
+    for name, result in results.items():
+        auc = roc_auc_score(
+            y_test, result.estimator.predict_proba(X_test)[:, 1]
+        )
+        print(
+            f"  {name:<20} {result.wall_seconds:7.1f}s  "
+            f"cpu {result.cpu_seconds:7.1f}s  "
+            f"test auc {auc:.4f}  {result.best_params}"
+        )
+
+
+if __name__ == "__main__":
+    main()
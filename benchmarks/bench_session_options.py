@@ -0,0 +1,136 @@
+"""Effect of ONNX Runtime session settings on credit_model.onnx
+
+Usage: python benchmarks/bench_session_options.py [--model credit_model.onnx]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.serving.session import SessionConfig, SessionPool, create_session
+
+BATCH_SIZES = (1, 32, 256)
+
+VARIANTS = {
+    "default": SessionConfig(),
+    "intra=1": SessionConfig(intra_op_threads=1),
+    "intra=2": SessionConfig(intra_op_threads=2),
+    "parallel,inter=2": SessionConfig(
+        execution_mode="parallel", inter_op_threads=2
+    ),
+    "opt=disable": SessionConfig(optimization_level="disable"),
+    "opt=basic": SessionConfig(optimization_level="basic"),
+    "opt=extended": SessionConfig(optimization_level="extended"),
+    "no arena": SessionConfig(
+        enable_cpu_mem_arena=False, enable_mem_pattern=False
+    ),
+}
+
+
+def time_runs(session, batch, repeats):
+    feed = {session.get_inputs()[0].name: batch}
+    for _ in range(10):
+        session.run(None, feed)
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        session.run(None, feed)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def bench_latency(model_path, n_features, repeats):
+    rng = np.random.default_rng(0)
+    print(
+        f"{'variant':<20}"
+        + "".join(f"{f'p50 b={b} (us)':>18}" for b in BATCH_SIZES)
+        + f"{'rows/s b=256':>16}"
+    )
+    for name, config in VARIANTS.items():
+        session = create_session(model_path, config)
+        cells = []
+        for batch_size in BATCH_SIZES:
+            batch = rng.normal(size=(batch_size, n_features)).astype(
+                np.float32
+            )
+            timings = time_runs(session, batch, repeats)
+            cells.append(statistics.median(timings))
+        rows_per_sec = BATCH_SIZES[-1] / cells[-1]
+        print(
+            f"{name:<20}"
+            + "".join(f"{c * 1e6:>18.1f}" for c in cells)
+            + f"{rows_per_sec:>16,.0f}"
+        )
+
+
+def bench_cold_start(model_path, repeats):
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cached = SessionConfig(
+            optimized_model_path=os.path.join(cache_dir, "optimized.onnx")
+        )
+        create_session(model_path, cached)  # writes the cache
+
+        for name, config in (("no cache", SessionConfig()),
+                             ("optimized cache", cached)):
+            timings = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                create_session(model_path, config)
+                timings.append(time.perf_counter() - start)
+            median_ms = statistics.median(timings) * 1e3
+            print(f"cold start, {name:<16} {median_ms:8.2f} ms")
+
+
+def bench_pool(model_path, n_features, requests_per_thread=500):
+    rng = np.random.default_rng(0)
+    batch = rng.normal(size=(32, n_features)).astype(np.float32)
+    for pool_size in (1, 2, 4):
+        config = replace(SessionConfig(intra_op_threads=1),
+                         pool_size=pool_size)
+        pool = SessionPool(model_path, config)
+        feed = {pool.get_inputs()[0].name: batch}
+
+        def worker(_):
+            for _ in range(requests_per_thread):
+                pool.run(None, feed)
+
+        threads = max(pool_size, 2)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(threads) as executor:
+            list(executor.map(worker, range(threads)))
+        elapsed = time.perf_counter() - start
+        rows = threads * requests_per_thread * len(batch)
+        print(
+            f"pool_size={pool_size} threads={threads}: "
+            f"{rows / elapsed:>12,.0f} rows/s"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", default="credit_model.onnx")
+    parser.add_argument("--repeats", type=int, default=500)
+    args = parser.parse_args()
+
+    n_features = create_session(args.model).get_inputs()[0].shape[-1]
+    print(
+        f"CPU cores: {os.cpu_count()}, model: {args.model}, "
+        f"features: {n_features}\n"
+    )
+    bench_latency(args.model, n_features, args.repeats)
+    print()
+    bench_cold_start(args.model, repeats=20)
+    print()
+    bench_pool(args.model, n_features)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""Memory and throughput of multi-worker serving (src/serving/workers.py)
+
+Starts the ONNX service with 1, 2, 4 and 8 workers in two variants:
+
+- fork: every worker imports the application itself (no preload),
+  like ``uvicorn --workers``
+- preload: the master imports the application before forking
+
+and reports the mean RSS and PSS (proportional set size: shared pages are
+split between the processes mapping them) per worker, the PSS of all
+processes together and the closed-loop /predict/batch throughput.
+
+credit_model.onnx holds 58 KiB of weights; ``--weights-mb`` builds a
+synthetic MLP of that size with external data to show how the per-worker
+cost grows with the model.
+
+Usage: python benchmarks/bench_workers.py [--workers 1,2,4,8]
+           [--weights-mb 0] [--duration 5]
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import load_test
+
+VARIANTS = {"fork": False, "preload": True}
+
+
+def synthetic_model(root, weights_mb, n_features=34, hidden=2048):
+    """Gemm-Relu-Gemm-Sigmoid MLP with about ``weights_mb`` MiB of external
+    weights
+    """
+    import onnx
+    from onnx import TensorProto, helper, numpy_helper
+
+    second = max(1, weights_mb * 2**20 // 4 // hidden)
+    rng = np.random.default_rng(0)
+    weights = {
+        "w1": rng.normal(0, 0.1, size=(n_features, hidden)).astype(np.float32),
+        "w2": rng.normal(0, 0.01, size=(hidden, second)).astype(np.float32),
+        "w3": rng.normal(0, 0.01, size=(second, 1)).astype(np.float32),
+    }
+    graph = helper.make_graph(
+        [
+            helper.make_node("Gemm", ["input", "w1"], ["h1"]),
+            helper.make_node("Relu", ["h1"], ["r1"]),
+            helper.make_node("Gemm", ["r1", "w2"], ["h2"]),
+            helper.make_node("Relu", ["h2"], ["r2"]),
+            helper.make_node("Gemm", ["r2", "w3"], ["logit"]),
+            helper.make_node("Sigmoid", ["logit"], ["output"]),
+        ],
+        "synthetic",
+        [
+            helper.make_tensor_value_info(
+                "input", TensorProto.FLOAT, ["batch", n_features]
+            )
+        ],
+        [
+            helper.make_tensor_value_info(
+                "output", TensorProto.FLOAT, ["batch", 1]
+            )
+        ],
+        [
+            numpy_helper.from_array(value, name)
+            for name, value in weights.items()
+        ],
+    )
+    model = helper.make_model(
+        graph, opset_imports=[helper.make_opsetid("", 17)], ir_version=8
+    )
+    path = os.path.join(root, "synthetic.onnx")
+    onnx.save_model(
+        model,
+        path,
+        save_as_external_data=True,
+        all_tensors_to_one_file=True,
+        location="synthetic.onnx.data",
+        size_threshold=1024,
+    )
+    return path
+
+
+def memory(pid):
+    """(RSS, PSS) of a process in MiB from /proc/<pid>/smaps_rollup"""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ("Rss:", "Pss:"):
+                values[parts[0][:-1]] = int(parts[1]) / 1024
+    return values["Rss"], values["Pss"]
+
+
+def children(pid):
+    found = []
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    if int(f.read().rsplit(")", 1)[1].split()[1]) == pid:
+                        found.append(int(entry))
+            except (OSError, IndexError, ValueError):
+                pass
+    return found
+
+
+async def drive(url, requests, concurrency, duration):
+    import httpx
+
+    async with httpx.AsyncClient(base_url=url, timeout=60) as client:
+        recorder = await load_test.closed_loop(
+            client, requests, concurrency, duration, warmup=1.0
+        )
+    return recorder
+
+
+def wait_ready(process, url, workers, timeout=120):
+    """Until every worker answers /startup (each probe uses a new
+    connection)
+    """
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    ready = 0
+    while ready < 4 * workers:
+        if process.poll() is not None:
+            raise RuntimeError(
+                f"server exited with status {process.returncode}"
+            )
+        if time.monotonic() > deadline:
+            raise RuntimeError("server not ready")
+        try:
+            ready = (
+                ready + 1
+                if httpx.get(url + "/startup", timeout=5).status_code == 200
+                else 0
+            )
+        except httpx.HTTPError:
+            ready = 0
+            time.sleep(0.2)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        "--workers", type=load_test._ints, default=[1, 2, 4, 8]
+    )
+    parser.add_argument(
+        "--variants",
+        nargs="+",
+        choices=sorted(VARIANTS),
+        default=list(VARIANTS),
+    )
+    parser.add_argument("--weights-mb", type=int, default=0)
+    parser.add_argument("--duration", type=float, default=5.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        if args.weights_mb:
+            model_path = synthetic_model(root, args.weights_mb)
+        else:
+            model_path = os.path.join(load_test.ROOT_DIR, "credit_model.onnx")
+        # The model file and its external data files
+        model_dir, model_name = os.path.split(model_path)
+        weights_mb = sum(
+            os.path.getsize(os.path.join(model_dir, name))
+            for name in os.listdir(model_dir) if name.startswith(model_name)
+        ) / 2**20
+        requests = load_test.build_scenarios(
+            "onnx", load_test.onnx_input_width(model_path)
+        )["batch_npy"]
+        print(
+            f"{model_name}: {weights_mb:.1f} MiB on disk, "
+            f"{os.cpu_count()} cores"
+        )
+        print(
+            f"{'variant':<13} {'workers':>7} {'RSS/worker':>11} "
+            f"{'PSS/worker':>11} {'PSS total':>10} "
+            f"{'batches/s':>10} {'p99 ms':>8}"
+        )
+
+        for variant in args.variants:
+            for workers in args.workers:
+                port = load_test._free_port()
+                env = dict(os.environ, MODEL_PATH=model_path,
+                           MLFLOW_DISABLE_AGENT_HINT="1",
+                           WARMUP_BATCH_SIZES="1,32")
+                command = [
+                    sys.executable, "-m", "src.serving.workers", "src.app:app",
+                    "--workers", str(workers), "--host", "127.0.0.1",
+                    "--port", str(port), "--log-level", "warning",
+                ]
+                if not VARIANTS[variant]:
+                    command.append("--no-preload")
+                process = subprocess.Popen(
+                    command, cwd=load_test.ROOT_DIR, env=env,
+                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                )
+                url = f"http://127.0.0.1:{port}"
+                try:
+                    wait_ready(process, url, workers)
+                    recorder = asyncio.run(
+                        drive(url, requests, 2 * workers, args.duration)
+                    )
+                    row = load_test.summarize(recorder, args.duration)
+                    pids = children(process.pid)
+                    usage = [memory(pid) for pid in pids]
+                    total_pss = (
+                        sum(pss for _, pss in usage) + memory(process.pid)[1]
+                    )
+                finally:
+                    process.terminate()
+                    process.wait(30)
+                rss, pss = np.mean(usage, axis=0)
+                print(
+                    f"{variant:<13} {workers:>7} {rss:9.1f}MB {pss:9.1f}MB "
+                    f"{total_pss:8.1f}MB {row['throughput']:10.1f} "
+                    f"{row['p99_ms'] or 0:8.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,601 @@
+"""Load test of the scoring services (src/app.py and src/api/app.py)
+
+Drives /predict and /predict/batch with JSON and, for the ONNX service,
+binary payloads, and reports throughput and p50/p95/p99/p99.9 latency
+per target, scenario, load mode and level:
+
+- closed loop: ``--concurrency`` clients each send the next request as
+  soon as the previous answer arrives (throughput at a given concurrency)
+- open loop: requests arrive as a Poisson process at ``--rate`` per
+  second whether or not earlier ones finished; latency is measured from
+  the scheduled arrival, so queueing behind a slow server is included
+
+Each target is started with uvicorn in a subprocess (``--inprocess`` runs
+the ASGI app in this event loop instead, without HTTP, and ``--url``
+points at a running server). The sklearn service gets a small pipeline
+fitted on synthetic data unless PIPELINE_MODEL_PATH is set.
+
+Results are written as JSON to ``--output``. When ``--baseline`` exists,
+every result with a matching key is compared against it and the run
+exits with status 1 if p99 latency grew or throughput fell by more than
+``--tolerance`` (or the error rate rose); ``--save-baseline`` stores the
+current run as the new baseline. Baselines are machine-specific: record
+them on the hardware the comparison runs on.
+
+Usage: python benchmarks/load_test.py [--target onnx api] [--mode closed open]
+           [--concurrency 1,8,32] [--rate 50,200] [--duration 10]
+           [--baseline benchmarks/baselines/load_test.json] [--save-baseline]
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, "tests"))
+
+from conftest import make_credit_frame
+from src.features.schema import FEATURE_COLUMNS
+
+PERCENTILES = (50, 95, 99, 99.9)
+DEFAULT_OUTPUT = os.path.join(ROOT_DIR, "reports", "load_test.json")
+DEFAULT_BASELINE = os.path.join(
+    ROOT_DIR, "benchmarks", "baselines", "load_test.json"
+)
+
+TARGETS = {
+    "onnx": {"app": "src.app:app", "ready": "/startup"},
+    "api": {"app": "src.api.app:app", "ready": "/health"},
+}
+BATCH_ROWS = 32
+POOL_SIZE = 256
+
+
+def _npy(matrix):
+    buffer = io.BytesIO()
+    np.save(buffer, np.ascontiguousarray(matrix, dtype=np.float32))
+    return buffer.getvalue()
+
+
+def onnx_input_width(model_path):
+    """Feature count of the ONNX model's input, or None when it cannot be
+    read
+    """
+    try:
+        import onnxruntime as ort
+
+        session = ort.InferenceSession(
+            model_path, providers=["CPUExecutionProvider"]
+        )
+        shape = session.get_inputs()[0].shape
+        return shape[-1] if isinstance(shape[-1], int) else None
+    except Exception:
+        return None
+
+
+def build_scenarios(target, n_features=None, seed=0):
+    """{scenario: [(path, request kwargs), ...]} with POOL_SIZE distinct
+    payloads each.
+
+    The sklearn service takes raw applicant fields; the ONNX service takes
+    already preprocessed vectors of ``n_features`` values.
+    """
+    if target == "api":
+        frame = make_credit_frame(POOL_SIZE * BATCH_ROWS, seed=seed)
+        records = frame[FEATURE_COLUMNS].astype(object).to_dict(
+            orient="records"
+        )
+        batches = [
+            records[i * BATCH_ROWS:(i + 1) * BATCH_ROWS]
+            for i in range(POOL_SIZE)
+        ]
+        return {
+            "predict_json": [
+                ("/predict", {"json": record})
+                for record in records[:POOL_SIZE]
+            ],
+            "batch_json": [
+                ("/predict/batch", {"json": {"instances": batch}})
+                for batch in batches
+            ],
+        }
+    rng = np.random.default_rng(seed)
+    matrix = rng.normal(size=(POOL_SIZE * BATCH_ROWS, n_features))
+    matrix = matrix.round(3).astype(np.float32)
+    batches = matrix.reshape(POOL_SIZE, BATCH_ROWS, n_features)
+    return {
+        "predict_json": [
+            ("/predict", {"json": {"features": row.tolist()}})
+            for row in matrix[:POOL_SIZE]
+        ],
+        "batch_json": [
+            ("/predict/batch", {"json": {"instances": batch.tolist()}})
+            for batch in batches
+        ],
+        "batch_npy": [
+            (
+                "/predict/batch",
+                {
+                    "content": _npy(batch),
+                    "headers": {
+                        "content-type": "application/x-npy",
+                        "accept": "application/x-npy",
+                    },
+                },
+            )
+            for batch in batches
+        ],
+        "batch_raw": [
+            (
+                "/predict/batch",
+                {
+                    "content": batch.tobytes(),
+                    "headers": {
+                        "content-type": "application/octet-stream",
+                        "x-shape": f"{BATCH_ROWS},{batch.shape[1]}",
+                        "accept": "application/octet-stream",
+                    },
+                },
+            )
+            for batch in batches
+        ],
+    }
+
+
+class Recorder:
+    """Latencies and status codes of requests that started after the warm-up"""
+
+    def __init__(self, measure_from):
+        self.measure_from = measure_from
+        self.latencies = []
+        self.errors = 0
+
+    def add(self, started, latency, ok):
+        if started < self.measure_from:
+            return
+        if ok:
+            self.latencies.append(latency)
+        else:
+            self.errors += 1
+
+
+async def check_scenario(client, name, requests):
+    """One request per scenario up front: a batch with rejected rows still
+    answers 200, so a payload of the wrong width would look like a fast run"""
+    path, kwargs = requests[0]
+    response = await client.post(path, **kwargs)
+    failed = response.headers.get("x-failed-rows")
+    content_type = response.headers.get("content-type", "")
+    if failed is None and content_type.startswith("application/json"):
+        failed = 0
+        if path.endswith("/batch"):
+            failed = response.json().get("failed", 0)
+    if response.status_code != 200 or int(failed or 0):
+        raise RuntimeError(
+            f"{name}: status {response.status_code}, "
+            f"failed rows {failed}: {response.text[:200]}"
+        )
+
+
+async def _send(client, request):
+    path, kwargs = request
+    try:
+        response = await client.post(path, **kwargs)
+        return response.status_code == 200
+    except Exception:
+        return False
+
+
+async def closed_loop(client, requests, concurrency, duration, warmup=1.0):
+    """``concurrency`` clients sending back to back; returns a Recorder"""
+    start = time.perf_counter()
+    recorder = Recorder(start + warmup)
+    deadline = start + warmup + duration
+
+    async def worker(offset):
+        i = offset
+        while time.perf_counter() < deadline:
+            sent = time.perf_counter()
+            ok = await _send(client, requests[i % len(requests)])
+            recorder.add(sent, time.perf_counter() - sent, ok)
+            i += concurrency
+
+    await asyncio.gather(*(worker(offset) for offset in range(concurrency)))
+    return recorder
+
+
+async def open_loop(
+    client, requests, rate, duration, warmup=1.0, seed=0, drain_seconds=30.0
+):
+    """Poisson arrivals at ``rate`` per second; returns a Recorder.
+
+    Latency is measured from the scheduled arrival time, not from when the
+    event loop got around to sending, so it includes client-side backlog.
+    """
+    rng = np.random.default_rng(seed)
+    start = time.perf_counter()
+    recorder = Recorder(start + warmup)
+    arrivals = start + np.cumsum(
+        rng.exponential(
+            1.0 / rate, size=int(rate * (warmup + duration) * 1.2) + 20
+        )
+    )
+    arrivals = arrivals[arrivals < start + warmup + duration]
+
+    async def one(scheduled, request):
+        ok = await _send(client, request)
+        recorder.add(scheduled, time.perf_counter() - scheduled, ok)
+
+    tasks = []
+    for i, scheduled in enumerate(arrivals):
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(
+            asyncio.ensure_future(one(scheduled, requests[i % len(requests)]))
+        )
+    done, pending = (
+        await asyncio.wait(tasks, timeout=drain_seconds) if tasks else ((), ())
+    )
+    for task in pending:
+        task.cancel()
+    recorder.errors += len(pending)
+    return recorder
+
+
+def summarize(recorder, duration, **key):
+    """One result row: the key fields plus throughput and latency
+    percentiles in ms
+    """
+    latencies = np.asarray(recorder.latencies) * 1e3
+    total = len(latencies) + recorder.errors
+    row = dict(key)
+    row.update(
+        requests=total,
+        errors=recorder.errors,
+        error_rate=recorder.errors / total if total else 0.0,
+        throughput=len(latencies) / duration,
+        mean_ms=float(latencies.mean()) if len(latencies) else None,
+    )
+    for q in PERCENTILES:
+        row[f"p{q:g}_ms".replace(".", "")] = (
+            float(np.percentile(latencies, q)) if len(latencies) else None
+        )
+    return row
+
+
+def result_key(row):
+    return (row["target"], row["scenario"], row["mode"], row["level"])
+
+
+def compare(results, baseline, tolerance=0.25):
+    """Regressions of ``results`` against ``baseline`` rows, as messages"""
+    reference = {result_key(row): row for row in baseline}
+    regressions = []
+    for row in results:
+        base = reference.get(result_key(row))
+        if base is None:
+            continue
+        name = "/".join(str(part) for part in result_key(row))
+        if row["error_rate"] > base["error_rate"] + 0.01:
+            regressions.append(
+                f"{name}: error rate {base['error_rate']:.2%} -> "
+                f"{row['error_rate']:.2%}"
+            )
+        if (base["p99_ms"] and row["p99_ms"] is not None
+                and row["p99_ms"] > base["p99_ms"] * (1 + tolerance)):
+            regressions.append(
+                f"{name}: p99 {base['p99_ms']:.2f}ms -> {row['p99_ms']:.2f}ms"
+            )
+        # Open-loop throughput is set by the arrival rate, not by the server
+        slower = row["throughput"] < base["throughput"] * (1 - tolerance)
+        if row["mode"] == "closed" and slower:
+            regressions.append(
+                f"{name}: throughput {base['throughput']:.0f}/s -> "
+                f"{row['throughput']:.0f}/s"
+            )
+    return regressions
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _fit_pipeline(root):
+    import joblib
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import Pipeline
+
+    from src.features.build_features import create_feature_pipeline
+
+    train = make_credit_frame(5_000)
+    X = train[FEATURE_COLUMNS]
+    pipeline = Pipeline([
+        ("preprocessor", create_feature_pipeline(X)),
+        ("classifier", LogisticRegression(max_iter=1000)),
+    ]).fit(X, train["DEFAULT"])
+    path = os.path.join(root, "model.pkl")
+    joblib.dump(pipeline, path)
+    return path
+
+
+def target_env(target, root):
+    env = dict(os.environ)
+    env.setdefault("MODEL_PATH", os.path.join(ROOT_DIR, "credit_model.onnx"))
+    if (
+        target == "api"
+        and "PIPELINE_MODEL_PATH" not in env
+        and env.get("MODEL_BACKEND", "sklearn") != "onnx"
+    ):
+        env["PIPELINE_MODEL_PATH"] = _fit_pipeline(root)
+    return env
+
+
+class UvicornServer:
+    """A target app served by uvicorn in a subprocess"""
+
+    def __init__(self, target, env, timeout=120.0):
+        self.port = _free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.ready_path = TARGETS[target]["ready"]
+        self.timeout = timeout
+        self.process = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "uvicorn",
+                TARGETS[target]["app"],
+                "--port",
+                str(self.port),
+                "--log-level",
+                "warning",
+                "--no-access-log",
+            ],
+            cwd=ROOT_DIR,
+            env=env,
+            stdout=subprocess.DEVNULL,
+        )
+
+    async def wait_ready(self, client):
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(
+                    f"server exited with status {self.process.returncode}"
+                )
+            try:
+                if (await client.get(self.ready_path)).status_code == 200:
+                    return
+            except Exception:
+                pass
+            await asyncio.sleep(0.2)
+        raise RuntimeError(f"server not ready after {self.timeout:.0f}s")
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+
+def _input_width(target, args):
+    if target != "onnx" or args.n_features is not None:
+        return args.n_features
+    n_features = onnx_input_width(
+        os.getenv("MODEL_PATH", os.path.join(ROOT_DIR, "credit_model.onnx"))
+    )
+    if n_features is None:
+        raise SystemExit("Cannot read the ONNX input width, pass --n-features")
+    return n_features
+
+
+async def _connect(target, args, root, **client_args):
+    """(client, server, lifespan) for --url, --inprocess or a new server"""
+    import httpx
+
+    if args.url:
+        return httpx.AsyncClient(base_url=args.url, **client_args), None, None
+    if args.inprocess:
+        import importlib
+
+        os.environ.update(target_env(target, root))
+        module = TARGETS[target]["app"].split(":")[0]
+        app = importlib.import_module(module).app
+        lifespan = app.router.lifespan_context(app)
+        await lifespan.__aenter__()
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app),
+            base_url="http://inprocess", **client_args
+        )
+        return client, None, lifespan
+    server = UvicornServer(target, target_env(target, root))
+    client = httpx.AsyncClient(base_url=server.url, **client_args)
+    return client, server, None
+
+
+async def _wait_ready(client, target, timeout=120):
+    deadline = time.monotonic() + timeout
+    while (await client.get(TARGETS[target]["ready"])).status_code != 200:
+        if time.monotonic() > deadline:
+            raise RuntimeError("server not ready")
+        await asyncio.sleep(0.2)
+
+
+async def run_target(target, args, root):
+    import httpx
+
+    scenarios = build_scenarios(target, _input_width(target, args))
+    names = [name for name in args.scenarios or scenarios if name in scenarios]
+    levels = [("closed", c) for c in args.concurrency if "closed" in args.mode]
+    levels += [("open", r) for r in args.rate if "open" in args.mode]
+    limits = httpx.Limits(
+        max_connections=max(args.concurrency + [64]),
+        max_keepalive_connections=None,
+    )
+    client, server, lifespan = await _connect(
+        target, args, root, limits=limits, timeout=httpx.Timeout(30.0)
+    )
+
+    results = []
+    try:
+        if server is not None:
+            await server.wait_ready(client)
+        else:
+            await _wait_ready(client, target)
+
+        for name in names:
+            await check_scenario(client, name, scenarios[name])
+        for name in names:
+            for mode, level in levels:
+                loop = closed_loop if mode == "closed" else open_loop
+                recorder = await loop(client, scenarios[name], level,
+                                      args.duration, args.warmup)
+                row = summarize(recorder, args.duration, target=target,
+                                scenario=name, mode=mode, level=level)
+                results.append(row)
+                print(format_row(row), flush=True)
+    finally:
+        await client.aclose()
+        if lifespan is not None:
+            await lifespan.__aexit__(None, None, None)
+        if server is not None:
+            server.stop()
+    return results
+
+
+def format_row(row):
+    def ms(value):
+        return f"{value:8.2f}" if value is not None else f"{'-':>8}"
+
+    return (
+        f"{row['target']:<5} {row['scenario']:<13} {row['mode']:<6} "
+        f"{row['level']:>5} {row['throughput']:9.1f} "
+        f"{ms(row['p50_ms'])} {ms(row['p95_ms'])} {ms(row['p99_ms'])} "
+        f"{ms(row['p999_ms'])} {row['error_rate']:7.2%}"
+    )
+
+
+def _ints(value):
+    return [int(item) for item in value.split(",") if item]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        "--target", nargs="+", choices=sorted(TARGETS), default=["onnx", "api"]
+    )
+    parser.add_argument(
+        "--scenarios",
+        nargs="+",
+        help="predict_json batch_json batch_npy batch_raw (default: all)",
+    )
+    parser.add_argument(
+        "--mode", nargs="+", choices=("closed", "open"), default=["closed"]
+    )
+    parser.add_argument("--concurrency", type=_ints, default=[1, 8, 32])
+    parser.add_argument(
+        "--rate",
+        type=_ints,
+        default=[50, 200],
+        help="requests per second (open loop)",
+    )
+    parser.add_argument(
+        "--duration",
+        type=float,
+        default=10.0,
+        help="measured seconds per level",
+    )
+    parser.add_argument(
+        "--warmup",
+        type=float,
+        default=2.0,
+        help="unmeasured seconds before each level",
+    )
+    parser.add_argument(
+        "--n-features",
+        type=int,
+        help="ONNX input width (default: read from MODEL_PATH)",
+    )
+    parser.add_argument(
+        "--url",
+        help="running server to test instead of starting one (single target)",
+    )
+    parser.add_argument(
+        "--inprocess",
+        action="store_true",
+        help="call the ASGI app directly, without HTTP",
+    )
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+    if args.url and len(args.target) > 1:
+        parser.error("--url needs a single --target")
+
+    print(
+        f"{'target':<5} {'scenario':<13} {'mode':<6} {'level':>5} "
+        f"{'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+        f"{'p99.9 ms':>8} {'errors':>7}"
+    )
+    results = []
+    with tempfile.TemporaryDirectory() as root:
+        for target in args.target:
+            results += asyncio.run(run_target(target, args, root))
+
+    report = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "duration": args.duration,
+            "server": ("url" if args.url else
+                       "inprocess" if args.inprocess else "uvicorn"),
+        },
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.save_baseline:
+        os.makedirs(
+            os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True
+        )
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline["results"], args.tolerance)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        if regressions:
+            sys.exit(1)
+        print(
+            f"No regressions against {args.baseline} "
+            f"(tolerance {args.tolerance:.0%})"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+"""Lazy re-exports for the package ``__init__`` modules (PEP 562)"""
+import sys
+from importlib import import_module
+
+
+def lazy_exports(package, exports):
+    """Module ``__getattr__`` and ``__dir__`` for ``package``.
+
+    ``exports`` maps each public name to the relative submodule defining it.
+    A name is imported on first access and then stored in the package, so
+    later lookups do not reach ``__getattr__`` again.
+    """
+
+    def __getattr__(name):
+        if name not in exports:
+            raise AttributeError(
+                f"module {package!r} has no attribute {name!r}"
+            )
+        value = getattr(import_module(exports[name], package), name)
+        setattr(sys.modules[package], name, value)
+        return value
+
+    def __dir__():
+        return sorted(set(vars(sys.modules[package])) | set(exports))
+
+    return __getattr__, __dir__
@@ -1,30 +1,194 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from pydantic import BaseModel
 from typing import List, Optional
-import pandas as pd
+from contextlib import asynccontextmanager
+from prometheus_client import make_asgi_app
 import numpy as np
 import os
-import sys
 
-# Add src to path
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# src.models, not models: onnx_model imports src.models.compiled, and the
+# same module under two names would be imported (and its classes defined) twice
+from src.models.artifact import default_model_path, load_compiled
+from src.models.onnx_model import ONNX_MODEL_PATH, load_onnx_model
+from src.models.policy import policy_store_from_env
+from src.serving.drift_tap import drift_tap_from_env
+from src.serving.executor import (
+    DEADLINE_HEADER,
+    Rejected,
+    call_worker_model,
+    inference_executor_from_env,
+    request_deadline,
+    share_worker_model,
+)
+from src.serving.model_manager import ModelManager
+from src.serving.response_cache import response_cache_from_env
+
 
-from models.predict_model import load_model
+@asynccontextmanager
+async def lifespan(app):
+    # Process workers are forked before the manager starts its poll thread
+    executor.start()
+    manager.start()
+    if drift_tap is not None:
+        drift_tap.start()
+    yield
+    manager.stop()
+    executor.shutdown()
+    if drift_tap is not None:
+        drift_tap.stop()
 
 app = FastAPI(
     title="Credit Scoring API",
     description="API for predicting credit default probability",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
+)
+app.mount("/metrics", make_asgi_app())
+
+# "sklearn" loads the joblib pipeline, "onnx" the exported ONNX artifact
+MODEL_BACKEND = os.getenv("MODEL_BACKEND", "sklearn")
+
+# Derived behaviour features of recently scored rows (FEATURE_CACHE_SIZE
+# rows, 0 disables); they do not depend on the model, so the cache is shared
+# by all loaded versions
+FEATURE_CACHE_SIZE = int(os.getenv("FEATURE_CACHE_SIZE", "0"))
+feature_cache = None
+if FEATURE_CACHE_SIZE > 0:
+    # src.features.behavior brings pandas and sklearn.base with it
+    from src.features.behavior import FeatureCache
+
+    feature_cache = FeatureCache(FEATURE_CACHE_SIZE)
+
+
+def load_scorer(path):
+    if MODEL_BACKEND == "onnx":
+        return load_onnx_model(path)
+    # Pipeline lowered to NumPy: no DataFrame and a single pass per request.
+    # Artifacts are memory-mapped, so process workers share their arrays
+    return load_compiled(path, feature_cache=feature_cache)
+
+
+def warm_up(scorer):
+    scorer.predict_proba(np.zeros((1, len(scorer.columns))))
+
+
+if MODEL_BACKEND == "onnx":
+    MODEL_PATH = os.getenv("ONNX_MODEL_PATH", ONNX_MODEL_PATH)
+else:
+    MODEL_PATH = os.getenv("PIPELINE_MODEL_PATH") or default_model_path()
+
+# Model file, directory of versions or registry index (*.json);
+# new versions are loaded in the background and swapped in atomically
+manager = ModelManager(
+    load_scorer,
+    os.getenv("MODEL_SOURCE", MODEL_PATH),
+    model_filename=os.path.basename(MODEL_PATH),
+    warmup=warm_up,
+    keep_versions=int(os.getenv("MODEL_KEEP_VERSIONS", "2")),
+    poll_interval=float(os.getenv("MODEL_POLL_SECONDS", "30"))
 )
 
+# Feature/score drift of live traffic as /metrics gauges, enabled by
+# DRIFT_REFERENCE_PATH; handlers only hand row references to a ring buffer
+drift_tap = drift_tap_from_env()
+
+
+def bind_drift_tap(new_version, old_version):
+    # Rows are projected onto the reference features by column name
+    scorer = manager.get()
+    try:
+        drift_tap.bind(scorer.columns, len(scorer.columns))
+    except ValueError as e:
+        print(f"Drift is not tracked for model version {new_version}: {e}")
+        return False
+    return True
+
+
+# Upper bound on rows per /predict/batch request
+MAX_BATCH_ROWS = int(os.getenv("MAX_BATCH_ROWS", "10000"))
+
+# Scoring runs off the event loop on a bounded pool of its own, so /health
+# and /metrics keep answering while it is saturated. The compiled sklearn
+# model is mostly Python and NumPy on small arrays and holds the GIL, so it
+# gets worker processes; calls beyond INFERENCE_QUEUE_DEPTH waiting ones are
+# refused with 429, and calls past their deadline with 503
+executor = inference_executor_from_env(
+    default_kind="process" if MODEL_BACKEND == "sklearn" else "thread",
+    name=MODEL_BACKEND
+)
+# Server-side request budget in ms (0 = none); X-Deadline-Ms can shorten it
+REQUEST_DEADLINE_MS = float(os.getenv("REQUEST_DEADLINE_MS", "0"))
+
+
+async def predict_proba(active, matrix, deadline):
+    """Probabilities of ``matrix`` from the active ModelVersion, on the
+    executor
+    """
+    if executor.kind == "process":
+        # Workers score with the model the server loaded before they forked;
+        # a version activated since is loaded from its path once and kept
+        return await executor.run(
+            call_worker_model,
+            load_scorer,
+            active.path,
+            active.version,
+            "predict_proba",
+            matrix,
+            deadline=deadline,
+        )
+    return await executor.run(
+        active.model.predict_proba, matrix, deadline=deadline
+    )
+
+
+# Risk bands and approval cut-offs, global or per segment (EDUCATION, AGE
+# band, ...), from the POLICY_PATH table; edits take effect within
+# POLICY_POLL_SECONDS without a model reload. A policy without a threshold
+# of its own uses the active model's, as the bulk scorer does
+policy_store = policy_store_from_env().bind(manager)
+
+# Serialized /predict responses of repeated payloads (RESPONSE_CACHE_SIZE
+# entries, 0 disables); cleared whenever the model or the policy changes
+response_cache = response_cache_from_env()
+if response_cache is not None:
+    response_cache.bind(manager)
+    response_cache.bind(policy_store)
+
+# Set when the service started misconfigured; /health answers 503 with it
+startup_error = None
+
+
+def start_model():
+    global startup_error
+    manager.check()
+    if manager.get() is None:
+        print(f"Error loading model: {manager.last_error}")
+    elif drift_tap is not None and not bind_drift_tap(manager.version, None):
+        # A reference the model's rows cannot be mapped onto is a
+        # configuration error. As with /startup in src/app.py, the service
+        # stays up for the probes to report it; versions picked up later
+        # only log the error
+        startup_error = (
+            "Drift reference does not match the features of model version "
+            f"{manager.version}"
+        )
+        return
+    if drift_tap is not None:
+        manager.add_listener(bind_drift_tap)
+
+
+def share_with_workers(new_version, old_version):
+    # Also covers pools started again after a worker died
+    active = manager.active
+    share_worker_model(active.path, active.version, active.model)
+
+
 # Load model
-try:
-    model = load_model()
-    model_loaded = True
-except Exception as e:
-    print(f"Error loading model: {e}")
-    model = None
-    model_loaded = False
+start_model()
+if executor.kind == "process":
+    if manager.active is not None:
+        share_with_workers(manager.version, None)
+    manager.add_listener(share_with_workers)
 
 class CreditData(BaseModel):
     LIMIT_BAL: float
@@ -56,54 +220,170 @@ class PredictionResponse(BaseModel):
     probability: float
     risk_level: str
 
+
+class BatchCreditData(BaseModel):
+    instances: List[CreditData]
+
+
+class BatchPredictionResponse(BaseModel):
+    model_version: Optional[str]
+    policy_version: str
+    predictions: List[int]
+    probabilities: List[float]
+    risk_levels: List[str]
+
+
 @app.get("/")
 async def root():
-    return {"message": "Credit Scoring API", "version": "1.0.0"}
+    return {
+        "message": "Credit Scoring API",
+        "version": "1.0.0",
+        "model_version": manager.version,
+    }
+
 
 @app.get("/health")
 async def health_check():
-    if not model_loaded:
+    if startup_error is not None:
+        raise HTTPException(status_code=503, detail=startup_error)
+    if manager.get() is None:
         raise HTTPException(status_code=503, detail="Model not loaded")
-    return {"status": "healthy", "model_loaded": model_loaded}
+    return {
+        "status": "healthy",
+        "model_loaded": True,
+        "model_version": manager.version,
+        "models": manager.status(),
+        "policy": policy_store.status()
+    }
+
 
 @app.post("/predict", response_model=PredictionResponse)
-async def predict(data: CreditData):
-    if not model_loaded:
+async def predict(data: CreditData, request: Request):
+    deadline = request_deadline(
+        request.headers.get(DEADLINE_HEADER), REQUEST_DEADLINE_MS
+    )
+    # One reference, so the row, the score and the cache key share a version
+    active = manager.active
+    if active is None:
         raise HTTPException(status_code=503, detail="Model not loaded")
+    scorer, version = active.model, active.version
+    policy = policy_store.get()
     
     try:
-        # Convert input to DataFrame
-        input_data = pd.DataFrame([data.dict()])
-        
+        # Feature row in the order the model was fitted on
+        input_data = scorer.row(data.model_dump())
+
+        # Repeated payload: the stored body, without scoring or drift sampling
+        cache = response_cache
+        key = None
+        if cache is not None:
+            key = cache.key(
+                input_data, f"{version}/{policy.version}", dtype=np.float64
+            )
+            body = await cache.aget(key)
+            if body is not None:
+                return Response(content=body, media_type="application/json")
+
         # Make prediction
-        prediction, probabilities = model.predict(input_data), model.predict_proba(input_data)
-        probability = probabilities[0, 1]
-        prediction_class = int(prediction[0])
-        
-        # Determine risk level
-        if probability < 0.3:
-            risk_level = "low"
-        elif probability < 0.7:
-            risk_level = "medium"
-        else:
-            risk_level = "high"
-        
-        return PredictionResponse(
-            prediction=prediction_class,
+        probability = float(
+            (await predict_proba(active, input_data, deadline))[0]
+        )
+        if drift_tap is not None:
+            drift_tap.offer(input_data, probability)
+
+        # Decision and risk level of the row's policy segment
+        decisions = policy.apply(
+            probability, policy.select(input_data, scorer.columns)
+        )
+
+        response = PredictionResponse(
+            prediction=int(decisions.prediction[0]),
             probability=round(probability, 4),
-            risk_level=risk_level
+            risk_level=str(decisions.risk_levels()[0])
+        )
+        if key is None:
+            return response
+        body = response.model_dump_json().encode()
+        await cache.aset(key, body)
+        return Response(content=body, media_type="application/json")
+
+    except Rejected as e:
+        raise HTTPException(
+            status_code=e.status_code, detail=str(e), headers=e.headers
         )
-    
     except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Prediction failed: {str(e)}")
+        raise HTTPException(
+            status_code=400, detail=f"Prediction failed: {str(e)}"
+        )
+
+
+@app.post("/predict/batch", response_model=BatchPredictionResponse)
+async def predict_batch(data: BatchCreditData, request: Request):
+    deadline = request_deadline(
+        request.headers.get(DEADLINE_HEADER), REQUEST_DEADLINE_MS
+    )
+    # Keep one reference so the whole batch is scored by the same version
+    active = manager.active
+    if active is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+    scorer, version = active.model, active.version
+    policy = policy_store.get()
+    if len(data.instances) > MAX_BATCH_ROWS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(data.instances)} rows "
+                   f"(max {MAX_BATCH_ROWS})",
+        )
+
+    try:
+        input_data = scorer.rows(
+            instance.model_dump() for instance in data.instances
+        )
+        probabilities = await predict_proba(active, input_data, deadline)
+        # Whole batch at once: a mask per segment condition, a searchsorted
+        # per segment
+        decisions = policy.apply(
+            probabilities, policy.select(input_data, scorer.columns)
+        )
+        if drift_tap is not None:
+            drift_tap.offer(input_data, probabilities)
+    except Rejected as e:
+        raise HTTPException(
+            status_code=e.status_code, detail=str(e), headers=e.headers
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=400, detail=f"Prediction failed: {str(e)}"
+        )
+
+    return BatchPredictionResponse(
+        model_version=version,
+        policy_version=policy.version,
+        predictions=decisions.prediction.tolist(),
+        probabilities=probabilities.tolist(),
+        risk_levels=decisions.risk_levels().tolist()
+    )
+
 
 @app.get("/model-info")
 async def model_info():
-    if not model_loaded:
+    scorer = manager.get()
+    if scorer is None:
         raise HTTPException(status_code=503, detail="Model not loaded")
     
+    model = getattr(scorer, "pipeline", None)
+    if model is None:
+        return {
+            "model_type": type(scorer).__name__,
+            "model_version": manager.version,
+            "backend": MODEL_BACKEND,
+            "features": scorer.columns
+        }
+
     return {
         "model_type": type(model).__name__,
+        "model_version": manager.version,
+        "backend": MODEL_BACKEND,
         "features": model[:-1].get_feature_names_out().tolist() if hasattr(model, 'get_feature_names_out') else []
     }
 
@@ -1,18 +1,88 @@
 from prometheus_fastapi_instrumentator import Instrumentator
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-import onnxruntime as ort
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, ValidationError
+from typing import Any
+from contextlib import asynccontextmanager
 import numpy as np
+import asyncio
+import threading
+import time
 import json
 import os
 
-app = FastAPI(title="Credit Scoring API")
+from src.serving import (
+    DEADLINE_HEADER,
+    MicroBatcher,
+    ModelManager,
+    OnnxScorer,
+    PayloadError,
+    PredictionMetrics,
+    Rejected,
+    SessionConfig,
+    SessionPool,
+    build_feature_matrix,
+    decode_matrix,
+    drift_tap_from_env,
+    encode_scores,
+    inference_executor_from_env,
+    negotiate,
+    parse_batch_sizes,
+    request_deadline,
+    response_cache_from_env,
+    split_valid_rows,
+    warm_up,
+)
+from src.serving import codecs
+from src.features.schema import FEATURE_COLUMNS
+from src.models.policy import policy_store_from_env
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Модель загружается и прогревается в фоне: /startup и /ready отвечают 503,
+    # пока прогрев не закончится
+    loader = asyncio.create_task(asyncio.to_thread(start_model))
+    if drift_tap is not None:
+        drift_tap.start()
+    yield
+    shutting_down.set()
+    await loader
+    manager.stop()
+    if drift_tap is not None:
+        drift_tap.stop()
+
+app = FastAPI(title="Credit Scoring API", lifespan=lifespan)
 instrumentator = Instrumentator()
 instrumentator.instrument(app).expose(app)
 
 # Пути к файлам модели
 MODEL_PATH = os.getenv("MODEL_PATH", "/app/credit_model.onnx")
-MODEL_DATA_PATH = os.path.join(os.path.dirname(MODEL_PATH), "credit_model.onnx.data")
+MODEL_DATA_PATH = MODEL_PATH + ".data"
+# Источник версий: файл модели, каталог версий или индекс реестра (*.json)
+MODEL_SOURCE = os.getenv("MODEL_SOURCE", MODEL_PATH)
+MODEL_POLL_SECONDS = float(os.getenv("MODEL_POLL_SECONDS", "30"))
+MODEL_KEEP_VERSIONS = int(os.getenv("MODEL_KEEP_VERSIONS", "2"))
+
+# Максимальное число строк в одном вызове session.run
+BATCH_SIZE = int(os.getenv("BATCH_SIZE", "32"))
+# Максимальное число строк в одном запросе /predict/batch
+MAX_BATCH_ROWS = int(os.getenv("MAX_BATCH_ROWS", "10000"))
+# Объединение параллельных /predict в один вызов модели
+MICROBATCH_ENABLED = os.getenv("MICROBATCH_ENABLED", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+MICROBATCH_WINDOW_MS = float(os.getenv("MICROBATCH_WINDOW_MS", "2"))
+# Прогрев: синтетические батчи каждого ожидаемого размера перед приемом трафика
+WARMUP_BATCH_SIZES = parse_batch_sizes(
+    os.getenv("WARMUP_BATCH_SIZES"), default=(1, BATCH_SIZE)
+)
+WARMUP_ROUNDS = int(os.getenv("WARMUP_ROUNDS", "3"))
+# Бюджет времени запроса в мс (0 - без ограничения); клиент может сузить
+# его заголовком X-Deadline-Ms
+REQUEST_DEADLINE_MS = float(os.getenv("REQUEST_DEADLINE_MS", "0"))
 
 # Проверка файлов
 print(f"Основной файл модели: {MODEL_PATH}")
@@ -21,65 +91,453 @@ print(f"Существует основной: {os.path.exists(MODEL_PATH)}")
 print(f"Существуют данные: {os.path.exists(MODEL_DATA_PATH)}")
 @app.get("/")
 async def root():
+    scorer = manager.get()
     return {
         "service": "Credit Scoring API",
         "version": "1.0.0",
         "status": "running",
         "model": {
-            "loaded": session is not None,
-            "path": MODEL_PATH,
-            "input_name": input_name if session else None,
-            "output_name": output_name if session else None
+            "loaded": scorer is not None,
+            "version": manager.version,
+            "path": manager.active.path if scorer else MODEL_PATH,
+            "input_name": model_input_name(scorer) if scorer else None,
+            "output_name": scorer.output_name if scorer else None
         },
         "endpoints": {
             "root": "GET /",
             "health": "GET /health",
+            "ready": "GET /ready",
+            "startup": "GET /startup",
             "predict": "POST /predict",
+            "predict_batch": "POST /predict/batch",
             "docs": "GET /docs",
             "openapi": "GET /openapi.json"
         },
         "documentation": "Visit /docs for interactive API documentation"
     }
-# Загружаем ONNX модель
-try:
-    session_options = ort.SessionOptions()
-    session = ort.InferenceSession(MODEL_PATH, session_options)
-    input_name = session.get_inputs()[0].name
-    output_name = session.get_outputs()[0].name
-    print(f"✅ Модель загружена. Вход: {input_name}, Выход: {output_name}")
-except Exception as e:
-    print(f"❌ Ошибка загрузки модели: {e}")
-    session = None
+
+# Настройки ONNX Runtime сессии: ORT_* и ORT_CONFIG_FILE
+SESSION_CONFIG = SessionConfig.from_env()
+
+
+def load_scorer(path):
+    # Один вход [batch, n] или по входу на каждый признак (экспорт из sklearn)
+    return OnnxScorer(SessionPool(path, SESSION_CONFIG), BATCH_SIZE)
+
+
+def warm_up_scorer(scorer):
+    duration = warm_up(
+        scorer.score, scorer.n_features, WARMUP_BATCH_SIZES, WARMUP_ROUNDS
+    )
+    print(
+        f"Прогрев модели: батчи {WARMUP_BATCH_SIZES} x {WARMUP_ROUNDS} "
+        f"за {duration:.3f} с"
+    )
+
+
+def model_input_name(scorer):
+    return (
+        scorer.input_names
+        if scorer.per_feature_inputs
+        else scorer.input_names[0]
+    )
+
+
+def feature_names(scorer):
+    # Экспорт из sklearn называет входы по признакам; единый вход [batch, n]
+    # считается входом в порядке схемы, только если совпадает число признаков
+    if scorer.per_feature_inputs:
+        return scorer.input_names
+    return FEATURE_COLUMNS if scorer.n_features == len(FEATURE_COLUMNS) else []
+
+
+def decide(policy, scores, matrix, scorer):
+    # Сегменты читают признаки по именам: для модели без них годится только
+    # политика без сегментов, иначе это ошибка конфигурации сервиса
+    try:
+        return policy.apply(
+            scores, policy.select(matrix, feature_names(scorer))
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=500, detail=f"Decision policy: {e}")
+
+
+# Загружаем ONNX модель; новые версии подхватываются в фоне без рестарта
+manager = ModelManager(
+    load_scorer,
+    MODEL_SOURCE,
+    model_filename=os.path.basename(MODEL_PATH),
+    warmup=warm_up_scorer,
+    keep_versions=MODEL_KEEP_VERSIONS,
+    poll_interval=MODEL_POLL_SECONDS,
+)
+startup_complete = threading.Event()
+shutting_down = threading.Event()
+
+# Метрики, на которые опираются алерты в prometheus-rules.yaml
+metrics = PredictionMetrics()
+metrics.set_model_loaded(False)
+manager.add_listener(
+    lambda new_version, old_version: metrics.set_model_loaded(True)
+)
+
+# Решающая политика (POLICY_PATH): пороги и уровни риска по сегментам.
+# Если файл задан, JSON-ответы дополняются prediction и risk_level;
+# изменения файла вступают в силу за POLICY_POLL_SECONDS без перезагрузки
+# модели. Политика без собственного порога берет порог активной модели
+policy_store = policy_store_from_env().bind(manager)
+
+# Кэш ответов /predict для повторных запросов с теми же признаками
+# (включается RESPONSE_CACHE_SIZE); ключ содержит версии модели и политики,
+# а при смене любой из них локальный кэш очищается
+response_cache = response_cache_from_env()
+if response_cache is not None:
+    response_cache.bind(manager)
+    response_cache.bind(policy_store)
+
+# Дрейф признаков и скора по живому трафику (включается DRIFT_REFERENCE_PATH);
+# обработчики только кладут ссылки на строки в кольцевой буфер
+drift_tap = drift_tap_from_env()
+
+
+def bind_drift_tap(new_version, old_version):
+    # Столбцы модели сопоставляются с признаками эталона по именам
+    scorer = manager.get()
+    try:
+        drift_tap.bind(feature_names(scorer), scorer.n_features)
+    except ValueError as e:
+        print(f"❌ Дрейф для версии {new_version} не считается: {e}")
+        return False
+    return True
+
+
+def start_model():
+    manager.check()
+    if drift_tap is not None:
+        # Эталон дрейфа, на который не ложатся строки модели, - ошибка
+        # конфигурации: сервис не проходит /startup. Версии, подхваченные
+        # позже, только пишут ошибку в лог
+        if manager.get() is not None and not bind_drift_tap(
+            manager.version, None
+        ):
+            return
+        manager.add_listener(bind_drift_tap)
+    if manager.get() is not None:
+        scorer = manager.get()
+        print(
+            f"✅ Модель {manager.version} загружена. "
+            f"Вход: {model_input_name(scorer)}, "
+            f"Выход: {scorer.output_name}, сессий: {SESSION_CONFIG.pool_size}"
+        )
+    else:
+        print(f"❌ Ошибка загрузки модели: {manager.last_error}")
+    startup_complete.set()
+    manager.start()
+
+
+def score_matrix(matrix, scorer=None):
+    scorer = scorer or manager.get()
+    start = time.perf_counter()
+    scores = scorer.score(matrix)
+    metrics.observe_inference(time.perf_counter() - start)
+    return scores
+
+
+# Инференс идет в отдельном пуле потоков (ONNX Runtime отпускает GIL), а не
+# в общем пуле Starlette, где работают синхронные /health и /metrics. Сверх
+# INFERENCE_QUEUE_DEPTH ожидающих вызовов запросы сразу получают 429
+executor = inference_executor_from_env(
+    SESSION_CONFIG.pool_size, name="onnx", kind="thread"
+)
+
+batcher = MicroBatcher(
+    score_matrix,
+    max_batch_size=BATCH_SIZE,
+    window_ms=MICROBATCH_WINDOW_MS,
+    executor=executor.pool,
+    concurrency=SESSION_CONFIG.pool_size,
+    max_pending=executor.capacity * BATCH_SIZE
+)
+
+
+def overloaded(error, version, rows=1):
+    # Сброс нагрузки (429/503) считается отдельно от неверного ввода
+    metrics.count("overloaded", version, rows)
+    return HTTPException(
+        status_code=error.status_code, detail=str(error), headers=error.headers
+    )
+
+
+def admitted_model():
+    # Одна ссылка на версию: скоры, метрики и ключ кэша относятся к ней,
+    # даже если модель сменится, пока запрос ждет в очереди
+    active = manager.active
+    if active is None:
+        metrics.count("error", None)
+        raise HTTPException(status_code=503, detail="Model not loaded")
+    return active.model, active.version
+
+
+def feature_row(features, n_features, version):
+    if n_features is not None and len(features) != n_features:
+        metrics.count("invalid", version)
+        raise HTTPException(
+            status_code=400,
+            detail=f"expected {n_features} features, got {len(features)}"
+        )
+    try:
+        with metrics.time_deserialization("predict"):
+            row = np.array(features, dtype=np.float32)
+    except Exception as e:
+        metrics.count("invalid", version)
+        raise HTTPException(status_code=400, detail=str(e))
+    # Проверка после приведения к float32: 1e300 конечно, а inf после
+    # приведения - нет
+    if not np.isfinite(row).all():
+        metrics.count("invalid", version)
+        raise HTTPException(
+            status_code=400, detail="features must be finite float32 values"
+        )
+    return row
+
 
 # Модель запроса
 class PredictionRequest(BaseModel):
     features: list[float]
 
+
+class BatchPredictionRequest(BaseModel):
+    # Строки проверяются по отдельности, чтобы одна ошибка не ломала весь батч
+    instances: list[Any]
+
+
 @app.get("/health")
 def health_check():
+    loaded = manager.get() is not None
     return {
-        "status": "healthy" if session is not None else "error",
-        "model_loaded": session is not None,
+        "status": "healthy" if loaded else "error",
+        "model_loaded": loaded,
+        "model_version": manager.version,
         "model_path": MODEL_PATH,
-        "data_path": MODEL_DATA_PATH
+        "data_path": MODEL_DATA_PATH,
+        "models": manager.status(),
+        "policy": policy_store.status()
     }
 
+
+@app.get("/startup")
+def startup_check():
+    if not startup_complete.is_set():
+        raise HTTPException(status_code=503, detail="Model is loading")
+    return {"status": "started", "model_version": manager.version}
+
+
+@app.get("/ready")
+def readiness_check():
+    if (
+        not startup_complete.is_set()
+        or shutting_down.is_set()
+        or manager.get() is None
+    ):
+        raise HTTPException(status_code=503, detail="Not ready")
+    return {"status": "ready", "model_version": manager.version}
+
+
 @app.post("/predict")
-def predict(request: PredictionRequest):
-    if session is None:
-        raise HTTPException(status_code=503, detail="Model not loaded")
-    
+async def predict(request: PredictionRequest, http_request: Request):
+    started = time.perf_counter()
+    deadline = request_deadline(
+        http_request.headers.get(DEADLINE_HEADER), REQUEST_DEADLINE_MS
+    )
+    scorer, version = admitted_model()
+    policy = policy_store.get() if policy_store.path else None
+    n_features = scorer.n_features
+    input_data = feature_row(request.features, n_features, version)
+
+    # Повторный запрос: готовый ответ без инференса и сериализации.
+    # Гистограмма скоров и дрейф видят только заново посчитанные строки
+    cache = response_cache
+    key = None
+    if cache is not None:
+        key = cache.key(
+            input_data,
+            version if policy is None else f"{version}/{policy.version}",
+        )
+        body = await cache.aget(key)
+        if body is not None:
+            metrics.count("success", version)
+            metrics.observe_request(
+                "predict", 1, time.perf_counter() - started
+            )
+            return Response(content=body, media_type=codecs.JSON)
+
     try:
-        input_data = np.array([request.features], dtype=np.float32)
-        prediction = session.run([output_name], {input_name: input_data})[0]
-        
-        return {
-            "score": float(prediction[0][0]),
-            "features_used": len(request.features)
+        if MICROBATCH_ENABLED and n_features is not None:
+            score = await batcher.submit(input_data, deadline, model=scorer)
+        else:
+            scores = await executor.run(
+                score_matrix,
+                input_data[np.newaxis, :],
+                scorer,
+                deadline=deadline,
+            )
+            score = float(scores[0])
+    except Rejected as e:
+        raise overloaded(e, version)
+    except Exception as e:
+        metrics.count("error", version)
+        raise HTTPException(status_code=400, detail=str(e))
+
+    metrics.count("success", version)
+    metrics.observe_score(score, version)
+    if drift_tap is not None:
+        drift_tap.offer(input_data, score)
+    payload = {"score": score, "features_used": len(request.features)}
+    if policy is not None:
+        decisions = decide(policy, score, input_data, scorer)
+        payload.update(
+            prediction=int(decisions.prediction[0]),
+            risk_level=str(decisions.risk_levels()[0]),
+        )
+    with metrics.time_serialization("predict"):
+        body = json.dumps(payload, allow_nan=False).encode()
+    if key is not None:
+        await cache.aset(key, body)
+    metrics.observe_request("predict", 1, time.perf_counter() - started)
+    return Response(content=body, media_type=codecs.JSON)
+
+BATCH_REQUEST_BODY = {
+    "required": True,
+    "content": {
+        codecs.JSON: {"schema": BatchPredictionRequest.model_json_schema()},
+        **{
+            content_type: {"schema": {"type": "string", "format": "binary"}}
+            for content_type in codecs.BINARY_TYPES
+        },
+    },
+}
+
+
+def decode_batch(headers, body, n_features, version):
+    # JSON проверяется построчно, бинарные форматы декодируются без
+    # копирования
+    content_type = codecs.media_type(headers.get("content-type"))
+    try:
+        if content_type == codecs.JSON:
+            rows = BatchPredictionRequest.model_validate_json(body).instances
+            n_rows = len(rows)
+        else:
+            matrix = decode_matrix(
+                content_type, body, headers.get(codecs.SHAPE_HEADER)
+            )
+            n_rows = matrix.shape[0]
+    except ValidationError as e:
+        metrics.count("invalid", version)
+        raise RequestValidationError(e.errors())
+    except PayloadError as e:
+        metrics.count("invalid", version)
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+    if n_rows > MAX_BATCH_ROWS:
+        metrics.count("invalid", version, n_rows)
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {n_rows} rows (max {MAX_BATCH_ROWS})"
+        )
+
+    if content_type == codecs.JSON:
+        return (n_rows, *build_feature_matrix(rows, n_features))
+    return (n_rows, *split_valid_rows(matrix, n_features))
+
+
+def batch_predictions(n_rows, valid_indices, errors, scores, policy, matrix,
+                      scorer):
+    # Ответ в порядке строк запроса
+    predictions = [None] * n_rows
+    for index, error in errors.items():
+        predictions[index] = {"index": index, "score": None, "error": error}
+    for index, score in zip(valid_indices, scores.tolist()):
+        predictions[index] = {
+            "index": int(index), "score": score, "error": None
         }
+    if policy is not None:
+        # Решения по всему батчу сразу; бинарные ответы несут только скоры
+        decisions = decide(policy, scores, matrix, scorer)
+        for index, prediction, risk_level in zip(
+            valid_indices, decisions.prediction.tolist(),
+            decisions.risk_levels().tolist()
+        ):
+            predictions[index].update(
+                prediction=prediction, risk_level=risk_level
+            )
+    return predictions
+
+
+@app.post("/predict/batch", openapi_extra={"requestBody": BATCH_REQUEST_BODY})
+async def predict_batch(request: Request):
+    started = time.perf_counter()
+    deadline = request_deadline(
+        request.headers.get(DEADLINE_HEADER), REQUEST_DEADLINE_MS
+    )
+    # Запрос целиком обслуживается версией модели, активной на момент приема
+    scorer, version = admitted_model()
+    policy = policy_store.get() if policy_store.path else None
+    n_features = scorer.n_features
+
+    response_type = negotiate(request.headers.get("accept"))
+    body = await request.body()
+    with metrics.time_deserialization("predict_batch"):
+        n_rows, matrix, valid_indices, errors = decode_batch(
+            request.headers, body, n_features, version
+        )
+
+    try:
+        scores = await executor.run(
+            score_matrix, matrix, scorer, deadline=deadline
+        )
+    except Rejected as e:
+        raise overloaded(e, version, n_rows)
     except Exception as e:
+        metrics.count("error", version, n_rows)
         raise HTTPException(status_code=400, detail=str(e))
 
+    metrics.count("success", version, len(valid_indices))
+    metrics.count("invalid", version, len(errors))
+    metrics.observe_scores(scores, version)
+    if drift_tap is not None:
+        drift_tap.offer(matrix, scores)
+
+    with metrics.time_serialization("predict_batch"):
+        if response_type != codecs.JSON:
+            # Невалидные строки возвращаются как NaN
+            all_scores = np.full(n_rows, np.nan, dtype=np.float32)
+            all_scores[valid_indices] = scores
+            response = Response(
+                content=encode_scores(all_scores, response_type),
+                media_type=response_type,
+                headers={
+                    codecs.SHAPE_HEADER: str(n_rows),
+                    "X-Failed-Rows": str(len(errors)),
+                },
+            )
+        else:
+            predictions = batch_predictions(
+                n_rows, valid_indices, errors, scores, policy, matrix, scorer
+            )
+            response = Response(
+                content=json.dumps({
+                    "predictions": predictions,
+                    "scored": len(valid_indices),
+                    "failed": len(errors)
+                }, allow_nan=False),
+                media_type=codecs.JSON
+            )
+
+    metrics.observe_request(
+        "predict_batch", n_rows, time.perf_counter() - started
+    )
+    return response
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
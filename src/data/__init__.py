@@ -0,0 +1,17 @@
+"""Compact, cached loading of the processed datasets.
+
+Names are imported from their submodule on first use, so importing the
+package does not load pandas and pyarrow.
+"""
+from src._lazy import lazy_exports
+
+_EXPORTS = {
+    "clear_cache": ".dataset",
+    "load_dataset": ".dataset",
+    "load_table": ".dataset",
+    "to_compact": ".dataset",
+}
+
+__all__ = list(_EXPORTS)
+
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
@@ -0,0 +1,158 @@
+"""Typed columnar access to the processed datasets.
+
+``data/processed/<name>.csv`` is converted once into a sibling Parquet file
+with compact dtypes (int8 codes, float32 amounts). Later loads read only the
+requested columns from the memory-mapped Parquet file, and frames are cached
+per process until the source changes.
+
+Usage: python -m src.data.dataset [data/processed]
+       (converts every CSV up front)
+"""
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.features.schema import COMPACT_DTYPES
+
+PROCESSED_DIR = 'data/processed'
+
+# Wider fallbacks, tried in order when a column does not fit its compact dtype
+WIDER_DTYPES = {
+    'int8': ('int16', 'int32', 'int64', 'float64'),
+    'float32': ('float64',),
+}
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def to_compact(frame):
+    """Cast known columns to COMPACT_DTYPES where that is lossless"""
+    columns = {}
+    for column, dtype in COMPACT_DTYPES.items():
+        if column not in frame.columns or frame[column].dtype == dtype:
+            continue
+        try:
+            values = frame[column].to_numpy(dtype='float64')
+        except (TypeError, ValueError):
+            # Non-numeric values: leave the column for validation to report
+            continue
+        for candidate in (dtype,) + WIDER_DTYPES.get(dtype, ()):
+            if np.dtype(candidate).kind in 'iu' and np.isnan(values).any():
+                continue
+            converted = values.astype(candidate)
+            if np.array_equal(
+                converted.astype('float64'), values, equal_nan=True
+            ):
+                columns[column] = converted
+                break
+    return frame.assign(**columns) if columns else frame
+
+
+def parquet_path(path):
+    return os.path.splitext(path)[0] + '.parquet'
+
+
+def dataset_path(name, root=PROCESSED_DIR):
+    return os.path.join(root, f'{name}.csv')
+
+
+def convert(path):
+    """Write the compact Parquet copy of a CSV file; returns its path"""
+    target = parquet_path(path)
+    frame = to_compact(pd.read_csv(path))
+    tmp_path = target + '.tmp'
+    frame.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, target)
+    return target
+
+
+def _source(path):
+    """Parquet file to read for ``path``, converting a CSV if needed"""
+    if path.endswith('.parquet'):
+        return path
+    target = parquet_path(path)
+    csv_exists = os.path.exists(path)
+    if os.path.exists(target) and (
+        not csv_exists or os.path.getmtime(target) >= os.path.getmtime(path)
+    ):
+        return target
+    if not csv_exists:
+        raise FileNotFoundError(f"Dataset not found: {path}")
+    try:
+        return convert(path)
+    except OSError as e:
+        # Read-only data directory: use the CSV and keep the result in memory
+        print(f"Cannot write {target} ({e}), reading {path} directly")
+        return None
+
+
+def load_table(path, columns=None):
+    """DataFrame of a processed CSV (via its Parquet copy) or Parquet file.
+
+    Only ``columns`` are read when given. Results are cached per process
+    and keyed by file modification time; treat them as read-only.
+    """
+    source = _source(path)
+    stat_path = source or path
+    key = (
+        os.path.abspath(stat_path),
+        os.path.getmtime(stat_path),
+        tuple(columns) if columns else None,
+    )
+    with _lock:
+        frame = _cache.get(key)
+    if frame is None:
+        if source is None:
+            frame = to_compact(pd.read_csv(path, usecols=columns))
+        else:
+            import pyarrow.parquet as pq
+
+            frame = pq.read_table(
+                source, columns=columns, memory_map=True
+            ).to_pandas()
+        with _lock:
+            # Older versions of the same file are dropped
+            for stale in [
+                cached
+                for cached in _cache
+                if cached[0] == key[0] and cached[1] != key[1]
+            ]:
+                del _cache[stale]
+            _cache[key] = frame
+    return frame.copy(deep=False)
+
+
+def load_dataset(name, columns=None, root=PROCESSED_DIR):
+    """``data/processed/<name>`` as a compact DataFrame, e.g.
+    load_dataset('train')
+    """
+    return load_table(dataset_path(name, root), columns)
+
+
+def clear_cache():
+    with _lock:
+        _cache.clear()
+
+
+def main():
+    root = sys.argv[1] if len(sys.argv) > 1 else PROCESSED_DIR
+    for filename in sorted(os.listdir(root)):
+        if not filename.endswith('.csv'):
+            continue
+        path = os.path.join(root, filename)
+        start = time.perf_counter()
+        target = convert(path)
+        elapsed = time.perf_counter() - start
+        print(
+            f"{path} -> {target}: {os.path.getsize(path) / 2**20:.1f} MiB -> "
+            f"{os.path.getsize(target) / 2**20:.1f} MiB in {elapsed:.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
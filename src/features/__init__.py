@@ -1,3 +1,28 @@
-from .build_features import create_feature_pipeline, get_feature_names
+"""Feature schema, preprocessing pipelines and their compiled plans.
 
-__all__ = ["create_feature_pipeline", "get_feature_names"]
\ No newline at end of file
+Names are imported from their submodule on first use: the schema is plain
+Python, while the pipelines and plans bring pandas and sklearn with them.
+"""
+from src._lazy import lazy_exports
+
+_EXPORTS = {
+    "compile_preprocessor": ".plan",
+    "derive_features": ".behavior",
+    "create_feature_pipeline": ".build_features",
+    "create_tree_pipeline": ".build_features",
+    "get_feature_names": ".build_features",
+    "BehaviorFeatures": ".behavior",
+    "FeatureCache": ".behavior",
+    "FeaturePlan": ".plan",
+    "CATEGORICAL_COLUMNS": ".schema",
+    "COMPACT_DTYPES": ".schema",
+    "DERIVED_COLUMNS": ".behavior",
+    "FEATURE_COLUMNS": ".schema",
+    "FLOAT_COLUMNS": ".schema",
+    "INTEGER_COLUMNS": ".schema",
+    "TARGET_COLUMN": ".schema",
+}
+
+__all__ = list(_EXPORTS)
+
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
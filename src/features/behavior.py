@@ -0,0 +1,210 @@
+"""Credit-behaviour features derived from the six-month UCI histories.
+
+``derive_features`` computes every feature for a whole matrix of raw rows
+with a few array operations (no per-row code), so training, the APIs and
+the bulk scorer share one implementation:
+
+- UTILIZATION, UTILIZATION_MEAN, UTILIZATION_MAX: bill amount over
+  LIMIT_BAL for the latest month, averaged and at its peak over six months
+- PAY_RATIO, PAY_RATIO_MEAN: share of the previous month's bill paid
+  (PAY_AMT<m> / BILL_AMT<m+1>, 1 when nothing was owed), clipped to [0, 1]
+- DELINQUENT_MONTHS, DELINQUENCY_STREAK, MAX_DELAY: months with a payment
+  delay, consecutive delayed months up to the latest one, longest delay
+- BILL_TREND: least-squares slope of the bill amount per month, as a
+  fraction of LIMIT_BAL
+
+``BehaviorFeatures`` is the sklearn step that appends them to a frame, and
+``FeatureCache`` keeps derived rows of repeat customers in an LRU.
+"""
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, TransformerMixin
+
+from src.features.schema import FEATURE_COLUMNS
+
+# Most recent month first, as in the UCI data
+PAY_STATUS_COLUMNS = ["PAY_0", "PAY_2", "PAY_3", "PAY_4", "PAY_5", "PAY_6"]
+BILL_COLUMNS = [f"BILL_AMT{month}" for month in range(1, 7)]
+PAYMENT_COLUMNS = [f"PAY_AMT{month}" for month in range(1, 7)]
+REQUIRED_COLUMNS = (
+    ["LIMIT_BAL"] + PAY_STATUS_COLUMNS + BILL_COLUMNS + PAYMENT_COLUMNS
+)
+
+DERIVED_COLUMNS = [
+    "UTILIZATION",
+    "UTILIZATION_MEAN",
+    "UTILIZATION_MAX",
+    "PAY_RATIO",
+    "PAY_RATIO_MEAN",
+    "DELINQUENT_MONTHS",
+    "DELINQUENCY_STREAK",
+    "MAX_DELAY",
+    "BILL_TREND",
+]
+
+# Slope weights for bills ordered BILL_AMT1 (latest, t=5) .. BILL_AMT6 (t=0)
+_months = np.arange(len(BILL_COLUMNS))[::-1].astype(np.float64)
+_TREND_WEIGHTS = (_months - _months.mean()) / (
+    (_months - _months.mean()) ** 2
+).sum()
+
+
+def _index(positions):
+    """A slice when the positions are consecutive (a view instead of a copy)"""
+    if all(b - a == 1 for a, b in zip(positions, positions[1:])):
+        return slice(positions[0], positions[-1] + 1)
+    return np.array(positions)
+
+
+@lru_cache(maxsize=32)
+def _positions(columns):
+    position = {column: index for index, column in enumerate(columns)}
+    missing = [column for column in REQUIRED_COLUMNS if column not in position]
+    if missing:
+        raise ValueError(
+            f"Cannot derive behaviour features without columns {missing}"
+        )
+    return (
+        slice(position["LIMIT_BAL"], position["LIMIT_BAL"] + 1),
+        _index([position[column] for column in PAY_STATUS_COLUMNS]),
+        _index([position[column] for column in BILL_COLUMNS]),
+        # PAY_AMT<m> settles the bill of the month before, BILL_AMT<m+1>
+        _index([position[column] for column in PAYMENT_COLUMNS[:-1]]),
+    )
+
+
+def derive_features(X, columns=FEATURE_COLUMNS):
+    """(rows x len(DERIVED_COLUMNS)) matrix for raw rows ``X`` in
+    ``columns`` order
+    """
+    X = np.asarray(X, dtype=np.float64)
+    if X.ndim == 1:
+        X = X[np.newaxis, :]
+    limit_index, status_index, bill_index, payment_index = _positions(
+        tuple(columns)
+    )
+
+    # Ufunc reductions directly: the ndarray.mean/max wrappers cost more
+    # than the arithmetic for single-row requests
+    limit = X[:, limit_index]
+    limit = np.where(limit > 0, limit, np.nan)
+    status = X[:, status_index]
+    bills = X[:, bill_index]
+    paid = X[:, payment_index]
+    owed = bills[:, 1:]
+
+    out = np.empty((X.shape[0], len(DERIVED_COLUMNS)))
+    utilization = bills / limit
+    out[:, 0] = utilization[:, 0]
+    out[:, 1] = np.add.reduce(utilization, axis=1) / utilization.shape[1]
+    out[:, 2] = np.maximum.reduce(utilization, axis=1)
+
+    pay_ratio = np.ones(paid.shape)
+    np.divide(paid, owed, out=pay_ratio, where=owed > 0)
+    np.minimum(np.maximum(pay_ratio, 0.0, out=pay_ratio), 1.0, out=pay_ratio)
+    out[:, 3] = pay_ratio[:, 0]
+    out[:, 4] = np.add.reduce(pay_ratio, axis=1) / pay_ratio.shape[1]
+
+    late = status > 0
+    out[:, 5] = np.add.reduce(late, axis=1)
+    out[:, 6] = np.add.reduce(np.logical_and.accumulate(late, axis=1), axis=1)
+    out[:, 7] = np.maximum(np.maximum.reduce(status, axis=1), 0.0)
+    # Elementwise rather than a matrix product, so a row gets the same value
+    # in any batch (BLAS blocking changes the rounding)
+    out[:, 8] = np.add.reduce(bills * _TREND_WEIGHTS, axis=1) / limit[:, 0]
+    return out
+
+
+class BehaviorFeatures(TransformerMixin, BaseEstimator):
+    """Pipeline step appending DERIVED_COLUMNS to the raw columns.
+
+    Stateless; fitting only records the input columns. compile_pipeline
+    lowers it to ``derive_features`` on the serving matrix.
+    """
+
+    def fit(self, X, y=None):
+        columns = X.columns if isinstance(X, pd.DataFrame) else FEATURE_COLUMNS
+        self.feature_names_in_ = np.asarray(columns, dtype=object)
+        self.n_features_in_ = len(columns)
+        return self
+
+    def transform(self, X):
+        if isinstance(X, pd.DataFrame):
+            derived = derive_features(
+                X[REQUIRED_COLUMNS].to_numpy(dtype=np.float64),
+                REQUIRED_COLUMNS,
+            )
+            return X.assign(
+                **{
+                    column: derived[:, j]
+                    for j, column in enumerate(DERIVED_COLUMNS)
+                }
+            )
+        X = np.asarray(X, dtype=np.float64)
+        return np.hstack([X, derive_features(X, list(self.feature_names_in_))])
+
+    def get_feature_names_out(self, input_features=None):
+        return np.asarray(
+            list(self.feature_names_in_) + DERIVED_COLUMNS, dtype=object
+        )
+
+
+class FeatureCache:
+    """LRU of derived feature rows, shared by all models of a process.
+
+    Rows are keyed by the caller's keys (e.g. ``(customer_id, month)``) or,
+    by default, by the raw row itself, so scoring the same customer and
+    statement month again skips the computation. Derived features do not
+    depend on the model, so entries stay valid across model swaps.
+    """
+
+    def __init__(self, maxsize=100_000):
+        self.maxsize = int(maxsize)
+        self.hits = 0
+        self.misses = 0
+        self._rows = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def derive(self, X, keys=None, columns=FEATURE_COLUMNS):
+        """derive_features(X, columns), reusing cached rows"""
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X[np.newaxis, :]
+        if keys is None:
+            layout = hash(tuple(columns))
+            keys = [(layout, row.tobytes()) for row in X]
+
+        out = np.empty((X.shape[0], len(DERIVED_COLUMNS)))
+        missed = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                row = self._rows.get(key)
+                if row is None:
+                    missed.append(i)
+                else:
+                    self._rows.move_to_end(key)
+                    out[i] = row
+            self.hits += len(keys) - len(missed)
+            self.misses += len(missed)
+        if not missed:
+            return out
+
+        computed = derive_features(X[missed], columns)
+        out[missed] = computed
+        with self._lock:
+            for i, row in zip(missed, computed):
+                self._rows[keys[i]] = row.copy()
+            while len(self._rows) > self.maxsize:
+                self._rows.popitem(last=False)
+        return out
+
+    def clear(self):
+        with self._lock:
+            self._rows.clear()
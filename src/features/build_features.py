@@ -1,6 +1,6 @@
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import StandardScaler, OneHotEncoder
+from sklearn.preprocessing import StandardScaler, OneHotEncoder, OrdinalEncoder
 from sklearn.compose import ColumnTransformer
 from sklearn.impute import SimpleImputer
 from sklearn.pipeline import Pipeline
@@ -9,7 +9,7 @@ def create_feature_pipeline(X_train):
     """Create feature preprocessing pipeline"""
     
     # Identify numeric and categorical columns
-    numeric_features = X_train.select_dtypes(include=['int64', 'float64']).columns.tolist()
+    numeric_features = X_train.select_dtypes(include='number').columns.tolist()
     categorical_features = X_train.select_dtypes(include=['object', 'category']).columns.tolist()
     
     # Remove target variable if present
@@ -38,12 +38,46 @@ def create_feature_pipeline(X_train):
     
     return preprocessor
 
+
+def create_tree_pipeline(X_train):
+    """Create preprocessing for histogram gradient boosting.
+
+    Numeric columns pass through unscaled with NaN kept (the model bins
+    values and learns where missing values go); string columns become
+    ordinal codes. The output is a DataFrame with the input column names,
+    so the classifier can refer to categorical columns by name.
+    """
+    numeric_features = X_train.select_dtypes(include='number').columns.tolist()
+    categorical_features = X_train.select_dtypes(
+        include=['object', 'category']
+    ).columns.tolist()
+
+    if 'DEFAULT' in numeric_features:
+        numeric_features.remove('DEFAULT')
+
+    preprocessor = ColumnTransformer(
+        transformers=[
+            ('num', 'passthrough', numeric_features),
+            (
+                'cat',
+                OrdinalEncoder(
+                    handle_unknown='use_encoded_value', unknown_value=np.nan
+                ),
+                categorical_features,
+            ),
+        ],
+        verbose_feature_names_out=False,
+    )
+
+    return preprocessor.set_output(transform='pandas')
+
+
 def get_feature_names(preprocessor, X_train):
     """Get feature names after preprocessing"""
     feature_names = []
     
     # Numeric features
-    numeric_features = X_train.select_dtypes(include=['int64', 'float64']).columns.tolist()
+    numeric_features = X_train.select_dtypes(include='number').columns.tolist()
     if 'DEFAULT' in numeric_features:
         numeric_features.remove('DEFAULT')
     feature_names.extend(numeric_features)
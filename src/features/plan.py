@@ -0,0 +1,495 @@
+"""Fitted preprocessing lowered to flat NumPy arrays.
+
+``compile_preprocessor`` turns a fitted ColumnTransformer of the kind
+``create_feature_pipeline`` and ``create_tree_pipeline`` build into a
+FeaturePlan: input column indices, imputation fill values, mean/scale
+vectors and sorted category tables with their output offsets.
+``FeaturePlan.transform`` reproduces ``preprocessor.transform`` on a 2-D
+array in a few vectorized operations, without DataFrame column selection
+or per-step validation, and the plan saves to a plain ``.npz`` file.
+
+Only compiling a plan needs sklearn, and applying one needs pandas only
+for DataFrame input, object-dtype values and large categorical batches;
+both are imported when first needed, so loading a saved plan stays cheap.
+"""
+import os
+import sys
+
+import numpy as np
+
+# Category codes of values that are not a fitted category, and of missing
+# values an OrdinalEncoder passes through as NaN
+UNKNOWN = -1
+MISSING = -2
+
+# Up to this many values, categories are looked up in a dict rather than
+# through pandas' vectorized indexer, whose setup dominates small batches
+SMALL_BATCH = 64
+
+
+def _is_frame(X):
+    # A DataFrame implies pandas is loaded; no need to import it to check
+    pd = sys.modules.get("pandas")
+    return pd is not None and isinstance(X, pd.DataFrame)
+
+
+def _isna(values):
+    """pd.isna of a 1-D array, without pandas for numeric and string arrays"""
+    if values.dtype.kind in "fc":
+        return np.isnan(values)
+    if values.dtype.kind in "biuUS":
+        return np.zeros(len(values), dtype=bool)
+    import pandas as pd
+
+    return pd.isna(values)
+
+
+class FeaturePlan:
+    """Numeric and categorical blocks of a fitted ColumnTransformer.
+
+    Numeric block: output ``numeric_output[k]`` is
+    ``(fill(X[:, numeric_index[k]]) - mean[k]) / scale[k]``, where NaN is
+    replaced by ``fill_values[k]`` (NaN fill: kept missing).
+
+    Categorical block, one entry per input column: the value is looked up in
+    ``categories[j]`` (sorted); ``codes[j]`` maps a table position to the
+    fitted category code. Missing values get ``missing_codes[j]``, which is
+    UNKNOWN when missing was not a fitted category and MISSING when it
+    stays NaN (ordinal columns). One-hot columns set output
+    ``output[j] + code``; ordinal columns write the code to ``output[j]``.
+    """
+
+    def __init__(self, columns, n_outputs, numeric_index, numeric_output,
+                 fill_values, mean, scale, categorical_index=(),
+                 categorical_output=(), categories=(), codes=(),
+                 missing_codes=(), one_hot=(), unknown_values=()):
+        self.columns = list(columns)
+        self.n_outputs = int(n_outputs)
+        self.numeric_index = np.asarray(numeric_index, dtype=np.intp)
+        self.numeric_output = np.asarray(numeric_output, dtype=np.intp)
+        self.fill_values = np.asarray(fill_values, dtype=np.float64)
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.categorical_index = np.asarray(categorical_index, dtype=np.intp)
+        self.categorical_output = np.asarray(categorical_output, dtype=np.intp)
+        self.categories = [np.asarray(table) for table in categories]
+        self.codes = [np.asarray(table, dtype=np.intp) for table in codes]
+        self.missing_codes = np.asarray(missing_codes, dtype=np.intp)
+        self.one_hot = np.asarray(one_hot, dtype=bool)
+        # Output for unknown categories: NaN or a code for ordinal columns,
+        # ignored (all zeros) for one-hot columns; None raises like sklearn
+        self.unknown_values = list(unknown_values)
+        self._imputes = not np.isnan(self.fill_values).all()
+        self._vectors = {}
+        self._indexes = {}
+        self._mappings = {}
+        n_inputs = len(self.columns)
+        # Every output is a scaled input column, in input order
+        self.affine = (
+            len(self.categorical_index) == 0
+            and self.n_outputs == n_inputs
+            and np.array_equal(self.numeric_index, np.arange(n_inputs))
+            and np.array_equal(self.numeric_output, np.arange(n_inputs))
+        )
+
+    def _numeric_vectors(self, dtype):
+        vectors = self._vectors.get(dtype)
+        if vectors is None:
+            vectors = self._vectors[dtype] = tuple(
+                vector.astype(dtype)
+                for vector in (self.fill_values, self.mean, self.scale)
+            )
+        return vectors
+
+    def _column(self, X, index):
+        if _is_frame(X):
+            return X[self.columns[index]].to_numpy()
+        return X[:, index]
+
+    def transform(self, X, dtype=np.float64):
+        """Preprocessed matrix for rows ``X``.
+
+        ``X`` is a 2-D array or a DataFrame with ``columns``. With
+        ``dtype=np.float32`` the arithmetic runs in single precision, which
+        is faster and within float32 rounding of sklearn's output.
+        """
+        is_frame = _is_frame(X)
+        if not is_frame:
+            X = np.asarray(X)
+            if X.ndim == 1:
+                X = X[np.newaxis, :]
+        numeric = self._numeric(X, is_frame, dtype)
+        if self.affine:
+            return numeric
+
+        out = np.zeros((numeric.shape[0], self.n_outputs), dtype=dtype)
+        out[:, self.numeric_output] = numeric
+        for j in range(len(self.categorical_index)):
+            self._encode(out, j, X)
+        return out
+
+    def _numeric(self, X, is_frame, dtype):
+        """Imputed and scaled numeric block of the rows"""
+        fill_values, mean, scale = self._numeric_vectors(dtype)
+        if is_frame:
+            names = [self.columns[i] for i in self.numeric_index]
+            numeric = X[names].to_numpy(dtype=dtype)
+        elif self.affine:
+            numeric = X.astype(dtype)
+        else:
+            numeric = X[:, self.numeric_index].astype(dtype)
+        if self._imputes:
+            missing = np.isnan(numeric)
+            if missing.any():
+                numeric = np.where(missing, fill_values, numeric)
+        return (numeric - mean) / scale
+
+    def _encode(self, out, j, X):
+        """Write categorical column ``j`` of the rows into ``out``"""
+        index = self.categorical_index[j]
+        values = self._column(X, index)
+        codes = self.lookup(j, values)
+        unknown = codes == UNKNOWN
+        if self.unknown_values[j] is None and unknown.any():
+            found = np.unique(values[unknown].astype(str)).tolist()
+            raise ValueError(
+                f"Found unknown categories {found} "
+                f"in column {self.columns[index]}"
+            )
+        start = self.categorical_output[j]
+        if self.one_hot[j]:
+            rows = np.flatnonzero(codes >= 0)
+            out[rows, start + codes[rows]] = 1
+        else:
+            fallback = np.where(unknown, self.unknown_values[j], np.nan)
+            out[:, start] = np.where(codes >= 0, codes, fallback)
+
+    def _index(self, j):
+        index = self._indexes.get(j)
+        if index is None:
+            import pandas as pd
+
+            index = self._indexes[j] = pd.Index(self.categories[j])
+        return index
+
+    def _mapping(self, j):
+        mapping = self._mappings.get(j)
+        if mapping is None:
+            pairs = zip(self.categories[j].tolist(), self.codes[j].tolist())
+            mapping = self._mappings[j] = dict(pairs)
+        return mapping
+
+    def lookup(self, j, values):
+        """Fitted category codes of ``values`` for categorical column ``j``.
+
+        Values that are not a fitted category get UNKNOWN, missing values
+        ``missing_codes[j]``.
+        """
+        values = np.asarray(values)
+        missing = _isna(values)
+        codes = np.full(len(values), UNKNOWN, dtype=np.intp)
+        codes[missing] = self.missing_codes[j]
+        if len(self.categories[j]) == 0 or missing.all():
+            return codes
+
+        # Hash lookups; values of another type than the categories are unknown
+        present = values[~missing]
+        if len(present) <= SMALL_BATCH:
+            mapping = self._mapping(j)
+            codes[~missing] = [
+                mapping.get(value, UNKNOWN) for value in present.tolist()
+            ]
+            return codes
+        positions = self._index(j).get_indexer(present)
+        found = positions >= 0
+        rows = np.flatnonzero(~missing)[found]
+        codes[rows] = self.codes[j][positions[found]]
+        return codes
+
+    def arrays(self):
+        """The plan as named NumPy arrays (strings and numbers only)"""
+        tables = {}
+        for j, table in enumerate(self.categories):
+            tables[f"categories_{j}"] = table
+            tables[f"codes_{j}"] = self.codes[j]
+        unknown = self.unknown_values
+        return dict(
+            columns=np.array(self.columns),
+            n_outputs=np.array(self.n_outputs),
+            numeric_index=self.numeric_index,
+            numeric_output=self.numeric_output,
+            fill_values=self.fill_values,
+            mean=self.mean,
+            scale=self.scale,
+            categorical_index=self.categorical_index,
+            categorical_output=self.categorical_output,
+            missing_codes=self.missing_codes,
+            one_hot=self.one_hot,
+            # None (raise on unknown) is stored as a mask next to the values
+            unknown_values=np.array(
+                [np.nan if value is None else value for value in unknown]
+            ),
+            unknown_raises=np.array(
+                [value is None for value in unknown], dtype=bool
+            ),
+            **tables,
+        )
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Rebuild a plan from ``arrays()``.
+
+        Arrays of the right dtype are used without copying.
+        """
+        n_categorical = len(arrays["categorical_index"])
+        unknown_values = [
+            None if raises else float(value)
+            for value, raises in zip(arrays["unknown_values"],
+                                     arrays["unknown_raises"])
+        ]
+        return cls(
+            arrays["columns"].tolist(), int(arrays["n_outputs"]),
+            arrays["numeric_index"], arrays["numeric_output"],
+            arrays["fill_values"], arrays["mean"], arrays["scale"],
+            arrays["categorical_index"], arrays["categorical_output"],
+            [arrays[f"categories_{j}"] for j in range(n_categorical)],
+            [arrays[f"codes_{j}"] for j in range(n_categorical)],
+            arrays["missing_codes"], arrays["one_hot"], unknown_values,
+        )
+
+    def save(self, path):
+        """Write the plan to an ``.npz`` file (no pickled objects),
+        atomically
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, **self.arrays())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as f:
+            return cls.from_arrays({name: f[name] for name in f.files})
+
+
+def _is_nan(value):
+    return isinstance(value, float) and np.isnan(value)
+
+
+def _is_identity(step):
+    from sklearn.preprocessing import FunctionTransformer
+
+    # A fitted ColumnTransformer stores 'passthrough' as FunctionTransformer()
+    return (step is None or (isinstance(step, str) and step == "passthrough")
+            or (isinstance(step, FunctionTransformer) and step.func is None))
+
+
+def _steps(transformer):
+    """Fitted steps of a ColumnTransformer entry, without passthrough"""
+    from sklearn.pipeline import Pipeline
+
+    if isinstance(transformer, str) and transformer != "passthrough":
+        return None
+    if isinstance(transformer, Pipeline):
+        steps = [step for _, step in transformer.steps]
+    else:
+        steps = [transformer]
+    return [step for step in steps if not _is_identity(step)]
+
+
+def _numeric_block(steps, n_columns):
+    """(fill_values, mean, scale) of imputer -> scaler steps, or None"""
+    from sklearn.impute import SimpleImputer
+    from sklearn.preprocessing import StandardScaler
+
+    fill_values = np.full(n_columns, np.nan)
+    mean = np.zeros(n_columns)
+    scale = np.ones(n_columns)
+    if steps and isinstance(steps[0], SimpleImputer):
+        imputer = steps.pop(0)
+        statistics = np.asarray(imputer.statistics_)
+        if (imputer.add_indicator or not _is_nan(imputer.missing_values)
+                or statistics.dtype.kind not in "biuf"
+                or len(statistics) != n_columns
+                or np.isnan(statistics.astype(np.float64)).any()):
+            return None
+        fill_values = statistics.astype(np.float64)
+    if steps and isinstance(steps[0], StandardScaler):
+        scaler = steps.pop(0)
+        if scaler.with_mean:
+            mean = scaler.mean_
+        if scaler.with_std:
+            scale = scaler.scale_
+    if steps:
+        return None
+    return fill_values, mean, scale
+
+
+def _categorical_block(steps, n_columns):
+    """(fill values or None, encoder) of an imputer -> encoder chain, or
+    None
+    """
+    from sklearn.impute import SimpleImputer
+    from sklearn.preprocessing import OneHotEncoder, OrdinalEncoder
+
+    fills = [None] * n_columns
+    if steps and isinstance(steps[0], SimpleImputer):
+        imputer = steps.pop(0)
+        if (imputer.add_indicator or not _is_nan(imputer.missing_values)
+                or len(imputer.statistics_) != n_columns):
+            return None
+        fills = list(imputer.statistics_)
+    encoders = (OneHotEncoder, OrdinalEncoder)
+    if len(steps) != 1 or not isinstance(steps[0], encoders):
+        return None
+    encoder = steps[0]
+    if getattr(encoder, "_infrequent_enabled", False):
+        return None
+    if isinstance(encoder, OneHotEncoder) and encoder.drop_idx_ is not None:
+        return None
+    if (isinstance(encoder, OrdinalEncoder)
+            and not _is_nan(encoder.encoded_missing_value)):
+        return None
+    return fills, encoder
+
+
+def _category_table(categories, fill, one_hot):
+    """Sorted non-missing categories, their codes and the missing code"""
+    import pandas as pd
+
+    categories = np.asarray(categories)
+    missing = pd.isna(categories)
+    present = categories[~missing]
+    if present.dtype == object:
+        if not all(isinstance(value, str) for value in present):
+            return None
+        present = present.astype(str)
+    order = np.argsort(present, kind="stable")
+    codes = np.flatnonzero(~missing)[order]
+    table = present[order]
+
+    if fill is not None and not _is_nan(fill):
+        # The imputer replaces missing values before encoding
+        matches = []
+        if len(table):
+            fill = np.asarray(fill).astype(table.dtype)
+            matches = np.flatnonzero(table == fill)
+        missing_code = codes[matches[0]] if len(matches) else UNKNOWN
+    elif not one_hot:
+        # OrdinalEncoder encodes missing values as encoded_missing_value (NaN)
+        missing_code = MISSING
+    else:
+        missing_code = np.flatnonzero(missing)[0] if missing.any() else UNKNOWN
+    return table, codes, missing_code
+
+
+def _selected_indices(selected, columns):
+    selected = np.asarray(selected)
+    if selected.dtype == bool:
+        return np.flatnonzero(selected).tolist()
+    if selected.dtype.kind in "iu":
+        return selected.tolist()
+    position = {column: index for index, column in enumerate(columns)}
+    return [position[column] for column in selected.tolist()]
+
+
+def _numeric_entries(steps, indices, output):
+    """(index, output, fill, mean, scale) of each numeric column, or None"""
+    block = _numeric_block(list(steps), len(indices))
+    if block is None or output.stop - output.start != len(indices):
+        return None
+    fill_values, mean, scale = (
+        np.asarray(values, dtype=np.float64) for values in block
+    )
+    outputs = range(output.start, output.stop)
+    return list(zip(indices, outputs, fill_values, mean, scale))
+
+
+def _categorical_entries(steps, indices, output):
+    """(index, output, categories, codes, missing code, one-hot, unknown
+    value) of each column of an encoder entry, or None
+    """
+    from sklearn.preprocessing import OneHotEncoder
+
+    block = _categorical_block(list(steps), len(indices))
+    if block is None:
+        return None
+    fills, encoder = block
+    one_hot = isinstance(encoder, OneHotEncoder)
+    if one_hot:
+        unknown = None if encoder.handle_unknown == "error" else 0.0
+    elif encoder.handle_unknown == "use_encoded_value":
+        unknown = float(encoder.unknown_value)
+    else:
+        unknown = None
+
+    entries, position = [], output.start
+    for index, categories, fill in zip(indices, encoder.categories_, fills):
+        table = _category_table(categories, fill, one_hot)
+        if table is None:
+            return None
+        entries.append((index, position, *table, one_hot, unknown))
+        position += len(categories) if one_hot else 1
+    return entries if position == output.stop else None
+
+
+def _entries(transformer, indices, output):
+    """("numeric" or "categorical", per-column entries) of a ColumnTransformer
+    entry, or None
+    """
+    from sklearn.preprocessing import OneHotEncoder, OrdinalEncoder
+
+    steps = _steps(transformer)
+    if steps is None:
+        return None
+    encoders = (OneHotEncoder, OrdinalEncoder)
+    if any(isinstance(step, encoders) for step in steps):
+        entries = _categorical_entries(steps, indices, output)
+        kind = "categorical"
+    else:
+        entries = _numeric_entries(steps, indices, output)
+        kind = "numeric"
+    return None if entries is None else (kind, entries)
+
+
+def compile_preprocessor(preprocessor, columns):
+    """Lower a fitted ColumnTransformer to a FeaturePlan.
+
+    Supported entries are 'passthrough', SimpleImputer and/or StandardScaler
+    on numeric columns, and an optional SimpleImputer followed by a dense
+    OneHotEncoder (no drop, no infrequent categories) or an OrdinalEncoder.
+    Returns None for anything else, so callers can fall back to sklearn.
+    """
+    from sklearn.compose import ColumnTransformer
+
+    if not isinstance(preprocessor, ColumnTransformer):
+        return None
+    columns = list(columns)
+    numeric, categorical = [], []
+    covered = 0
+
+    for name, transformer, selected in preprocessor.transformers_:
+        if isinstance(transformer, str) and transformer == "drop":
+            continue
+        try:
+            indices = _selected_indices(selected, columns)
+        except KeyError:
+            return None
+        if not indices:
+            continue
+        output = preprocessor.output_indices_[name]
+        entries = _entries(transformer, indices, output)
+        if entries is None:
+            return None
+        kind, entries = entries
+        (categorical if kind == "categorical" else numeric).extend(entries)
+        covered += output.stop - output.start
+
+    outputs = preprocessor.output_indices_.values()
+    n_outputs = max([slice_.stop for slice_ in outputs] + [0])
+    if covered != n_outputs:
+        return None
+    # Entries per column -> one list per FeaturePlan argument
+    numeric = [list(values) for values in zip(*numeric)] or [[]] * 5
+    categorical = [list(values) for values in zip(*categorical)] or [[]] * 7
+    return FeaturePlan(columns, n_outputs, *numeric, *categorical)
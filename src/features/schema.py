@@ -0,0 +1,50 @@
+# Input schema of the UCI "Default of Credit Card Clients" data, in the
+# order the API models and the processed CSVs list it
+FEATURE_COLUMNS = [
+    "LIMIT_BAL",
+    "SEX",
+    "EDUCATION",
+    "MARRIAGE",
+    "AGE",
+    "PAY_0",
+    "PAY_2",
+    "PAY_3",
+    "PAY_4",
+    "PAY_5",
+    "PAY_6",
+    "BILL_AMT1",
+    "BILL_AMT2",
+    "BILL_AMT3",
+    "BILL_AMT4",
+    "BILL_AMT5",
+    "BILL_AMT6",
+    "PAY_AMT1",
+    "PAY_AMT2",
+    "PAY_AMT3",
+    "PAY_AMT4",
+    "PAY_AMT5",
+    "PAY_AMT6",
+]
+
+TARGET_COLUMN = "DEFAULT"
+
+# CreditData field types: amounts are floats, codes and counts are integers
+FLOAT_COLUMNS = (
+    ["LIMIT_BAL"]
+    + [f"BILL_AMT{month}" for month in range(1, 7)]
+    + [f"PAY_AMT{month}" for month in range(1, 7)]
+)
+INTEGER_COLUMNS = [
+    column for column in FEATURE_COLUMNS if column not in FLOAT_COLUMNS
+]
+
+# Unordered codes; tree models that support it split on them as categories
+CATEGORICAL_COLUMNS = ["SEX", "EDUCATION", "MARRIAGE"]
+
+# Narrowest dtypes that hold the UCI value ranges; the data layer widens a
+# column if a dataset does not fit (see src.data.dataset.to_compact)
+COMPACT_DTYPES = {
+    **{column: "float32" for column in FLOAT_COLUMNS},
+    **{column: "int8" for column in INTEGER_COLUMNS},
+    TARGET_COLUMN: "int8",
+}
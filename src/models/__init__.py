@@ -1,4 +1,24 @@
-from .train_model import ModelTrainer, train_model
-from .predict_model import predict, load_model
+"""Training, search, scoring and serving-side loading of credit models.
 
-__all__ = ["ModelTrainer", "train_model", "predict", "load_model"]
\ No newline at end of file
+Names are imported from their submodule on first use, so the serving apps
+can load a model without importing the training stack (mlflow, matplotlib,
+sklearn.metrics) that ``ModelTrainer`` needs.
+"""
+from src._lazy import lazy_exports
+
+_EXPORTS = {
+    "ModelTrainer": ".train_model",
+    "train_model": ".train_model",
+    "predict": ".predict_model",
+    "load_model": ".predict_model",
+    "compile_pipeline": ".compiled",
+    "save_artifact": ".artifact",
+    "load_artifact": ".artifact",
+    "load_compiled": ".artifact",
+    "load_policy": ".policy",
+    "PolicyStore": ".policy",
+}
+
+__all__ = list(_EXPORTS)
+
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
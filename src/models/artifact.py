@@ -0,0 +1,280 @@
+"""Model artifacts: compiled pipelines saved without pickle.
+
+An artifact is one file holding a JSON manifest and the raw arrays of a
+CompiledLinear or CompiledTrees model and its FeaturePlan::
+
+    b"CRMODEL\\0" | header length (uint64 LE) | manifest JSON | arrays
+
+The manifest records the feature schema (input columns, their dtypes and
+the derived columns the model appends), classes, decision threshold and
+risk bands, training metrics, and for every array its dtype, shape and
+offset, plus a SHA-256 of the array section. Arrays start on 64-byte
+boundaries, so the loader memory-maps the file and uses them in place:
+loading parses a small JSON document and builds no Python objects per
+tree node, nothing is unpickled, and worker processes that load the same
+file share its pages. Only numeric, boolean and fixed-width string dtypes
+are accepted, and the file does not depend on the sklearn version that
+trained the model.
+
+Pipelines that only compile to PipelineFallback (e.g. histogram gradient
+boosting) cannot be saved this way and stay joblib pickles.
+"""
+import hashlib
+import json
+import os
+import sys
+import time
+from functools import partial
+
+import numpy as np
+
+from src.features.schema import INTEGER_COLUMNS
+from src.models.compiled import (
+    CompiledLinear,
+    CompiledModel,
+    CompiledTrees,
+    DEFAULT_THRESHOLD,
+    compile_pipeline,
+)
+from src.models.policy import RISK_BANDS
+
+MAGIC = b"CRMODEL\0"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+# A manifest is a few KiB; anything larger is not an artifact
+MAX_HEADER_BYTES = 16 * 2**20
+ARTIFACT_PATH = "models/best_model.artifact"
+PICKLE_PATH = "models/best_model.pkl"
+
+MODEL_TYPES = {cls.__name__: cls for cls in (CompiledLinear, CompiledTrees)}
+
+
+def _align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def _check_dtype(name, dtype):
+    # Bool, integers, floats and fixed-width unicode; objects would need pickle
+    if dtype.kind not in "biufU" or dtype.hasobject:
+        raise ValueError(f"Array {name!r} has unsupported dtype {dtype}")
+
+
+def _digest(buffer):
+    return hashlib.sha256(memoryview(buffer)).hexdigest()
+
+
+def save_artifact(model, path=ARTIFACT_PATH, metrics=None, threshold=None,
+                  risk_bands=RISK_BANDS):
+    """Write a fitted pipeline (or a compiled model) as an artifact,
+    atomically.
+
+    Raises ValueError for pipelines that do not compile to a linear or
+    tree model. Returns the manifest.
+    """
+    if not isinstance(model, CompiledModel):
+        model = compile_pipeline(
+            model, threshold if threshold is not None else DEFAULT_THRESHOLD
+        )
+    if type(model).__name__ not in MODEL_TYPES:
+        raise ValueError(
+            f"{type(model).__name__} cannot be saved as an artifact, "
+            "keep the joblib pickle"
+        )
+
+    arrays = {name: getattr(model, name) for name in model.ARRAYS}
+    arrays.update(
+        {
+            f"plan/{name}": values
+            for name, values in model.plan.arrays().items()
+        }
+    )
+    entries, blocks, offset = {}, [], 0
+    for name, values in arrays.items():
+        values = np.asarray(values, order="C")
+        _check_dtype(name, values.dtype)
+        offset = _align(offset)
+        entries[name] = {
+            "dtype": values.dtype.str,
+            "shape": list(values.shape),
+            "offset": offset,
+        }
+        blocks.append((offset, values.tobytes()))
+        offset += values.nbytes
+    data = bytearray(offset)
+    for start, block in blocks:
+        data[start:start + len(block)] = block
+
+    source = getattr(model, "pipeline", None)
+    derived = (
+        [
+            column
+            for column in model.plan.columns
+            if column not in model.columns
+        ]
+        if model.derive
+        else []
+    )
+    manifest = {
+        "format": FORMAT_VERSION,
+        "model": type(model).__name__,
+        "estimator": type(source[-1]).__name__ if source is not None else None,
+        "columns": model.columns,
+        "dtypes": {
+            column: "int64" if column in INTEGER_COLUMNS else "float64"
+            for column in model.columns
+        },
+        "derived_columns": derived,
+        "classes": model.classes.tolist(),
+        "threshold": float(
+            threshold if threshold is not None else model.threshold
+        ),
+        "risk_bands": risk_bands,
+        "parameters": {
+            name: np.asarray(getattr(model, name)).item()
+            for name in model.SCALARS
+        },
+        "metrics": metrics or {},
+        "arrays": entries,
+        "sha256": _digest(data),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "library_versions": {
+            name: sys.modules[name].__version__
+            for name in ("numpy", "sklearn")
+            if name in sys.modules
+        },
+    }
+
+    header = json.dumps(manifest).encode()
+    padding = _align(len(MAGIC) + 8 + len(header)) - (
+        len(MAGIC) + 8 + len(header)
+    )
+    header += b" " * padding
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(len(header).to_bytes(8, "little"))
+        f.write(header)
+        f.write(data)
+    os.replace(tmp_path, path)
+    return manifest
+
+
+def is_artifact(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def read_manifest(path):
+    """(manifest, offset of the array section) of an artifact"""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a model artifact")
+        length = int.from_bytes(f.read(8), "little")
+        if length > min(MAX_HEADER_BYTES, os.fstat(f.fileno()).st_size):
+            raise ValueError(f"{path}: corrupt artifact header")
+        manifest = json.loads(f.read(length))
+    if manifest.get("format") != FORMAT_VERSION:
+        raise ValueError(
+            f"{path}: unsupported artifact format {manifest.get('format')!r}"
+        )
+    return manifest, len(MAGIC) + 8 + length
+
+
+def load_artifact(
+    path=ARTIFACT_PATH, mmap=True, verify=True, feature_cache=None
+):
+    """Scoring-ready CompiledLinear/CompiledTrees from an artifact.
+
+    With ``mmap`` the arrays stay in the page cache, shared by every process
+    that maps the file; ``verify`` checks the SHA-256 of the array section
+    first (reads the whole file). ``feature_cache`` serves derived features
+    of repeat rows, as in compile_pipeline.
+    """
+    manifest, start = read_manifest(path)
+    model_type = MODEL_TYPES.get(manifest["model"])
+    if model_type is None:
+        raise ValueError(f"{path}: unknown model type {manifest['model']!r}")
+
+    if mmap:
+        data = np.memmap(path, dtype=np.uint8, mode="r", offset=start)
+    else:
+        with open(path, "rb") as f:
+            f.seek(start)
+            data = np.frombuffer(f.read(), dtype=np.uint8)
+    if verify and _digest(data) != manifest["sha256"]:
+        raise ValueError(f"{path}: array checksum mismatch")
+
+    arrays = {}
+    for name, entry in manifest["arrays"].items():
+        dtype = np.dtype(entry["dtype"])
+        _check_dtype(name, dtype)
+        shape = tuple(int(size) for size in entry["shape"])
+        offset = int(entry["offset"])
+        end = offset + dtype.itemsize * int(np.prod(shape, dtype=np.int64))
+        if offset < 0 or end > len(data):
+            raise ValueError(f"{path}: array {name!r} lies outside the file")
+        arrays[name] = data[offset:end].view(dtype).reshape(shape)
+
+    from src.features.plan import FeaturePlan
+
+    plan = FeaturePlan.from_arrays(
+        {
+            name[5:]: values
+            for name, values in arrays.items()
+            if name.startswith("plan/")
+        }
+    )
+    model = model_type.from_arrays(
+        manifest["columns"], np.asarray(manifest["classes"]), plan,
+        threshold=manifest["threshold"],
+        **{name: arrays[name] for name in model_type.ARRAYS},
+        **manifest["parameters"],
+    )
+    if manifest["derived_columns"]:
+        from src.features.behavior import DERIVED_COLUMNS, derive_features
+
+        if manifest["derived_columns"] != DERIVED_COLUMNS:
+            raise ValueError(
+                f"{path}: saved with derived columns "
+                f"{manifest['derived_columns']}, "
+                f"this code computes {DERIVED_COLUMNS}"
+            )
+        derive = (
+            feature_cache.derive
+            if feature_cache is not None
+            else derive_features
+        )
+        model.derive = partial(derive, columns=model.columns)
+    model.manifest = manifest
+    return model
+
+
+def default_model_path():
+    """The artifact when training wrote one, else the joblib pickle"""
+    return ARTIFACT_PATH if os.path.exists(ARTIFACT_PATH) else PICKLE_PATH
+
+
+def load_compiled(path, feature_cache=None):
+    """Scoring model from an artifact, or from a joblib pipeline compiled to
+    NumPy
+    """
+    if is_artifact(path):
+        return load_artifact(path, feature_cache=feature_cache)
+    from src.models.predict_model import load_model
+
+    return compile_pipeline(load_model(path), feature_cache=feature_cache)
+
+
+def describe_artifact(path):
+    """Manifest of an artifact without the array table, for logs and CLIs"""
+    manifest, _ = read_manifest(path)
+    return {key: value for key, value in manifest.items() if key != "arrays"}
+
+
+if __name__ == "__main__":
+    for artifact_path in sys.argv[1:] or [ARTIFACT_PATH]:
+        print(json.dumps(describe_artifact(artifact_path), indent=2))
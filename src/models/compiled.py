@@ -0,0 +1,298 @@
+from functools import partial
+
+import numpy as np
+
+from src.features.schema import FEATURE_COLUMNS
+
+DEFAULT_THRESHOLD = 0.5
+
+
+def _expit(z):
+    return 1.0 / (1.0 + np.exp(-z))
+
+
+class CompiledModel:
+    """Base class for pipelines lowered to NumPy.
+
+    Input is a 2-D array with columns in ``self.columns`` order; output is
+    the probability of the positive class. The class label uses the same
+    rule as sklearn for binary classifiers (probability above threshold).
+    """
+
+    # Computes DERIVED_COLUMNS from the input rows when the pipeline starts
+    # with a BehaviorFeatures step; they are appended before the plan runs
+    derive = None
+
+    def __init__(self, columns, classes, threshold=DEFAULT_THRESHOLD):
+        self.columns = list(columns)
+        self.classes = np.asarray(classes)
+        self.threshold = threshold
+
+    def expand(self, X):
+        """Input rows with derived features appended, as the plan expects
+        them
+        """
+        if self.derive is None:
+            return X
+        X = np.asarray(X, dtype=np.float64).reshape(-1, len(self.columns))
+        return np.hstack([X, self.derive(X)])
+
+    def predict_proba(self, X):
+        raise NotImplementedError
+
+    def classify(self, probabilities):
+        """Class labels for positive-class probabilities"""
+        return self.classes[
+            (np.asarray(probabilities) > self.threshold).astype(np.intp)
+        ]
+
+    def predict(self, X):
+        return self.classify(self.predict_proba(X))
+
+    def row(self, record):
+        """Build a 1 x n_features row from a mapping of feature values"""
+        return self.rows([record])
+
+    def rows(self, records):
+        """Build an n_records x n_features matrix from mappings of feature
+        values
+        """
+        matrix = np.array(
+            [[record[column] for column in self.columns]
+             for record in records],
+            dtype=np.float64,
+        )
+        return matrix.reshape(-1, len(self.columns))
+
+
+class CompiledLinear(CompiledModel):
+    """Logistic regression over a FeaturePlan.
+
+    When the plan only imputes and scales the inputs in order, the scaler is
+    folded into the weights and scoring is one matrix-vector product.
+    """
+
+    # Model state besides the plan, as saved by src.models.artifact
+    ARRAYS = ("weights",)
+    SCALARS = ("bias",)
+
+    def __init__(
+        self,
+        columns,
+        classes,
+        plan,
+        coef,
+        intercept,
+        threshold=DEFAULT_THRESHOLD,
+    ):
+        super().__init__(columns, classes, threshold)
+        self.plan = plan
+        if plan.affine:
+            self.fill_values = plan.fill_values
+            self.weights = coef / plan.scale
+            self.bias = intercept - np.dot(plan.mean, self.weights)
+        else:
+            self.weights = coef
+            self.bias = intercept
+
+    @classmethod
+    def from_arrays(cls, columns, classes, plan, weights, bias,
+                    threshold=DEFAULT_THRESHOLD):
+        """Rebuild from the (already folded) ``weights`` and ``bias`` of a
+        compiled model
+        """
+        model = cls.__new__(cls)
+        CompiledModel.__init__(model, columns, classes, threshold)
+        model.plan = plan
+        if plan.affine:
+            model.fill_values = plan.fill_values
+        model.weights = weights
+        model.bias = bias
+        return model
+
+    def predict_proba(self, X):
+        X = self.expand(X)
+        if not self.plan.affine:
+            return _expit(self.plan.transform(X) @ self.weights + self.bias)
+        X = np.asarray(X, dtype=np.float64)
+        missing = np.isnan(X)
+        if missing.any():
+            X = np.where(missing, self.fill_values, X)
+        return _expit(X @ self.weights + self.bias)
+
+
+class CompiledTrees(CompiledModel):
+    """Binary gradient boosting with every tree flattened into node arrays.
+
+    All trees are packed into one set of arrays; leaves point to themselves
+    so a fixed number of vectorized steps walks every (row, tree) pair.
+    """
+
+    ARRAYS = ("roots", "children", "feature", "node_threshold", "value")
+    SCALARS = ("depth", "learning_rate", "baseline")
+
+    def __init__(self, columns, classes, plan, trees, learning_rate, baseline,
+                 threshold=DEFAULT_THRESHOLD):
+        super().__init__(columns, classes, threshold)
+        self.plan = plan
+        self.learning_rate = learning_rate
+        self.baseline = baseline
+
+        offsets = np.cumsum([0] + [tree.node_count for tree in trees[:-1]])
+        self.roots = offsets.astype(np.intp)
+        self.depth = max(tree.max_depth for tree in trees)
+
+        left, right, feature, threshold_, value = [], [], [], [], []
+        for offset, tree in zip(offsets, trees):
+            nodes = np.arange(tree.node_count)
+            is_leaf = tree.children_left == -1
+            left.append(np.where(is_leaf, nodes, tree.children_left) + offset)
+            right.append(
+                np.where(is_leaf, nodes, tree.children_right) + offset
+            )
+            feature.append(np.where(is_leaf, 0, tree.feature))
+            threshold_.append(np.where(is_leaf, np.inf, tree.threshold))
+            value.append(tree.value[:, 0, 0])
+
+        # children[2 * node + 1] is the left child, children[2 * node] the
+        # right one
+        self.children = np.stack(
+            [np.concatenate(right), np.concatenate(left)], axis=1
+        ).ravel().astype(np.intp)
+        self.feature = np.concatenate(feature).astype(np.intp)
+        self.node_threshold = np.concatenate(threshold_)
+        self.value = np.concatenate(value)
+
+    @classmethod
+    def from_arrays(
+        cls,
+        columns,
+        classes,
+        plan,
+        roots,
+        children,
+        feature,
+        node_threshold,
+        value,
+        depth,
+        learning_rate,
+        baseline,
+        threshold=DEFAULT_THRESHOLD,
+    ):
+        """Rebuild from the packed node arrays of a compiled model"""
+        model = cls.__new__(cls)
+        CompiledModel.__init__(model, columns, classes, threshold)
+        model.plan = plan
+        model.roots, model.children, model.feature = roots, children, feature
+        model.node_threshold, model.value = node_threshold, value
+        model.depth, model.learning_rate = depth, learning_rate
+        model.baseline = baseline
+        return model
+
+    def decision_function(self, X):
+        # Trees compare float32 features, like sklearn's tree traversal
+        Xt = self.plan.transform(self.expand(X)).astype(np.float32)
+        flat = Xt.ravel()
+        row_offsets = (np.arange(Xt.shape[0]) * Xt.shape[1])[:, np.newaxis]
+        nodes = np.broadcast_to(self.roots, (Xt.shape[0], len(self.roots)))
+        for _ in range(self.depth):
+            values = flat.take(row_offsets + self.feature.take(nodes))
+            go_left = values <= self.node_threshold.take(nodes)
+            nodes = self.children.take(2 * nodes + go_left)
+        leaves = self.value.take(nodes).sum(axis=1)
+        return self.baseline + self.learning_rate * leaves
+
+    def predict_proba(self, X):
+        return _expit(self.decision_function(X))
+
+
+class PipelineFallback(CompiledModel):
+    """Any other pipeline: one predict_proba call on a DataFrame"""
+
+    def __init__(self, pipeline, columns, threshold=DEFAULT_THRESHOLD):
+        super().__init__(columns, pipeline.classes_, threshold)
+        self.pipeline = pipeline
+
+    def predict_proba(self, X):
+        import pandas as pd
+
+        frame = pd.DataFrame(np.asarray(X), columns=self.columns)
+        return self.pipeline.predict_proba(frame)[:, 1]
+
+
+def compile_pipeline(pipeline, threshold=DEFAULT_THRESHOLD,
+                     feature_cache=None):
+    """Lower a fitted [behaviour features +] preprocessor + classifier
+    Pipeline.
+
+    ``feature_cache`` (a FeatureCache) serves derived features of repeat
+    rows when the pipeline computes them.
+    """
+    compiled = _compile(pipeline, threshold, feature_cache)
+    # Keep the source pipeline for introspection (feature names, model type)
+    compiled.pipeline = pipeline
+    return compiled
+
+
+def _compile(pipeline, threshold, feature_cache=None):
+    # Imported here, not at module level: the serving apps import this module
+    # for CompiledModel before (or without) loading an sklearn pipeline, and
+    # by the time one is compiled sklearn and pandas are loaded anyway
+    from sklearn.dummy import DummyClassifier
+    from sklearn.ensemble import GradientBoostingClassifier
+    from sklearn.linear_model import LogisticRegression
+
+    from src.features.behavior import (
+        DERIVED_COLUMNS,
+        BehaviorFeatures,
+        derive_features,
+    )
+    from src.features.plan import compile_preprocessor
+
+    columns = list(getattr(pipeline, "feature_names_in_", FEATURE_COLUMNS))
+    steps, derive, plan_columns = pipeline, None, columns
+    if isinstance(pipeline[0], BehaviorFeatures) and len(pipeline) > 1:
+        steps = pipeline[1:]
+        derive = partial(
+            (
+                feature_cache.derive
+                if feature_cache is not None
+                else derive_features
+            ),
+            columns=columns,
+        )
+        plan_columns = columns + DERIVED_COLUMNS
+    classifier = steps[-1]
+    preprocessor = steps[0] if len(steps) == 2 else None
+    plan = compile_preprocessor(preprocessor, plan_columns)
+
+    if plan is None or len(classifier.classes_) != 2:
+        return PipelineFallback(pipeline, columns, threshold)
+
+    if isinstance(classifier, LogisticRegression):
+        compiled = CompiledLinear(
+            columns, classifier.classes_, plan,
+            classifier.coef_[0], classifier.intercept_[0], threshold
+        )
+        compiled.derive = derive
+        return compiled
+
+    if isinstance(classifier, GradientBoostingClassifier):
+        init = classifier.init_
+        if init == "zero":
+            baseline = 0.0
+        elif isinstance(init, DummyClassifier) and init.strategy == "prior":
+            prior = init.class_prior_[1]
+            baseline = np.log(prior / (1 - prior))
+        else:
+            return PipelineFallback(pipeline, columns, threshold)
+
+        trees = [estimator.tree_ for estimator in classifier.estimators_[:, 0]]
+        compiled = CompiledTrees(
+            columns, classifier.classes_, plan, trees,
+            classifier.learning_rate, baseline, threshold
+        )
+        compiled.derive = derive
+        return compiled
+
+    return PipelineFallback(pipeline, columns, threshold)
@@ -0,0 +1,124 @@
+import os
+import numpy as np
+
+from src.features.schema import INTEGER_COLUMNS
+from src.models.compiled import CompiledModel, DEFAULT_THRESHOLD
+
+ONNX_MODEL_PATH = 'models/best_model.onnx'
+PROBABILITY_OUTPUT = 'probabilities'
+
+
+def onnx_input_types(columns):
+    """One named [None, 1] input per feature, typed like CreditData"""
+    from skl2onnx.common.data_types import FloatTensorType, Int64TensorType
+
+    return [
+        (
+            column,
+            (
+                Int64TensorType([None, 1])
+                if column in INTEGER_COLUMNS
+                else FloatTensorType([None, 1])
+            ),
+        )
+        for column in columns
+    ]
+
+
+def export_onnx(
+    pipeline, X_check, model_path=ONNX_MODEL_PATH, atol=1e-4, target_opset=17
+):
+    """Export a fitted Pipeline to ONNX and verify it against sklearn.
+
+    Tensor weights go to ``<model_path>.data`` next to the graph (linear and
+    tree converters keep their parameters as node attributes, in which case
+    no data file is needed and ``data_path`` is None). Raises ValueError
+    if ONNX probabilities on ``X_check`` differ from ``predict_proba`` by
+    more than ``atol``.
+    """
+    import onnx
+    from skl2onnx import convert_sklearn
+
+    columns = list(getattr(pipeline, 'feature_names_in_', X_check.columns))
+    onnx_model = convert_sklearn(
+        pipeline,
+        name='credit_scoring_pipeline',
+        initial_types=onnx_input_types(columns),
+        options={id(pipeline[-1]): {'zipmap': False}},
+        target_opset=target_opset,
+    )
+
+    os.makedirs(os.path.dirname(os.path.abspath(model_path)), exist_ok=True)
+    data_file = os.path.basename(model_path) + '.data'
+    data_path = os.path.join(
+        os.path.dirname(os.path.abspath(model_path)), data_file
+    )
+    if os.path.exists(data_path):
+        # onnx appends to an existing external-data file
+        os.remove(data_path)
+    onnx.save_model(
+        onnx_model, model_path,
+        save_as_external_data=True,
+        all_tensors_to_one_file=True,
+        location=data_file,
+        size_threshold=0,
+    )
+
+    onnx_scorer = load_onnx_model(model_path)
+    expected = pipeline.predict_proba(X_check[columns])[:, 1]
+    actual = onnx_scorer.predict_proba(
+        X_check[columns].to_numpy(dtype=np.float64)
+    )
+    max_abs_diff = float(np.max(np.abs(expected - actual)))
+    if max_abs_diff > atol:
+        raise ValueError(
+            "ONNX export mismatch: max |p_onnx - p_sklearn| = "
+            f"{max_abs_diff:.2e} > {atol:.0e}"
+        )
+
+    return {
+        'model_path': model_path,
+        'data_path': data_path if os.path.exists(data_path) else None,
+        'max_abs_diff': max_abs_diff,
+    }
+
+
+class OnnxPipelineModel(CompiledModel):
+    """Exported pipeline served through onnxruntime"""
+
+    def __init__(self, session, threshold=DEFAULT_THRESHOLD):
+        inputs = session.get_inputs()
+        super().__init__([item.name for item in inputs], [0, 1], threshold)
+        self.session = session
+        self.input_dtypes = [
+            np.int64 if item.type == 'tensor(int64)' else np.float32
+            for item in inputs
+        ]
+
+    def feed(self, X):
+        X = np.asarray(X)
+        return {
+            name: X[:, position:position + 1].astype(dtype)
+            for position, (name, dtype) in enumerate(
+                zip(self.columns, self.input_dtypes)
+            )
+        }
+
+    def predict_proba(self, X):
+        probabilities = self.session.run([PROBABILITY_OUTPUT], self.feed(X))[0]
+        return probabilities[:, 1].astype(np.float64)
+
+
+def load_onnx_model(model_path=ONNX_MODEL_PATH, threshold=DEFAULT_THRESHOLD):
+    """Load an exported pipeline for scoring with onnxruntime"""
+    import onnxruntime as ort
+
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"Model file not found: {model_path}")
+
+    options = ort.SessionOptions()
+    options.log_severity_level = 3
+    session = ort.InferenceSession(
+        model_path, options, providers=['CPUExecutionProvider']
+    )
+    return OnnxPipelineModel(session, threshold)
@@ -0,0 +1,428 @@
+"""Decision policy: risk bands and approval cut-offs as a declarative table.
+
+A policy is a JSON document::
+
+    {
+      "threshold": 0.5,
+      "bands": {"edges": [0.3, 0.7], "labels": ["low", "medium", "high"]},
+      "segments": [
+        {"name": "young", "when": {"AGE": {"min": 21, "max": 25}},
+         "threshold": 0.4,
+         "bands": {"edges": [0.2, 0.4, 0.7],
+                   "labels": ["low", "medium", "high", "very_high"]}},
+        {"name": "graduate_school", "when": {"EDUCATION": [1]},
+         "threshold": 0.55}
+      ]
+    }
+
+A row takes the first segment whose conditions all hold, else the top
+level. A condition is a list of values or a half-open ``{"min", "max"}``
+range over any column the caller passes: input features, or e.g. a product
+code column of a bulk scoring file. Segments inherit the threshold and
+bands they do not set. The prediction is 1 above the threshold, as in
+CompiledModel.classify, and the band of a probability is the number of
+edges at or below it, so the defaults give the API's former rule (< 0.3
+low, < 0.7 medium, else high).
+
+compile_policy turns the table into an edge array and a threshold per
+segment and one label table; DecisionPolicy.apply then labels a whole
+batch with NumPy: one mask per condition, then the band by comparing
+every row with its segment's edges (np.searchsorted per segment for long
+edge lists). PolicyStore re-reads the policy file when it changes, so
+cut-offs are edited without a redeploy or a model reload; bound to a
+ModelManager, it takes the active model's threshold for a policy that
+sets none.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.models.compiled import DEFAULT_THRESHOLD
+
+# Probability cut points of the risk levels the API reports
+RISK_BANDS = {"edges": [0.3, 0.7], "labels": ["low", "medium", "high"]}
+DEFAULT_SEGMENT = "default"
+# Up to this many band edges (or codes in a condition) one vectorized
+# comparison each beats a binary search (np.searchsorted, np.isin) over
+# every row; see benchmarks/bench_policy.py
+MAX_COMPARISONS = 8
+
+
+def _bands(spec, where):
+    try:
+        edges = np.asarray(spec["edges"], dtype=np.float64)
+        labels = [str(label) for label in spec["labels"]]
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(
+            f"{where}: bands need numeric 'edges' and 'labels' ({e})"
+        )
+    if edges.ndim != 1 or len(labels) != len(edges) + 1:
+        raise ValueError(
+            f"{where}: {edges.size} band edges need {edges.size + 1} labels, "
+            f"got {len(labels)}"
+        )
+    if not np.all(np.isfinite(edges)) or np.any(np.diff(edges) <= 0):
+        raise ValueError(f"{where}: band edges must be finite and increasing")
+    return edges, labels
+
+
+def _threshold(value, where):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{where}: threshold must be a number, got {value!r}")
+    if not 0.0 <= value <= 1.0:
+        raise ValueError(f"{where}: threshold {value} is not a probability")
+    return value
+
+
+def _condition(column, rule, where):
+    if isinstance(rule, dict):
+        if not rule or set(rule) - {"min", "max"}:
+            raise ValueError(
+                f"{where}: range on {column!r} takes 'min' and/or 'max'"
+            )
+        low, high = rule.get("min", -np.inf), rule.get("max", np.inf)
+        return column, "range", (float(low), float(high))
+    values = rule if isinstance(rule, list) else [rule]
+    if not values:
+        raise ValueError(f"{where}: empty value list for {column!r}")
+    return column, "in", np.asarray(values)
+
+
+@dataclass
+class Decisions:
+    """Per-row output of DecisionPolicy.apply"""
+    segment: np.ndarray
+    band: np.ndarray
+    prediction: np.ndarray
+    policy: "DecisionPolicy"
+
+    def risk_levels(self):
+        return self.policy.labels.take(self.band)
+
+    def segment_names(self):
+        return self.policy.segment_names.take(self.segment)
+
+
+class DecisionPolicy:
+    """A compiled policy table; the top level is the last segment.
+
+    ``band`` indexes the policy-wide ``labels`` table, so rows of segments
+    with different band sets are labelled by one ``take``.
+    """
+
+    def __init__(self, table, threshold=DEFAULT_THRESHOLD, bands=RISK_BANDS,
+                 version=DEFAULT_SEGMENT):
+        if not isinstance(table, dict):
+            raise ValueError("policy must be a JSON object")
+        known = {"threshold", "bands", "segments", "description"}
+        unknown = set(table) - known
+        if unknown:
+            raise ValueError(f"policy: unknown keys {sorted(unknown)}")
+        self.table = table
+        self.version = version
+
+        top_threshold = _threshold(table.get("threshold", threshold), "policy")
+        top_bands = _bands(table.get("bands", bands), "policy")
+        segments = table.get("segments", [])
+        if not isinstance(segments, list) or not all(
+            isinstance(segment, dict) for segment in segments
+        ):
+            raise ValueError("policy: 'segments' must be a list of objects")
+        names, conditions, edges, labels = [], [], [], []
+        thresholds, offsets = [], []
+        for position, segment in enumerate([*segments, None]):
+            if segment is None:
+                name, when = DEFAULT_SEGMENT, {}
+                segment_bands, segment_threshold = top_bands, top_threshold
+            else:
+                name = str(segment.get("name", f"segment_{position}"))
+                where = f"policy segment {name!r}"
+                when = segment.get("when")
+                if not isinstance(when, dict) or not when:
+                    raise ValueError(f"{where} needs a non-empty 'when'")
+                segment_bands = (
+                    _bands(segment["bands"], where)
+                    if "bands" in segment
+                    else top_bands
+                )
+                segment_threshold = _threshold(
+                    segment.get("threshold", top_threshold), where
+                )
+            if name in names:
+                raise ValueError(f"policy: duplicate segment name {name!r}")
+            names.append(name)
+            conditions.append(
+                [
+                    _condition(column, rule, f"policy segment {name!r}")
+                    for column, rule in when.items()
+                ]
+            )
+            edges.append(segment_bands[0])
+            offsets.append(len(labels))
+            labels.extend(segment_bands[1])
+            thresholds.append(segment_threshold)
+
+        self.segment_names = np.asarray(names)
+        self.conditions = conditions
+        self.edges = edges
+        self.offsets = np.asarray(offsets, dtype=np.intp)
+        # Edges padded with NaN to one row per segment, and the label index of
+        # each segment's top band: a row's band is its top minus the edges
+        # above the probability, which NaN padding never is
+        self.edge_table = np.full((len(edges), max(map(len, edges))), np.nan)
+        for index, segment_edges in enumerate(edges):
+            self.edge_table[index, :len(segment_edges)] = segment_edges
+        self.top = self.offsets + np.asarray(
+            [len(segment_edges) for segment_edges in edges], dtype=np.intp
+        )
+        self.labels = np.asarray(labels)
+        self.thresholds = np.asarray(thresholds, dtype=np.float64)
+        # Columns the conditions read, for callers slicing them out of a matrix
+        self.columns = sorted(
+            {column for segment in conditions for column, _, _ in segment}
+        )
+
+    def select(self, matrix, names):
+        """Condition columns of a 2-D ``matrix`` with ``names`` columns"""
+        matrix = np.asarray(matrix)
+        if matrix.ndim == 1:
+            matrix = matrix[np.newaxis, :]
+        position = {name: index for index, name in enumerate(names)}
+        return {
+            column: matrix[:, position[column]]
+            for column in self.columns
+            if column in position
+        }
+
+    def _matches(self, index, columns, n_rows):
+        mask = np.ones(n_rows, dtype=bool)
+        for column, kind, value in self.conditions[index]:
+            if column not in columns:
+                name = str(self.segment_names[index])
+                raise ValueError(
+                    f"policy segment {name!r} needs column {column!r}"
+                )
+            values = np.asarray(columns[column]).reshape(-1)
+            if kind == "range":
+                mask &= (values >= value[0]) & (values < value[1])
+            elif len(value) <= MAX_COMPARISONS:
+                hit = values == value[0]
+                for code in value[1:]:
+                    hit |= values == code
+                mask &= hit
+            else:
+                mask &= np.isin(values, value)
+        return mask
+
+    def apply(self, probabilities, columns=None):
+        """Segment, band and prediction of every row.
+
+        ``columns`` maps each name in ``self.columns`` to an array with one
+        value per probability; a policy without segments needs none.
+        """
+        probabilities = np.asarray(probabilities, dtype=np.float64).reshape(-1)
+        n_rows = len(probabilities)
+        default = len(self.edges) - 1
+        if default == 0:
+            # No segments: scalars instead of per-row lookups
+            segment = np.zeros(n_rows, dtype=np.intp)
+            band = np.full(n_rows, self.top[0], dtype=np.intp)
+            for edge in self.edges[0]:
+                band -= probabilities < edge
+            prediction = (probabilities > self.thresholds[0]).astype(np.int64)
+            return Decisions(segment, band, prediction, self)
+
+        columns = columns or {}
+        segment = np.full(n_rows, default, dtype=np.intp)
+        # Last segment first, so rows end up in the first one that matches
+        for index in range(default - 1, -1, -1):
+            segment = np.where(
+                self._matches(index, columns, n_rows), index, segment
+            )
+
+        if self.edge_table.shape[1] <= MAX_COMPARISONS:
+            band = self.top.take(segment)
+            for edges in self.edge_table.T:
+                band -= probabilities < edges.take(segment)
+        else:
+            band = np.empty(n_rows, dtype=np.intp)
+            for index, edges in enumerate(self.edges):
+                rows = np.flatnonzero(segment == index)
+                if rows.size:
+                    band[rows] = self.offsets[index] + np.searchsorted(
+                        edges, probabilities[rows], side="right"
+                    )
+        threshold = self.thresholds.take(segment)
+        prediction = (probabilities > threshold).astype(np.int64)
+        return Decisions(segment, band, prediction, self)
+
+    def describe(self):
+        segments = zip(self.segment_names.tolist(), self.thresholds,
+                       self.edges, self.offsets)
+        return {
+            "version": self.version,
+            "segments": [
+                {
+                    "name": name,
+                    "threshold": float(threshold),
+                    "edges": edges.tolist(),
+                    "labels": self.labels[offset:][:len(edges) + 1].tolist(),
+                }
+                for name, threshold, edges, offset in segments
+            ],
+        }
+
+
+def compile_policy(table=None, threshold=DEFAULT_THRESHOLD, bands=RISK_BANDS,
+                   version=DEFAULT_SEGMENT):
+    """DecisionPolicy from a policy table.
+
+    ``threshold`` and ``bands`` fill in a missing top level.
+    """
+    return DecisionPolicy(table or {}, threshold, bands, version)
+
+
+def load_policy(path=None, threshold=DEFAULT_THRESHOLD, bands=RISK_BANDS):
+    """Compiled policy file, versioned by a digest of its content.
+
+    Without a path, the built-in defaults.
+    """
+    if not path:
+        return compile_policy(threshold=threshold, bands=bands)
+    with open(path, "rb") as f:
+        data = f.read()
+    try:
+        table = json.loads(data)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"{path}: {e}")
+    return compile_policy(
+        table, threshold, bands, version=hashlib.sha256(data).hexdigest()[:12]
+    )
+
+
+class PolicyStore:
+    """The policy in ``path``, reloaded when the file changes.
+
+    ``get()`` stats the file at most every ``poll_interval`` seconds and
+    compiles it again when its modification time or size changed; callers
+    keep the returned policy for the whole request. A file that does not
+    parse or compile is reported in ``last_error`` and the previous policy
+    stays in force. Without a path the built-in bands apply. ``threshold``
+    is used when the policy sets none (see ``bind``).
+    """
+
+    def __init__(self, path=None, poll_interval=5.0,
+                 threshold=DEFAULT_THRESHOLD):
+        self.path = path or None
+        self.poll_interval = poll_interval
+        self.threshold = threshold
+        self.policy = compile_policy(threshold=threshold)
+        self.last_error = None
+        self._stamp = None
+        self._next_check = 0.0
+        self._listeners = []
+        self._lock = threading.Lock()
+        if self.path is not None:
+            self.check()
+
+    @property
+    def version(self):
+        return self.policy.version
+
+    def add_listener(self, callback):
+        """Call ``callback(new_version, old_version)`` after a policy change"""
+        self._listeners.append(callback)
+
+    def set_threshold(self, threshold):
+        """Compile the policy again with ``threshold`` as its default"""
+        with self._lock:
+            if threshold == self.threshold:
+                return
+            self.threshold = threshold
+            if self.path is None:
+                self.policy = compile_policy(threshold=threshold)
+                return
+            # The file has not changed, but must be compiled again
+            self._stamp = None
+            self._check()
+
+    def bind(self, manager):
+        """Follow the threshold of a ModelManager's active model"""
+        def follow(new_version=None, old_version=None):
+            scorer = manager.get()
+            if scorer is not None:
+                self.set_threshold(
+                    getattr(scorer, "threshold", DEFAULT_THRESHOLD)
+                )
+
+        manager.add_listener(follow)
+        follow()
+        return self
+
+    def get(self):
+        if self.path is not None and time.monotonic() >= self._next_check:
+            # Another request is already reloading: use the current policy
+            if self._lock.acquire(blocking=False):
+                try:
+                    self._check()
+                finally:
+                    self._lock.release()
+        return self.policy
+
+    def check(self):
+        """Load the file if it changed; True if a new policy took effect"""
+        with self._lock:
+            return self._check()
+
+    def _check(self):
+        self._next_check = time.monotonic() + self.poll_interval
+        try:
+            stat = os.stat(self.path)
+            stamp = (stat.st_mtime_ns, stat.st_size)
+            if stamp == self._stamp:
+                return False
+            # A broken file is not retried until it changes again
+            self._stamp = stamp
+            policy = load_policy(self.path, threshold=self.threshold)
+        except (OSError, ValueError) as e:
+            error = f"Cannot load policy {self.path}: {e}"
+            if error != self.last_error:
+                print(error)
+            self.last_error = error
+            return False
+
+        self.last_error = None
+        previous, self.policy = self.policy, policy
+        if policy.version == previous.version:
+            return False
+        segments = len(policy.edges) - 1
+        print(
+            f"Active decision policy: {policy.version} "
+            f"({segments} segment(s))"
+        )
+        for callback in self._listeners:
+            callback(policy.version, previous.version)
+        return True
+
+    def status(self):
+        return {
+            "path": self.path,
+            **self.policy.describe(),
+            "last_error": self.last_error,
+        }
+
+
+def policy_store_from_env():
+    """PolicyStore for POLICY_PATH (unset: built-in bands and threshold),
+    checked for changes every POLICY_POLL_SECONDS
+    """
+    return PolicyStore(
+        os.getenv("POLICY_PATH"), float(os.getenv("POLICY_POLL_SECONDS", "5"))
+    )
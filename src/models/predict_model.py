@@ -1,5 +1,4 @@
 import joblib
-import pandas as pd
 import numpy as np
 import os
 
@@ -16,10 +15,13 @@ def load_model(model_path: str = None):
 def predict(model, data):
     """Make predictions using trained model"""
     if isinstance(data, dict):
+        import pandas as pd
+
         data = pd.DataFrame([data])
     
-    predictions = model.predict(data)
+    # One pass through the pipeline; the label is the most probable class
     probabilities = model.predict_proba(data)
+    predictions = model.classes_.take(np.argmax(probabilities, axis=1))
     
     return predictions, probabilities
 
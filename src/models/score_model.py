@@ -0,0 +1,366 @@
+"""Offline bulk scoring of CSV/Parquet applicant files.
+
+Usage: python -m src.models.score_model INPUT OUTPUT_DIR
+           [--model models/best_model.artifact] [--policy policy.json]
+           [--workers N] [--chunksize ROWS] [--resume]
+
+The input is read in chunks which a process pool scores (each worker loads
+the model; artifacts are memory-mapped and shared); results are written in
+input order as ``OUTPUT_DIR/part-NNNNNN.parquet`` together with a
+checkpoint, so an interrupted run continues from the last written part with
+``--resume``. Predictions and risk levels come from the decision policy
+(src/models/policy.py), applied to each chunk as a whole; its segment
+conditions may read pass-through columns such as a product code.
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from src.features.schema import FEATURE_COLUMNS, TARGET_COLUMN
+from src.models.compiled import DEFAULT_THRESHOLD
+from src.models.policy import load_policy
+
+DEFAULT_MODEL_PATH = 'models/best_model.pkl'
+CHECKPOINT_FILE = '_checkpoint.json'
+SCORE_COLUMN = 'score'
+PREDICTION_COLUMN = 'prediction'
+RISK_COLUMN = 'risk_level'
+
+
+class BulkScorer:
+    """Feature matrix in, positive-class probabilities out; ``threshold`` is
+    the model's cut-off, which a policy without one of its own uses
+    """
+
+    def __init__(self, columns, predict_proba, threshold=DEFAULT_THRESHOLD):
+        self.columns = columns
+        self.predict_proba = predict_proba
+        self.threshold = threshold
+
+
+def load_bulk_scorer(model_path, batch_size=65536):
+    """Scorer for a model artifact, a joblib pipeline (compiled to NumPy) or
+    an ONNX model
+    """
+    if model_path.endswith('.onnx'):
+        from src.serving.scorer import OnnxScorer
+        from src.serving.session import SessionConfig, create_session
+
+        # One thread per session: parallelism comes from the process pool
+        scorer = OnnxScorer(
+            create_session(model_path, SessionConfig(intra_op_threads=1)),
+            batch_size,
+        )
+        columns = scorer.input_names if scorer.per_feature_inputs else None
+        return BulkScorer(
+            columns,
+            lambda X: scorer.score(
+                np.ascontiguousarray(X, dtype=np.float32)
+            ).astype(np.float64),
+        )
+
+    from src.models.artifact import load_compiled
+
+    compiled = load_compiled(model_path)
+    return BulkScorer(
+        compiled.columns, compiled.predict_proba, compiled.threshold
+    )
+
+
+def file_fingerprint(path, content_hash=False):
+    """Identity of an input or model file for checkpoint validation"""
+    stat = os.stat(path)
+    fingerprint = {
+        'path': os.path.abspath(path),
+        'size': stat.st_size,
+        'mtime': int(stat.st_mtime),
+    }
+    if content_hash:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        fingerprint['sha256'] = digest.hexdigest()
+    return fingerprint
+
+
+def iter_chunks(path, chunksize, skip_chunks=0):
+    """DataFrame chunks of ``chunksize`` rows from a CSV or Parquet file"""
+    if path.endswith('.parquet') or path.endswith('.pq'):
+        import pyarrow.parquet as pq
+
+        batches = pq.ParquetFile(path).iter_batches(batch_size=chunksize)
+        for index, batch in enumerate(batches):
+            if index >= skip_chunks:
+                yield batch.to_pandas()
+        return
+
+    with open(path, newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        # Already-scored records are skipped without building frames. The csv
+        # module follows quoted newlines like pandas does, and blank lines,
+        # which pandas drops, are not counted as rows
+        to_skip = skip_chunks * chunksize
+        while to_skip > 0:
+            record = next(reader, None)
+            if record is None:
+                break
+            if record:
+                to_skip -= 1
+        yield from pd.read_csv(
+            f, header=None, names=header, chunksize=chunksize
+        )
+
+
+_worker_scorer = None
+_worker_policy = None
+
+
+def _init_worker(model_path, batch_size, policy_path=None):
+    global _worker_scorer, _worker_policy
+    _worker_scorer = load_bulk_scorer(model_path, batch_size)
+    _worker_policy = load_policy(
+        policy_path, threshold=_worker_scorer.threshold
+    )
+
+
+def _score_matrix(features, policy_columns):
+    probabilities = _worker_scorer.predict_proba(features)
+    decisions = _worker_policy.apply(probabilities, policy_columns)
+    return probabilities, decisions.prediction, decisions.risk_levels()
+
+
+class _InlineExecutor:
+    """Executor interface for --workers 1, without pickling chunks"""
+
+    def submit(self, fn, *args):
+        from concurrent.futures import Future
+
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+    def shutdown(self, wait=True):
+        pass
+
+
+def _write_part(output_dir, index, frame):
+    path = os.path.join(output_dir, f'part-{index:06d}.parquet')
+    tmp_path = path + '.tmp'
+    frame.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def _write_checkpoint(output_dir, checkpoint):
+    path = os.path.join(output_dir, CHECKPOINT_FILE)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def _resume_from(checkpoint, output_dir, resume):
+    """Carry the progress of a previous run in ``output_dir`` over"""
+    path = os.path.join(output_dir, CHECKPOINT_FILE)
+    if not os.path.exists(path):
+        return
+    with open(path) as f:
+        previous = json.load(f)
+    if not resume:
+        raise FileExistsError(
+            f"{output_dir} holds a previous run; "
+            "pass --resume or use a new directory"
+        )
+    for key in ('input', 'model', 'policy', 'chunksize'):
+        if previous.get(key) != checkpoint[key]:
+            raise ValueError(
+                f"Cannot resume: {key} changed since the checkpoint "
+                "was written"
+            )
+    checkpoint.update(chunks_done=previous['chunks_done'],
+                      rows_done=previous['rows_done'])
+
+
+def _split_chunk(chunk, columns, policy, keep_features):
+    """Feature matrix, policy columns and the frame to write for a chunk"""
+    required = (
+        ("feature columns", columns),
+        ("columns the decision policy segments on", policy.columns),
+    )
+    for what, names in required:
+        missing = [name for name in names if name not in chunk.columns]
+        if missing:
+            raise ValueError(f"Input is missing {what}: {missing}")
+    features = chunk[columns].to_numpy(dtype=np.float64)
+    policy_columns = {
+        column: chunk[column].to_numpy() for column in policy.columns
+    }
+    # Only pass-through columns (ids etc.) wait in memory for the scores
+    if not keep_features:
+        chunk = chunk.drop(columns=[*columns, TARGET_COLUMN], errors='ignore')
+    return features, policy_columns, chunk
+
+
+def score_file(input_path, output_dir, model_path=DEFAULT_MODEL_PATH,
+               workers=None, chunksize=100_000, resume=False,
+               keep_features=False, feature_columns=None,
+               progress_seconds=10.0, policy_path=None):
+    """Score ``input_path`` into Parquet parts under ``output_dir``.
+
+    Returns a summary dict.
+    """
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(output_dir, exist_ok=True)
+
+    # The parent only needs the column layout; workers load their own copy
+    scorer = load_bulk_scorer(model_path, chunksize)
+    columns = list(feature_columns or scorer.columns or FEATURE_COLUMNS)
+    policy = load_policy(policy_path, threshold=scorer.threshold)
+    del scorer
+
+    checkpoint = {
+        'input': file_fingerprint(input_path),
+        'model': file_fingerprint(model_path, content_hash=True),
+        'policy': policy.version,
+        'chunksize': chunksize,
+        'chunks_done': 0,
+        'rows_done': 0,
+    }
+    _resume_from(checkpoint, output_dir, resume)
+
+    if workers > 1:
+        executor = ProcessPoolExecutor(
+            workers, initializer=_init_worker,
+            initargs=(model_path, chunksize, policy_path)
+        )
+    else:
+        _init_worker(model_path, chunksize, policy_path)
+        executor = _InlineExecutor()
+
+    start = time.perf_counter()
+    last_report = start
+    rows_scored = 0
+    # At most two chunks per worker are in flight, which bounds memory
+    pending = deque()
+    max_pending = 2 * workers
+
+    def finish_oldest():
+        nonlocal rows_scored, last_report
+        index, frame, future = pending.popleft()
+        probabilities, labels, risk_levels = future.result()
+        _write_part(output_dir, index, frame.assign(**{
+            SCORE_COLUMN: probabilities,
+            PREDICTION_COLUMN: labels,
+            RISK_COLUMN: risk_levels,
+        }))
+
+        rows_scored += len(frame)
+        checkpoint['chunks_done'] = index + 1
+        checkpoint['rows_done'] += len(frame)
+        _write_checkpoint(output_dir, checkpoint)
+
+        now = time.perf_counter()
+        if now - last_report >= progress_seconds:
+            rate = rows_scored / (now - start)
+            print(
+                f"{checkpoint['rows_done']:,} rows scored "
+                f"({rate:,.0f} rows/s)"
+            )
+            last_report = now
+
+    try:
+        done = checkpoint['chunks_done']
+        chunks = iter_chunks(input_path, chunksize, done)
+        for index, chunk in enumerate(chunks, start=done):
+            features, policy_columns, frame = _split_chunk(
+                chunk, columns, policy, keep_features
+            )
+            future = executor.submit(_score_matrix, features, policy_columns)
+            pending.append((index, frame, future))
+            if len(pending) >= max_pending:
+                finish_oldest()
+        while pending:
+            finish_oldest()
+    finally:
+        executor.shutdown(wait=True)
+
+    elapsed = time.perf_counter() - start
+    summary = {
+        'rows_scored': rows_scored,
+        'rows_total': checkpoint['rows_done'],
+        'parts': checkpoint['chunks_done'],
+        'workers': workers,
+        'seconds': round(elapsed, 3),
+        'rows_per_second': round(rows_scored / elapsed) if elapsed else None,
+        'policy': policy.version,
+    }
+    return summary
+
+
+def main():
+    from src.models.artifact import default_model_path
+
+    parser = argparse.ArgumentParser(
+        description="Bulk scoring of CSV/Parquet files into Parquet"
+    )
+    parser.add_argument(
+        "input", help="CSV or Parquet file with applicant features"
+    )
+    parser.add_argument(
+        "output", help="Output directory for part-*.parquet files"
+    )
+    parser.add_argument(
+        "--model", default=None,
+        help="model artifact, joblib pipeline or ONNX model (default: the "
+             "artifact training wrote, else the pipeline)"
+    )
+    parser.add_argument(
+        "--policy", default=None,
+        help="decision policy JSON with bands and thresholds (default: the "
+             "built-in risk bands and the model's threshold)"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None,
+        help="Worker processes (default: all cores)"
+    )
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    parser.add_argument(
+        "--resume", action="store_true",
+        help="Continue an interrupted run in OUTPUT"
+    )
+    parser.add_argument(
+        "--keep-features", action="store_true",
+        help="Copy feature columns to the output"
+    )
+    parser.add_argument(
+        "--features",
+        help="Comma-separated feature columns for models without named inputs"
+    )
+    args = parser.parse_args()
+
+    features = args.features.split(",") if args.features else None
+    summary = score_file(
+        args.input, args.output, args.model or default_model_path(),
+        workers=args.workers, chunksize=args.chunksize, resume=args.resume,
+        keep_features=args.keep_features, feature_columns=features,
+        policy_path=args.policy
+    )
+    print(
+        f"Scored {summary['rows_scored']:,} rows with {summary['workers']} "
+        f"worker(s) in {summary['seconds']:.1f}s "
+        f"({summary['rows_per_second'] or 0:,} rows/s), "
+        f"{summary['rows_total']:,} rows in {summary['parts']} parts "
+        f"under {args.output}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""Hyperparameter search for the model families ModelTrainer compares.
+
+Each family is searched with successive halving: every candidate is first
+scored on a small sample of the training rows and only the best fraction
+moves on to larger samples, so the full data set is fitted for a handful of
+candidates. The preprocessing step is cached per fold through
+``Pipeline(memory=...)``; its parameters never change between candidates,
+so it is fitted once per fold and sample size rather than once per
+candidate. Families run concurrently and split one worker budget.
+
+HistGradientBoosting ignores ``n_jobs`` and grows trees with OpenMP threads,
+one per core unless capped: fits in joblib workers get one thread each, and
+fits in the training process (families searched with one job, refits) at
+most a family's share of the cores.
+
+Families are registered by name in ``MODEL_FAMILIES``; a new backend is a
+function returning its SearchSpec, decorated with ``register_family``.
+"""
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable
+
+import numpy as np
+from joblib import Memory, parallel_config
+from sklearn.ensemble import (
+    GradientBoostingClassifier,
+    HistGradientBoostingClassifier,
+)
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import HalvingGridSearchCV
+from sklearn.pipeline import Pipeline
+from threadpoolctl import threadpool_limits
+
+from src.features.behavior import BehaviorFeatures
+from src.features.build_features import (
+    create_feature_pipeline,
+    create_tree_pipeline,
+)
+from src.features.schema import CATEGORICAL_COLUMNS
+
+RANDOM_STATE = 42
+
+MODEL_FAMILIES = {}
+DEFAULT_FAMILIES = (
+    "logistic_regression",
+    "gradient_boosting",
+    "hist_gradient_boosting",
+)
+
+
+@dataclass
+class SearchSpec:
+    """One model family: classifier, parameter grid and halving settings"""
+    name: str
+    classifier: object
+    param_grid: dict
+    cv: int = 5
+    factor: int = 3
+    # Builds the (unfitted) preprocessing step from the training frame
+    preprocessor: Callable = create_feature_pipeline
+
+
+@dataclass
+class SearchResult:
+    name: str
+    estimator: object = field(repr=False)
+    best_params: dict
+    best_score: float
+    n_candidates: list
+    n_resources: list
+    wall_seconds: float
+    cpu_seconds: float
+
+    def describe(self):
+        return (
+            f"{self.name}: cv roc_auc {self.best_score:.4f}, "
+            f"candidates {self.n_candidates} on {self.n_resources} rows, "
+            f"wall {self.wall_seconds:.1f}s, cpu {self.cpu_seconds:.1f}s"
+        )
+
+
+def register_family(name):
+    """Register a function returning the SearchSpec of a model family"""
+    def decorator(factory):
+        MODEL_FAMILIES[name] = factory
+        return factory
+    return decorator
+
+
+@register_family("logistic_regression")
+def logistic_regression_spec():
+    return SearchSpec(
+        "logistic_regression",
+        LogisticRegression(random_state=RANDOM_STATE, max_iter=1000),
+        {
+            'classifier__C': [0.1, 1, 10],
+            'classifier__penalty': ['l1', 'l2'],
+            'classifier__solver': ['liblinear'],
+        },
+        cv=5,
+    )
+
+
+@register_family("gradient_boosting")
+def gradient_boosting_spec():
+    return SearchSpec(
+        "gradient_boosting",
+        # Stops adding trees once 10 rounds bring no improvement on a
+        # 10% validation split of the fit data
+        GradientBoostingClassifier(
+            random_state=RANDOM_STATE, n_iter_no_change=10
+        ),
+        {
+            'classifier__n_estimators': [100, 200],
+            'classifier__learning_rate': [0.01, 0.1],
+            'classifier__max_depth': [3, 4],
+            'classifier__min_samples_split': [2, 5],
+        },
+        cv=3,
+        factor=4,
+    )
+
+
+@register_family("hist_gradient_boosting")
+def hist_gradient_boosting_spec():
+    return SearchSpec(
+        "hist_gradient_boosting",
+        # Features are binned into at most 255 levels once per fit and trees
+        # are grown on the bins with OpenMP threads. Categorical codes are
+        # split as categories; boosting stops when the loss on a 10%
+        # validation split has not improved for 10 iterations.
+        HistGradientBoostingClassifier(
+            max_iter=1000,
+            categorical_features=CATEGORICAL_COLUMNS,
+            early_stopping=True,
+            validation_fraction=0.1,
+            n_iter_no_change=10,
+            random_state=RANDOM_STATE,
+        ),
+        {
+            'classifier__learning_rate': [0.05, 0.1],
+            'classifier__max_leaf_nodes': [15, 31],
+            'classifier__min_samples_leaf': [20, 100],
+            'classifier__l2_regularization': [0.0, 1.0],
+        },
+        cv=3,
+        factor=4,
+        preprocessor=create_tree_pipeline,
+    )
+
+
+def default_specs(families=DEFAULT_FAMILIES):
+    """SearchSpecs of the named families, in order"""
+    unknown = [name for name in families if name not in MODEL_FAMILIES]
+    if unknown:
+        raise ValueError(
+            f"Unknown model families {unknown}; "
+            f"registered: {sorted(MODEL_FAMILIES)}"
+        )
+    return [MODEL_FAMILIES[name]() for name in families]
+
+
+def _cpu_seconds(search):
+    """Fit and score time summed over all folds, candidates and the refit.
+
+    Most fits run single-threaded in joblib workers, so this approximates
+    the CPU time the search consumed across processes (a lower bound for
+    multi-threaded histogram boosting).
+    """
+    results = search.cv_results_
+    per_candidate = (
+        np.asarray(results['mean_fit_time'])
+        + np.asarray(results['mean_score_time'])
+    ) * search.n_splits_
+    return float(per_candidate.sum() + getattr(search, 'refit_time_', 0.0))
+
+
+def run_search(
+    spec,
+    X,
+    y,
+    n_jobs=1,
+    cache_dir=None,
+    scoring='roc_auc',
+    derived_features=False,
+):
+    """Successive-halving search for one family; returns a SearchResult.
+
+    With ``derived_features`` the pipeline starts with a BehaviorFeatures
+    step, so the saved model computes them itself at serving time.
+    """
+    own_cache = cache_dir is None
+    cache_dir = cache_dir or tempfile.mkdtemp(prefix=f"search-{spec.name}-")
+    try:
+        steps = [
+            ('preprocessor', spec.preprocessor(X)),
+            ('classifier', spec.classifier),
+        ]
+        if derived_features:
+            features = BehaviorFeatures()
+            steps = [
+                ('features', features),
+                ('preprocessor', spec.preprocessor(features.fit_transform(X))),
+            ] + steps[1:]
+        pipeline = Pipeline(
+            steps=steps,
+            memory=Memory(os.path.join(cache_dir, spec.name), verbose=0),
+        )
+        search = HalvingGridSearchCV(
+            pipeline,
+            spec.param_grid,
+            cv=spec.cv,
+            factor=spec.factor,
+            scoring=scoring,
+            n_jobs=n_jobs,
+            random_state=RANDOM_STATE,
+        )
+        start = time.perf_counter()
+        # Both settings apply to the calling thread only (OpenMP keeps its
+        # thread count per thread), so concurrent families do not undo each
+        # other's limits
+        with threadpool_limits(limits=n_jobs, user_api="openmp"), \
+                parallel_config(backend="loky", inner_max_num_threads=1):
+            search.fit(X, y)
+        wall_seconds = time.perf_counter() - start
+
+        # The saved model must not point at the temporary cache
+        best = search.best_estimator_.set_params(memory=None)
+        return SearchResult(
+            name=spec.name,
+            estimator=best,
+            best_params=search.best_params_,
+            best_score=float(search.best_score_),
+            n_candidates=list(search.n_candidates_),
+            n_resources=list(search.n_resources_),
+            wall_seconds=wall_seconds,
+            cpu_seconds=_cpu_seconds(search),
+        )
+    finally:
+        if own_cache:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+def run_searches(specs, X, y, n_jobs=None, derived_features=False):
+    """Search all families concurrently; returns {name: SearchResult} in
+    spec order.
+
+    ``n_jobs`` (default: all cores) is split evenly between the families.
+    """
+    budget = n_jobs or os.cpu_count() or 1
+    per_family = max(1, budget // len(specs))
+    with ThreadPoolExecutor(max_workers=len(specs)) as executor:
+        futures = [
+            executor.submit(
+                run_search,
+                spec,
+                X,
+                y,
+                per_family,
+                derived_features=derived_features,
+            )
+            for spec in specs
+        ]
+        return {
+            spec.name: future.result() for spec, future in zip(specs, futures)
+        }
@@ -1,27 +1,61 @@
 import mlflow
 import mlflow.sklearn
-from sklearn.pipeline import Pipeline
-from sklearn.ensemble import GradientBoostingClassifier
-from sklearn.linear_model import LogisticRegression
-from sklearn.model_selection import GridSearchCV, RandomizedSearchCV
 from sklearn.metrics import roc_auc_score, precision_score, recall_score, f1_score, roc_curve
-import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import joblib
 import json
 import os
-from src.features.build_features import create_feature_pipeline
+import time
+from src.data.dataset import load_dataset
+from src.models.artifact import (
+    ARTIFACT_PATH,
+    PICKLE_PATH,
+    default_model_path,
+    save_artifact,
+)
+from src.models.onnx_model import ONNX_MODEL_PATH, export_onnx
+from src.models.search import (
+    DEFAULT_FAMILIES,
+    default_specs,
+    run_search,
+    run_searches,
+)
 
 class ModelTrainer:
-    def __init__(self, experiment_name="credit_scoring"):
+
+    def __init__(
+        self,
+        experiment_name="credit_scoring",
+        n_jobs=None,
+        families=None,
+        derived_features=None,
+    ):
         self.experiment_name = experiment_name
+        # Worker processes shared by all searches (None: all cores)
+        self.n_jobs = n_jobs
+        # Registered model families to compare (see src/models/search.py),
+        # e.g. MODEL_FAMILIES=hist_gradient_boosting for large training sets
+        if families is None:
+            families = os.getenv("MODEL_FAMILIES")
+            families = families.split(",") if families else DEFAULT_FAMILIES
+        self.families = list(families)
+        # Prepend the behaviour features of src/features/behavior.py to every
+        # pipeline (DERIVED_FEATURES=1); the saved model computes them itself
+        if derived_features is None:
+            derived_features = os.getenv("DERIVED_FEATURES", "").lower() in (
+                "1",
+                "true",
+                "yes",
+            )
+        self.derived_features = derived_features
         mlflow.set_experiment(experiment_name)
-        
+
     def load_data(self):
         """Load processed data"""
-        train_df = pd.read_csv("data/processed/train.csv")
-        test_df = pd.read_csv("data/processed/test.csv")
+        # Compact Parquet copies of data/processed/*.csv, cached per process
+        train_df = load_dataset("train")
+        test_df = load_dataset("test")
         
         X_train = train_df.drop('DEFAULT', axis=1)
         y_train = train_df['DEFAULT']
@@ -56,85 +90,90 @@ class ModelTrainer:
         plt.legend(loc="lower right")
         plt.savefig(f'reports/figures/roc_curve_{model_name}.png')
         plt.close()
-        
+
         return metrics
-    
-    def train_logistic_regression(self, X_train, y_train, X_test, y_test):
-        """Train logistic regression model"""
-        with mlflow.start_run(run_name="logistic_regression"):
-            preprocessor = create_feature_pipeline(X_train)
-            
-            pipeline = Pipeline(steps=[
-                ('preprocessor', preprocessor),
-                ('classifier', LogisticRegression(random_state=42, max_iter=1000))
-            ])
-            
-            param_grid = {
-                'classifier__C': [0.1, 1, 10],
-                'classifier__penalty': ['l1', 'l2'],
-                'classifier__solver': ['liblinear']
-            }
-            
-            grid_search = GridSearchCV(
-                pipeline, param_grid, cv=5, scoring='roc_auc', n_jobs=-1
-            )
-            
-            grid_search.fit(X_train, y_train)
-            
+
+    def log_search(self, result, X_test, y_test):
+        """Evaluate a searched family on the test set and log it as an MLflow
+        run
+        """
+        with mlflow.start_run(run_name=result.name):
             # Log parameters and metrics
-            mlflow.log_params(grid_search.best_params_)
-            mlflow.log_metric("best_cv_score", grid_search.best_score_)
-            
-            metrics = self.evaluate_model(grid_search.best_estimator_, X_test, y_test, "logistic_regression")
-            
+            mlflow.log_params(result.best_params)
+            mlflow.log_metric("best_cv_score", result.best_score)
+            mlflow.log_metric("search_wall_seconds", result.wall_seconds)
+            mlflow.log_metric("search_cpu_seconds", result.cpu_seconds)
+
+            metrics = self.evaluate_model(
+                result.estimator, X_test, y_test, result.name
+            )
+
             for metric_name, metric_value in metrics.items():
                 mlflow.log_metric(metric_name, metric_value)
-            
+
             # Log artifacts
-            mlflow.log_artifact(f'reports/figures/roc_curve_logistic_regression.png')
-            mlflow.sklearn.log_model(grid_search.best_estimator_, "model")
-            
-            return grid_search.best_estimator_, metrics
-    
+            mlflow.log_artifact(f'reports/figures/roc_curve_{result.name}.png')
+            mlflow.sklearn.log_model(result.estimator, "model")
+
+            return result.estimator, metrics
+
+    def train_family(self, name, X_train, y_train, X_test, y_test):
+        """Search and log a single model family"""
+        spec = default_specs([name])[0]
+        result = run_search(
+            spec, X_train, y_train, n_jobs=self.n_jobs or -1,
+            derived_features=self.derived_features,
+        )
+        print(result.describe())
+        return self.log_search(result, X_test, y_test)
+
+    def train_logistic_regression(self, X_train, y_train, X_test, y_test):
+        """Train logistic regression model"""
+        return self.train_family(
+            "logistic_regression", X_train, y_train, X_test, y_test
+        )
+
     def train_gradient_boosting(self, X_train, y_train, X_test, y_test):
         """Train gradient boosting model"""
-        with mlflow.start_run(run_name="gradient_boosting"):
-            preprocessor = create_feature_pipeline(X_train)
-            
-            pipeline = Pipeline(steps=[
-                ('preprocessor', preprocessor),
-                ('classifier', GradientBoostingClassifier(random_state=42))
-            ])
-            
-            param_dist = {
-                'classifier__n_estimators': [100, 200],
-                'classifier__learning_rate': [0.01, 0.1],
-                'classifier__max_depth': [3, 4],
-                'classifier__min_samples_split': [2, 5]
-            }
-            
-            random_search = RandomizedSearchCV(
-                pipeline, param_dist, n_iter=4, cv=3, 
-                scoring='roc_auc', random_state=42, n_jobs=-1
-            )
-            
-            random_search.fit(X_train, y_train)
-            
-            # Log parameters and metrics
-            mlflow.log_params(random_search.best_params_)
-            mlflow.log_metric("best_cv_score", random_search.best_score_)
-            
-            metrics = self.evaluate_model(random_search.best_estimator_, X_test, y_test, "gradient_boosting")
-            
-            for metric_name, metric_value in metrics.items():
-                mlflow.log_metric(metric_name, metric_value)
-            
-            # Log artifacts
-            mlflow.log_artifact(f'reports/figures/roc_curve_gradient_boosting.png')
-            mlflow.sklearn.log_model(random_search.best_estimator_, "model")
-            
-            return random_search.best_estimator_, metrics
-    
+        return self.train_family(
+            "gradient_boosting", X_train, y_train, X_test, y_test
+        )
+
+    def train_hist_gradient_boosting(self, X_train, y_train, X_test, y_test):
+        """Train histogram-based gradient boosting model"""
+        return self.train_family(
+            "hist_gradient_boosting", X_train, y_train, X_test, y_test
+        )
+
+    def save_model_artifact(self, model, name, metrics):
+        try:
+            save_artifact(model, ARTIFACT_PATH, metrics=metrics)
+            print(f"Model artifact: {ARTIFACT_PATH}")
+        except ValueError as e:
+            print(f"{name} has no artifact form, serve {PICKLE_PATH} "
+                  f"instead: {e}")
+            # An older artifact would be preferred over the new pickle
+            if os.path.exists(ARTIFACT_PATH):
+                os.remove(ARTIFACT_PATH)
+
+    def export_onnx_model(self, model, name, X_test):
+        try:
+            export = export_onnx(model, X_test)
+            print(f"ONNX model: {export['model_path']} "
+                  f"(max abs diff {export['max_abs_diff']:.2e})")
+        except ImportError:
+            print("skl2onnx/onnx not installed, skipping ONNX export")
+        except (ValueError, RuntimeError) as e:
+            # e.g. categorical splits of histogram boosting, which skl2onnx
+            # does not translate, or the behaviour-features step, which has no
+            # converter; an older ONNX model must not be served next to the
+            # new pickle
+            print(f"ONNX export of {name} failed, serve "
+                  f"{default_model_path()} instead: {e}")
+            for stale in (ONNX_MODEL_PATH, ONNX_MODEL_PATH + '.data'):
+                if os.path.exists(stale):
+                    os.remove(stale)
+
     def train(self):
         """Main training function"""
         X_train, X_test, y_train, y_test = self.load_data()
@@ -142,26 +181,34 @@ class ModelTrainer:
         # Ensure models directory exists
         os.makedirs('models', exist_ok=True)
         
-        # Train multiple models
-        print("Training Logistic Regression...")
-        lr_model, lr_metrics = self.train_logistic_regression(X_train, y_train, X_test, y_test)
-        
-        print("Training Gradient Boosting...")
-        gb_model, gb_metrics = self.train_gradient_boosting(X_train, y_train, X_test, y_test)
-        
-        # Compare models and select best
-        if lr_metrics['roc_auc'] > gb_metrics['roc_auc']:
-            best_model = lr_model
-            best_metrics = lr_metrics
-            best_model_name = "logistic_regression"
-        else:
-            best_model = gb_model
-            best_metrics = gb_metrics
-            best_model_name = "gradient_boosting"
-        
-        # Save best model
-        joblib.dump(best_model, 'models/best_model.pkl')
-        
+        # Search all model families concurrently under one worker budget
+        print("Searching model families...")
+        start = time.perf_counter()
+        results = run_searches(
+            default_specs(self.families), X_train, y_train,
+            n_jobs=self.n_jobs, derived_features=self.derived_features,
+        )
+        print(f"Search finished in {time.perf_counter() - start:.1f}s")
+
+        # Compare models on the test set and select best
+        best_model, best_metrics, best_model_name = None, None, None
+        for name, result in results.items():
+            print(result.describe())
+            model, metrics = self.log_search(result, X_test, y_test)
+            if (best_metrics is None
+                    or metrics['roc_auc'] >= best_metrics['roc_auc']):
+                best_model, best_metrics, best_model_name = (
+                    model, metrics, name
+                )
+
+        # Save best model: the pickle, and the artifact the services load
+        # (manifest + raw arrays, no unpickling) when the model compiles
+        joblib.dump(best_model, PICKLE_PATH)
+        self.save_model_artifact(best_model, best_model_name, best_metrics)
+
+        # Export to ONNX for serving, checked against sklearn on the test set
+        self.export_onnx_model(best_model, best_model_name, X_test)
+
         # Save metrics
         with open('models/metrics.json', 'w') as f:
             json.dump(best_metrics, f, indent=2)
@@ -171,9 +218,10 @@ class ModelTrainer:
         
         return best_model, best_metrics
 
-def train_model():
+
+def train_model(families=None):
     """Convenience function for training model"""
-    trainer = ModelTrainer()
+    trainer = ModelTrainer(families=families)
     return trainer.train()
 
 if __name__ == "__main__":
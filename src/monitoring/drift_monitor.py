@@ -1,125 +1,358 @@
+"""Drift report of production traffic against the training data.
+
+Usage: python -m src.monitoring.drift_monitor [--api-url URL]
+           [--production requests.csv] [--samples N]
+
+Run it as a module from the repository root (``make monitor`` does), so
+the ``src`` package imports resolve.
+"""
 import pandas as pd
 import numpy as np
-import requests
+import asyncio
+import hashlib
 import json
-from scipy.stats import ks_2samp
 import os
-import sys
 
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.models.artifact import default_model_path, load_compiled
+from src.features.schema import FEATURE_COLUMNS
+from src.data.dataset import load_dataset, load_table
+
+from src.monitoring.sketches import BinSpec, Histograms
+
+PSI_THRESHOLD = 0.1
+KS_P_VALUE = 0.05
+REFERENCE_FORMAT = 2
 
-from models.predict_model import load_model, predict_proba
 
 def calculate_psi(expected, actual, buckets=10):
     """Calculate Population Stability Index"""
     # Create buckets based on expected distribution
-    breakpoints = np.percentile(expected, [100/buckets * i for i in range(buckets+1)])
-    
-    expected_percents = np.histogram(expected, breakpoints)[0] / len(expected)
-    actual_percents = np.histogram(actual, breakpoints)[0] / len(actual)
-    
-    # Avoid division by zero
-    expected_percents = np.clip(expected_percents, 0.001, 1.0)
-    actual_percents = np.clip(actual_percents, 0.001, 1.0)
-    
-    psi = np.sum((expected_percents - actual_percents) * np.log(expected_percents / actual_percents))
-    return psi
+    spec = BinSpec.from_reference(
+        np.asarray(expected, dtype=np.float64).reshape(-1, 1),
+        ['value'],
+        buckets,
+    )
+    reference, current = Histograms(spec), Histograms(spec)
+    reference.update(np.reshape(expected, (-1, 1)))
+    current.update(np.reshape(actual, (-1, 1)))
+    return float(current.psi(reference)[0])
+
+
+def file_version(path):
+    """Content hash of a model file, used when scoring locally"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return f"{os.path.basename(path)}@{digest.hexdigest()[:12]}"
+
+
+def feature_matrix(data, features, scores):
+    """Features in reference order with the score as the last column"""
+    return np.column_stack([data[features].to_numpy(dtype=np.float64), scores])
+
+
+class ReferenceProfile:
+    """Training-set histograms of every feature and the score for one model
+    version
+    """
+
+    def __init__(self, model_version, histograms):
+        self.model_version = model_version
+        self.histograms = histograms
+
+    @property
+    def features(self):
+        return self.histograms.spec.names[:-1]
+
+    @classmethod
+    def build(cls, model_version, data, scores, buckets=10):
+        features = [
+            feature for feature in FEATURE_COLUMNS if feature in data.columns
+        ]
+        matrix = feature_matrix(data, features, scores)
+        histograms = Histograms(
+            BinSpec.from_reference(matrix, features + ['score'], buckets)
+        )
+        histograms.update(matrix)
+        return cls(model_version, histograms)
+
+    def save(self, path):
+        self.histograms.save(path, model_version=self.model_version)
+
+    @classmethod
+    def load(cls, path):
+        histograms, metadata = Histograms.load(path)
+        return cls(metadata['model_version'], histograms)
+
+
+class DriftAccumulator:
+    """Constant-memory running histograms of production features and scores"""
+
+    def __init__(self, reference):
+        self.reference = reference
+        self.histograms = Histograms(reference.histograms.spec)
+        self.rows = 0
+        self.failed = 0
+
+    def add(self, chunk, scores):
+        self.rows += len(chunk)
+        valid = ~np.isnan(scores)
+        self.failed += int((~valid).sum())
+        if valid.any():
+            self.histograms.update(
+                feature_matrix(chunk, self.reference.features, scores)[valid]
+            )
+
+    def report(self):
+        scored = self.rows - self.failed
+        if scored == 0:
+            return {"error": "No valid predictions received"}
+
+        reference = self.reference.histograms
+        psi = self.histograms.psi(reference)
+        ks = self.histograms.ks(reference)
+        p_values = self.histograms.ks_p_value(reference)
+        features = self.reference.features
+
+        psi_score = float(psi[-1])
+        drift_report = {
+            'model_version': self.reference.model_version,
+            'rows': self.rows,
+            'failed_rows': self.failed,
+            'psi_score': psi_score,
+            'feature_psi': {
+                feature: float(psi[j]) for j, feature in enumerate(features)
+            },
+            'feature_drift': {
+                feature: {
+                    'ks_statistic': float(ks[j]),
+                    'p_value': float(p_values[j]),
+                    'drift_detected': bool(p_values[j] < KS_P_VALUE),
+                }
+                for j, feature in enumerate(features)
+            },
+            'drift_detected': psi_score > PSI_THRESHOLD,
+        }
+        return drift_report
+
 
 class DriftMonitor:
-    def __init__(self, api_url: str = None, train_data_path: str = None):
+    """Prediction and feature drift between training data and production
+    traffic.
+
+    Production rows are read in chunks and scored either locally or through
+    the API's ``/predict/batch`` endpoint over a pooled keep-alive client, so
+    memory stays bounded regardless of log size. The training reference
+    (score and feature histograms) is cached under ``cache_dir`` per model
+    version and only rebuilt when the model changes.
+    """
+
+    def __init__(
+        self,
+        api_url: str = None,
+        train_data_path: str = None,
+        model_path: str = None,
+        cache_dir: str = "data/monitoring",
+        chunksize: int = 10000,
+        batch_size: int = 1000,
+        concurrency: int = 4,
+        retries: int = 3,
+        timeout: float = 30.0,
+        transport=None,
+    ):
         self.api_url = api_url
         if train_data_path is None:
             train_data_path = "data/processed/train.csv"
-        self.train_data = pd.read_csv(train_data_path)
-        self.model = load_model()
-    
-    def get_train_predictions(self):
-        """Get predictions on training data"""
-        X_train = self.train_data.drop('DEFAULT', axis=1)
-        return predict_proba(self.model, X_train)
-    
+        self.train_data_path = train_data_path
+        self.model_path = model_path or default_model_path()
+        self.cache_dir = cache_dir
+        self.chunksize = chunksize
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.retries = retries
+        self.timeout = timeout
+        self.transport = transport
+        self._model = None
+
+    @property
+    def model(self):
+        if self._model is None:
+            # Preprocessing and classifier lowered to NumPy where supported
+            self._model = load_compiled(self.model_path)
+        return self._model
+
     def simulate_production_data(self, n_samples: int = 100):
         """Simulate production data by sampling from test set"""
-        test_data = pd.read_csv('data/processed/test.csv')
+        test_data = load_dataset('test')
         return test_data.sample(n_samples, random_state=42)
-    
+
+    def iter_production_chunks(self, path):
+        """Production log as DataFrame chunks of ``chunksize`` rows"""
+        return pd.read_csv(path, chunksize=self.chunksize)
+
+    def _client(self):
+        import httpx
+
+        limits = httpx.Limits(
+            max_connections=self.concurrency,
+            max_keepalive_connections=self.concurrency,
+        )
+        return httpx.AsyncClient(
+            base_url=self.api_url,
+            limits=limits,
+            timeout=self.timeout,
+            transport=self.transport,
+        )
+
+    async def _api_version(self, client):
+        response = await client.get("/")
+        response.raise_for_status()
+        return response.json().get("model_version") or "unknown"
+
+    async def _post_batch(self, client, semaphore, records):
+        async with semaphore:
+            for attempt in range(self.retries + 1):
+                try:
+                    response = await client.post(
+                        "/predict/batch", json={"instances": records}
+                    )
+                    if response.status_code == 200:
+                        return np.asarray(
+                            response.json()['probabilities'], dtype=np.float64
+                        )
+                    # Client errors will not succeed on retry
+                    if (
+                        response.status_code < 500
+                        and response.status_code != 429
+                    ):
+                        break
+                except Exception as e:
+                    if attempt == self.retries:
+                        print(f"Batch of {len(records)} rows failed: {e}")
+                if attempt < self.retries:
+                    await asyncio.sleep(0.2 * 2 ** attempt)
+        return np.full(len(records), np.nan)
+
+    async def _score_api(self, client, semaphore, data):
+        features = data[
+            [column for column in FEATURE_COLUMNS if column in data.columns]
+        ]
+        records = features.to_dict('records')
+        batches = [
+            records[start:start + self.batch_size]
+            for start in range(0, len(records), self.batch_size)
+        ]
+        results = await asyncio.gather(
+            *(self._post_batch(client, semaphore, batch) for batch in batches)
+        )
+        return np.concatenate(results) if results else np.empty(0)
+
+    def _score_local(self, data):
+        return self.model.predict_proba(
+            data[self.model.columns].to_numpy(dtype=np.float64)
+        )
+
+    def get_train_predictions(self):
+        """Get predictions on training data"""
+        return self._score_local(load_table(self.train_data_path))
+
     def get_api_predictions(self, data: pd.DataFrame) -> np.ndarray:
         """Get predictions from API"""
         if self.api_url is None:
-            return predict_proba(self.model, data.drop('DEFAULT', axis=1))
-        
-        probabilities = []
-        
-        for _, row in data.iterrows():
-            # Prepare request data
-            request_data = row.drop('DEFAULT').to_dict()
-            
-            try:
-                response = requests.post(
-                    f"{self.api_url}/predict",
-                    json=request_data,
-                    timeout=10
+            return self._score_local(data)
+
+        async def score():
+            async with self._client() as client:
+                return await self._score_api(
+                    client, asyncio.Semaphore(self.concurrency), data
                 )
-                if response.status_code == 200:
-                    result = response.json()
-                    probabilities.append(result['probability'])
-                else:
-                    probabilities.append(np.nan)
-            except:
-                probabilities.append(np.nan)
-        
-        return np.array(probabilities)
-    
-    def monitor_drift(self, n_samples: int = 100):
+        return asyncio.run(score())
+
+    def _cache_path(self, model_version):
+        train_data = os.path.abspath(self.train_data_path)
+        key = f"{REFERENCE_FORMAT}|{model_version}|{train_data}"
+        key = hashlib.sha256(key.encode()).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"reference-{key}.npz")
+
+    async def _reference(self, model_version, score):
+        path = self._cache_path(model_version)
+        if os.path.exists(path):
+            return ReferenceProfile.load(path)
+        train_data = load_table(self.train_data_path)
+        reference = ReferenceProfile.build(
+            model_version, train_data, await score(train_data)
+        )
+        reference.save(path)
+        return reference
+
+    async def _monitor(self, chunks):
+        if self.api_url is None:
+            async def score(data):
+                return await asyncio.to_thread(self._score_local, data)
+            return await self._accumulate(
+                file_version(self.model_path), score, chunks
+            )
+
+        async with self._client() as client:
+            semaphore = asyncio.Semaphore(self.concurrency)
+
+            async def score(data):
+                return await self._score_api(client, semaphore, data)
+            return await self._accumulate(
+                await self._api_version(client), score, chunks
+            )
+
+    async def _accumulate(self, model_version, score, chunks):
+        reference = await self._reference(model_version, score)
+        accumulator = DriftAccumulator(reference)
+        pending = None
+        for chunk in chunks:
+            # Score the next chunk while the previous one is being binned
+            task = asyncio.ensure_future(score(chunk))
+            if pending is not None:
+                await asyncio.to_thread(accumulator.add, *pending)
+            pending = (chunk, await task)
+        if pending is not None:
+            accumulator.add(*pending)
+        return accumulator.report()
+
+    def monitor_drift(self, n_samples: int = 100, production_path: str = None):
         """Monitor data and prediction drift"""
-        # Get training predictions
-        train_predictions = self.get_train_predictions()
-        
-        # Simulate new production data
-        new_data = self.simulate_production_data(n_samples)
-        new_predictions = self.get_api_predictions(new_data)
-        
-        # Remove NaN values
-        mask = ~np.isnan(new_predictions)
-        new_predictions = new_predictions[mask]
-        new_data = new_data[mask]
-        
-        if len(new_predictions) == 0:
-            return {"error": "No valid predictions received"}
-        
-        # Calculate PSI for predictions
-        psi_score = calculate_psi(train_predictions[:len(new_predictions)], new_predictions)
-        
-        # Calculate KS test for key features
-        drift_report = {
-            'psi_score': float(psi_score),
-            'feature_drift': {},
-            'drift_detected': psi_score > 0.1
-        }
-        
-        # Check key features for drift
-        key_features = ['LIMIT_BAL', 'AGE', 'BILL_AMT1', 'PAY_0']
-        
-        for feature in key_features:
-            if feature in self.train_data.columns and feature in new_data.columns:
-                ks_stat, p_value = ks_2samp(
-                    self.train_data[feature].sample(min(len(new_data), 1000), random_state=42),
-                    new_data[feature]
-                )
-                drift_report['feature_drift'][feature] = {
-                    'ks_statistic': float(ks_stat),
-                    'p_value': float(p_value),
-                    'drift_detected': p_value < 0.05
-                }
-        
+        if production_path is not None:
+            chunks = self.iter_production_chunks(production_path)
+        else:
+            # Simulate new production data
+            chunks = [self.simulate_production_data(n_samples)]
+
+        drift_report = asyncio.run(self._monitor(chunks))
+
         # Alert if significant drift detected
-        if psi_score > 0.1:
-            print(f"WARNING: Significant prediction drift detected! PSI: {psi_score:.4f}")
-        
+        if drift_report.get('drift_detected'):
+            print(
+                "WARNING: Significant prediction drift detected! "
+                f"PSI: {drift_report['psi_score']:.4f}"
+            )
+
         return drift_report
 
 if __name__ == "__main__":
-    monitor = DriftMonitor("http://localhost:8000")
-    report = monitor.monitor_drift()
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Prediction and feature drift report"
+    )
+    parser.add_argument("--api-url", default="http://localhost:8000")
+    parser.add_argument(
+        "--production",
+        help="CSV log of production requests (default: sample of test set)",
+    )
+    parser.add_argument("--samples", type=int, default=100)
+    args = parser.parse_args()
+
+    monitor = DriftMonitor(args.api_url)
+    report = monitor.monitor_drift(
+        args.samples, production_path=args.production
+    )
     print("Drift Monitoring Report:")
-    print(json.dumps(report, indent=2))
\ No newline at end of file
+    print(json.dumps(report, indent=2))
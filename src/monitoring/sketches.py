@@ -0,0 +1,399 @@
+"""Mergeable fixed-bin histograms for online drift statistics.
+
+Every feature (and the score) is binned on edges taken from the training
+reference, so one update costs a fixed number of comparisons per row and a
+window of any length is a (features x bins) count matrix. Counts add, which
+makes sliding windows, tumbling windows and cross-pod aggregation plain sums.
+"""
+import os
+import time
+from collections import deque
+
+import numpy as np
+
+PSI_FLOOR = 0.001
+
+
+class BinSpec:
+    """Bin edges per column, padded with +inf to a common width.
+
+    Column ``j`` has bins (-inf, e0), [e0, e1), ..., [e_last, inf); a row's
+    bin is the number of edges less than or equal to its value, and NaN is
+    counted separately as missing.
+    """
+
+    def __init__(self, names, edges):
+        self.names = list(names)
+        self.edges = np.asarray(edges, dtype=np.float64)
+        if self.edges.shape[0] != len(self.names):
+            raise ValueError(
+                f"{len(self.names)} names but {self.edges.shape[0]} rows "
+                "of edges"
+            )
+        self.n_bins = self.edges.shape[1] + 1
+
+    @classmethod
+    def from_reference(cls, matrix, names, bins=10):
+        """Quantile edges of each column of a reference matrix.
+
+        The reference minimum and maximum are edges too, so values below or
+        above the training range fall into two extra (empty in the
+        reference) bins instead of being merged into the outermost ones.
+        """
+        matrix = np.asarray(matrix, dtype=np.float64)
+        columns = []
+        for j in range(matrix.shape[1]):
+            values = matrix[:, j][~np.isnan(matrix[:, j])]
+            if len(values) == 0:
+                columns.append(np.empty(0))
+                continue
+            breakpoints = np.unique(
+                np.percentile(values, np.linspace(0, 100, bins + 1))
+            )
+            # Values outside the reference range get bins of their own
+            breakpoints[-1] = np.nextafter(breakpoints[-1], np.inf)
+            columns.append(breakpoints)
+        width = max([len(edges) for edges in columns] + [1])
+        edges = np.full((len(columns), width), np.inf)
+        for j, column_edges in enumerate(columns):
+            edges[j, :len(column_edges)] = column_edges
+        return cls(names, edges)
+
+    def bin_index(self, matrix):
+        """(rows x columns) bin numbers; NaN maps to bin 0 and is masked by
+        the caller
+        """
+        return (matrix[:, :, np.newaxis] >= self.edges).sum(axis=2)
+
+    def to_dict(self):
+        return {
+            "names": self.names,
+            "edges": np.where(np.isinf(self.edges), None, self.edges).tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["names"], np.array(data["edges"], dtype=np.float64))
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, BinSpec)
+            and self.names == other.names
+            and np.array_equal(self.edges, other.edges)
+        )
+
+
+class Histograms:
+    """Per-column bin counts of a stream of rows"""
+
+    def __init__(self, spec, counts=None, missing=None):
+        self.spec = spec
+        n_columns = len(spec.names)
+        self.counts = (
+            np.zeros((n_columns, spec.n_bins), dtype=np.int64)
+            if counts is None
+            else counts
+        )
+        self.missing = (
+            np.zeros(n_columns, dtype=np.int64) if missing is None else missing
+        )
+        # Flat offsets of each column's first bin, for a single bincount per
+        # update
+        self._offsets = np.arange(n_columns) * spec.n_bins
+
+    @property
+    def rows(self):
+        """Rows seen (per column, missing included)"""
+        return (
+            int(self.counts[0].sum() + self.missing[0])
+            if len(self.missing)
+            else 0
+        )
+
+    def bin(self, matrix):
+        """(counts, missing) increments for a block of rows, without applying
+        them
+        """
+        matrix = np.asarray(matrix, dtype=np.float64)
+        if matrix.ndim == 1:
+            matrix = matrix[np.newaxis, :]
+        nan = np.isnan(matrix)
+        flat = (self.spec.bin_index(matrix) + self._offsets)[~nan]
+        counts = np.bincount(flat, minlength=self.counts.size).reshape(
+            self.counts.shape
+        )
+        return counts, nan.sum(axis=0)
+
+    def update(self, matrix):
+        counts, missing = self.bin(matrix)
+        self.counts += counts
+        self.missing += missing
+
+    def merge(self, other):
+        if other.spec is not self.spec and other.spec != self.spec:
+            raise ValueError(
+                "Cannot merge histograms with different bin specs"
+            )
+        self.counts += other.counts
+        self.missing += other.missing
+        return self
+
+    def subtract(self, other):
+        self.counts -= other.counts
+        self.missing -= other.missing
+        return self
+
+    def copy(self):
+        return Histograms(self.spec, self.counts.copy(), self.missing.copy())
+
+    def clear(self):
+        self.counts[:] = 0
+        self.missing[:] = 0
+
+    def psi(self, reference):
+        """Population Stability Index of each column against ``reference``"""
+        expected = _fractions(reference.counts)
+        actual = _fractions(self.counts)
+        return np.sum((expected - actual) * np.log(expected / actual), axis=1)
+
+    def ks(self, reference):
+        """KS statistic of each column against ``reference``.
+
+        Computed from binned CDFs, so it is a lower bound on the exact
+        two-sample statistic; the gap shrinks as bins get finer.
+        """
+        return np.abs(_cdf(self.counts) - _cdf(reference.counts)).max(axis=1)
+
+    def ks_p_value(self, reference):
+        """Asymptotic two-sample KS p-value for each column"""
+        from scipy.special import kolmogorov
+
+        n = self.counts.sum(axis=1)
+        m = reference.counts.sum(axis=1)
+        effective = np.where(
+            (n > 0) & (m > 0), n * m / np.maximum(n + m, 1), 0
+        )
+        return kolmogorov(self.ks(reference) * np.sqrt(effective))
+
+    def to_dict(self):
+        return {
+            "counts": self.counts.tolist(),
+            "missing": self.missing.tolist(),
+        }
+
+    def save(self, path, **metadata):
+        """Write spec and counts to an ``.npz`` file, atomically"""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = path + ".tmp.npz"
+        np.savez(
+            tmp_path,
+            names=np.array(self.spec.names),
+            edges=self.spec.edges,
+            counts=self.counts,
+            missing=self.missing,
+            **{key: np.array(value) for key, value in metadata.items()},
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Histograms and a dict of the string metadata saved with them"""
+        with np.load(path) as f:
+            spec = BinSpec(f["names"].tolist(), f["edges"])
+            metadata = {
+                key: str(f[key])
+                for key in f.files
+                if key not in ("names", "edges", "counts", "missing")
+            }
+            return cls(spec, f["counts"], f["missing"]), metadata
+
+    @classmethod
+    def from_dict(cls, spec, data):
+        return cls(
+            spec,
+            np.array(data["counts"], dtype=np.int64),
+            np.array(data["missing"], dtype=np.int64),
+        )
+
+
+def _fractions(counts):
+    totals = np.maximum(counts.sum(axis=1, keepdims=True), 1)
+    return np.clip(counts / totals, PSI_FLOOR, 1.0)
+
+
+def _cdf(counts):
+    totals = np.maximum(counts.sum(axis=1, keepdims=True), 1)
+    return np.cumsum(counts, axis=1) / totals
+
+
+class SlidingWindow:
+    """Histograms of the last ``width`` seconds in ``slices`` rotating slices.
+
+    The running total is kept by adding each update and subtracting slices as
+    they expire, so updates never rescan the window and memory is bounded by
+    ``slices`` count matrices.
+    """
+
+    def __init__(self, spec, width, slices=12, clock=time.monotonic):
+        self.spec = spec
+        self.slice_width = width / slices
+        self.clock = clock
+        self.total = Histograms(spec)
+        self._slices = deque(maxlen=slices)
+        self._slice_start = None
+
+    def _rotate(self, now):
+        if self._slice_start is None:
+            self._slice_start = now
+            self._slices.append(Histograms(self.spec))
+            return
+        elapsed = int((now - self._slice_start) // self.slice_width)
+        if elapsed <= 0:
+            return
+        for _ in range(min(elapsed, self._slices.maxlen)):
+            if len(self._slices) == self._slices.maxlen:
+                self.total.subtract(self._slices[0])
+            self._slices.append(Histograms(self.spec))
+        self._slice_start += elapsed * self.slice_width
+
+    def update(self, matrix, now=None):
+        self._rotate(self.clock() if now is None else now)
+        counts, missing = self.total.bin(matrix)
+        for histograms in (self._slices[-1], self.total):
+            histograms.counts += counts
+            histograms.missing += missing
+
+    def histograms(self, now=None):
+        """Counts over the window ending at ``now``"""
+        self._rotate(self.clock() if now is None else now)
+        return self.total.copy()
+
+
+class TumblingWindow:
+    """Histograms over consecutive, non-overlapping ``width``-second windows"""
+
+    def __init__(self, spec, width, clock=time.monotonic):
+        self.spec = spec
+        self.width = width
+        self.clock = clock
+        self.current = Histograms(spec)
+        self.last = None
+        self._start = None
+
+    def _roll(self, now):
+        if self._start is None:
+            self._start = now
+        elif now - self._start >= self.width:
+            # An idle gap leaves an empty window rather than stale counts
+            self.last = (
+                self.current
+                if now - self._start < 2 * self.width
+                else Histograms(self.spec)
+            )
+            self.current = Histograms(self.spec)
+            self._start += (now - self._start) // self.width * self.width
+
+    def update(self, matrix, now=None):
+        self._roll(self.clock() if now is None else now)
+        self.current.update(matrix)
+
+    def completed(self, now=None):
+        """The last closed window, or None before the first one closes"""
+        self._roll(self.clock() if now is None else now)
+        return self.last
+
+
+class DriftEngine:
+    """Online PSI/KS for every feature and the score against a reference.
+
+    ``observe(features, scores)`` costs one vectorized binning per call;
+    ``report()`` compares the sliding window and the last tumbling window
+    with the reference. ``snapshot()`` is JSON-serializable, and snapshots
+    from several pods combine with ``merge_snapshots``.
+    """
+
+    def __init__(
+        self,
+        reference,
+        window_seconds=3600.0,
+        slices=12,
+        tumbling_seconds=None,
+        clock=time.monotonic,
+    ):
+        self.reference = reference
+        self.spec = reference.spec
+        self.sliding = SlidingWindow(self.spec, window_seconds, slices, clock)
+        self.tumbling = TumblingWindow(
+            self.spec, tumbling_seconds or window_seconds, clock
+        )
+        self.clock = clock
+
+    @staticmethod
+    def reference_from(features, scores, feature_names, bins=10):
+        """Reference histograms from training features and scores"""
+        matrix = np.column_stack(
+            [np.asarray(features, dtype=np.float64), scores]
+        )
+        spec = BinSpec.from_reference(
+            matrix, list(feature_names) + ["score"], bins
+        )
+        reference = Histograms(spec)
+        reference.update(matrix)
+        return reference
+
+    def observe(self, features, scores, now=None):
+        features = np.asarray(features, dtype=np.float64)
+        if features.ndim == 1:
+            features = features[np.newaxis, :]
+        matrix = np.column_stack(
+            [features, np.asarray(scores, dtype=np.float64).reshape(-1)]
+        )
+        now = self.clock() if now is None else now
+        self.sliding.update(matrix, now)
+        self.tumbling.update(matrix, now)
+
+    def compare(self, histograms):
+        psi = histograms.psi(self.reference)
+        ks = histograms.ks(self.reference)
+        p_values = histograms.ks_p_value(self.reference)
+        return {
+            name: {
+                "psi": float(psi[j]),
+                "ks_statistic": float(ks[j]),
+                "p_value": float(p_values[j]),
+            }
+            for j, name in enumerate(self.spec.names)
+        }
+
+    def report(self, now=None):
+        now = self.clock() if now is None else now
+        window = self.sliding.histograms(now)
+        completed = self.tumbling.completed(now)
+        return {
+            "rows": window.rows,
+            "sliding": self.compare(window) if window.rows else {},
+            "tumbling": (
+                self.compare(completed)
+                if completed is not None and completed.rows
+                else {}
+            ),
+        }
+
+    def snapshot(self, now=None):
+        return {
+            "spec": self.spec.to_dict(),
+            "reference": self.reference.to_dict(),
+            "sliding": self.sliding.histograms(now).to_dict(),
+        }
+
+
+def merge_snapshots(snapshots):
+    """Sum the sliding-window histograms of several pods' snapshots"""
+    snapshots = list(snapshots)
+    spec = BinSpec.from_dict(snapshots[0]["spec"])
+    total = Histograms(spec)
+    for snapshot in snapshots:
+        if BinSpec.from_dict(snapshot["spec"]) != spec:
+            raise ValueError("Snapshots use different bin specs")
+        total.merge(Histograms.from_dict(spec, snapshot["sliding"]))
+    return Histograms.from_dict(spec, snapshots[0]["reference"]), total
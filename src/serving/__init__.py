@@ -0,0 +1,44 @@
+"""Building blocks of the ONNX and sklearn serving apps.
+
+Names are imported from their submodule on first use, so an app that only
+needs, say, the executor and the model manager does not load ONNX Runtime.
+"""
+from src._lazy import lazy_exports
+
+_EXPORTS = {
+    "build_feature_matrix": ".batching",
+    "split_valid_rows": ".batching",
+    "validate_row": ".batching",
+    "PayloadError": ".codecs",
+    "decode_matrix": ".codecs",
+    "encode_scores": ".codecs",
+    "negotiate": ".codecs",
+    "DriftTap": ".drift_tap",
+    "drift_tap_from_env": ".drift_tap",
+    "DEADLINE_HEADER": ".executor",
+    "DeadlineExceeded": ".executor",
+    "InferenceExecutor": ".executor",
+    "Overloaded": ".executor",
+    "Rejected": ".executor",
+    "WorkerLost": ".executor",
+    "inference_executor_from_env": ".executor",
+    "request_deadline": ".executor",
+    "MicroBatcher": ".coalescer",
+    "PredictionMetrics": ".metrics",
+    "ModelManager": ".model_manager",
+    "InMemoryStore": ".response_cache",
+    "RemoteBackend": ".response_cache",
+    "ResponseCache": ".response_cache",
+    "cache_key": ".response_cache",
+    "response_cache_from_env": ".response_cache",
+    "OnnxScorer": ".scorer",
+    "SessionConfig": ".session",
+    "SessionPool": ".session",
+    "create_session": ".session",
+    "parse_batch_sizes": ".warmup",
+    "warm_up": ".warmup",
+}
+
+__all__ = list(_EXPORTS)
+
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
@@ -0,0 +1,68 @@
+import math
+import numpy as np
+
+# Larger magnitudes become inf in the float32 matrix the model consumes
+FLOAT32_MAX = float(np.finfo(np.float32).max)
+
+
+def validate_row(row, n_features=None):
+    """Return an error message for an invalid feature row, or None"""
+    if not isinstance(row, (list, tuple)):
+        return "row must be a list of numbers"
+    if n_features is not None and len(row) != n_features:
+        return f"expected {n_features} features, got {len(row)}"
+    for position, value in enumerate(row):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return f"feature {position} is not a number"
+        if not math.isfinite(value):
+            return f"feature {position} is not finite"
+        if abs(value) > FLOAT32_MAX:
+            return f"feature {position} is out of float32 range"
+    return None
+
+
+def build_feature_matrix(rows, n_features=None):
+    """Pack valid rows into one contiguous float32 matrix.
+
+    Returns the matrix, the request indices of the packed rows and a
+    dict of per-row validation errors keyed by request index.
+    """
+    if n_features is None:
+        n_features = next(
+            (len(row) for row in rows if isinstance(row, (list, tuple))), 0
+        )
+
+    matrix = np.empty((len(rows), n_features), dtype=np.float32)
+    valid_indices = []
+    errors = {}
+
+    for index, row in enumerate(rows):
+        error = validate_row(row, n_features)
+        if error is not None:
+            errors[index] = error
+            continue
+        matrix[len(valid_indices)] = row
+        valid_indices.append(index)
+
+    return matrix[:len(valid_indices)], valid_indices, errors
+
+
+def split_valid_rows(matrix, n_features=None):
+    """Per-row validation for an already decoded float32 matrix"""
+    if n_features is not None and matrix.shape[1] != n_features:
+        error = f"expected {n_features} features, got {matrix.shape[1]}"
+        return (
+            matrix[:0],
+            np.empty(0, dtype=np.intp),
+            dict.fromkeys(range(len(matrix)), error),
+        )
+
+    finite = np.isfinite(matrix).all(axis=1)
+    if finite.all():
+        return matrix, np.arange(len(matrix)), {}
+
+    valid_indices = np.flatnonzero(finite)
+    errors = dict.fromkeys(
+        np.flatnonzero(~finite).tolist(), "features must be finite"
+    )
+    return matrix[valid_indices], valid_indices, errors
@@ -0,0 +1,180 @@
+import asyncio
+import time
+from collections import deque
+
+import numpy as np
+from prometheus_client import Histogram
+
+from .executor import INFERENCE_REJECTED, DeadlineExceeded, Overloaded
+
+ROW_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+MICROBATCH_QUEUE_DEPTH = Histogram(
+    "credit_scoring_microbatch_queue_depth",
+    "Rows waiting in the micro-batch queue when a batch is formed",
+    buckets=ROW_BUCKETS,
+)
+MICROBATCH_SIZE = Histogram(
+    "credit_scoring_microbatch_size",
+    "Rows merged into one coalesced inference run",
+    buckets=ROW_BUCKETS,
+)
+
+
+class MicroBatcher:
+    """Merge concurrent single-row requests into batched inference runs.
+
+    Rows are collected until ``max_batch_size`` rows are pending or
+    ``window_ms`` has passed since the first one arrived, then scored with
+    one call to ``score_fn`` (float32 matrix -> 1-D scores) on a worker
+    thread. Rows that arrive while ``concurrency`` batches are already
+    running form the next batch.
+
+    A row submitted with ``model`` is scored by ``score_fn(matrix, model)``
+    and only batched with rows of the same model, so a request keeps the
+    model version it was admitted with across a swap.
+
+    With ``max_pending`` set, rows beyond that many waiting ones are refused
+    with Overloaded; rows whose deadline passes while they wait are dropped
+    from the batch and fail with DeadlineExceeded.
+    """
+
+    def __init__(
+        self,
+        score_fn,
+        max_batch_size=32,
+        window_ms=2.0,
+        executor=None,
+        concurrency=1,
+        max_pending=None,
+    ):
+        self.score_fn = score_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.window = max(0.0, float(window_ms)) / 1000
+        self.executor = executor
+        self.concurrency = max(1, int(concurrency))
+        self.max_pending = max_pending
+        self._loop = None
+        self._overloaded = INFERENCE_REJECTED.labels(
+            "microbatch", "overloaded"
+        )
+        self._expired = INFERENCE_REJECTED.labels("microbatch", "deadline")
+
+    def _start(self, loop):
+        # A new event loop (e.g. a restarted TestClient) gets fresh state
+        self._loop = loop
+        self._pending = deque()
+        self._has_items = asyncio.Event()
+        self._is_full = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._running = set()
+        self._worker = loop.create_task(self._run())
+
+    @property
+    def pending(self):
+        return len(self._pending) if self._loop is not None else 0
+
+    async def submit(self, row, deadline=None, model=None):
+        """Queue one feature row and wait for its score (until ``deadline``,
+        monotonic)
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker.done():
+            self._start(loop)
+        if (
+            self.max_pending is not None
+            and len(self._pending) >= self.max_pending
+        ):
+            self._overloaded.inc()
+            raise Overloaded(
+                f"{len(self._pending)} rows waiting for a micro-batch",
+                retry_after=1,
+            )
+
+        future = loop.create_future()
+        self._pending.append((row, future, deadline, model))
+        self._has_items.set()
+        if len(self._pending) >= self.max_batch_size:
+            self._is_full.set()
+        if deadline is None:
+            return await future
+        try:
+            return await asyncio.wait_for(
+                future, max(0.0, deadline - time.monotonic())
+            )
+        except asyncio.TimeoutError:
+            self._expired.inc()
+            raise DeadlineExceeded(
+                "deadline exceeded waiting for a micro-batch"
+            ) from None
+
+    def _take_batch(self):
+        """Up to max_batch_size live rows of one model and that model.
+
+        Expired and abandoned rows are dropped; a row of another model ends
+        the batch and starts the next one.
+        """
+        now = time.monotonic()
+        batch, model = [], None
+        while self._pending and len(batch) < self.max_batch_size:
+            row, future, deadline, row_model = self._pending[0]
+            if batch and row_model is not model:
+                break
+            self._pending.popleft()
+            if future.done():
+                continue
+            if deadline is not None and now >= deadline:
+                self._expired.inc()
+                future.set_exception(
+                    DeadlineExceeded(
+                        "deadline exceeded waiting for a micro-batch"
+                    )
+                )
+                continue
+            batch.append((row, future))
+            model = row_model
+        return batch, model
+
+    async def _run(self):
+        while True:
+            await self._slots.acquire()
+            await self._has_items.wait()
+            if self.window and len(self._pending) < self.max_batch_size:
+                try:
+                    await asyncio.wait_for(self._is_full.wait(), self.window)
+                except asyncio.TimeoutError:
+                    pass
+
+            MICROBATCH_QUEUE_DEPTH.observe(len(self._pending))
+            batch, model = self._take_batch()
+            if not self._pending:
+                self._has_items.clear()
+            if len(self._pending) < self.max_batch_size:
+                self._is_full.clear()
+            if not batch:
+                self._slots.release()
+                continue
+
+            MICROBATCH_SIZE.observe(len(batch))
+            task = self._loop.create_task(self._score(batch, model))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _score(self, batch, model):
+        try:
+            matrix = np.stack([row for row, _ in batch])
+            args = (matrix,) if model is None else (matrix, model)
+            scores = await self._loop.run_in_executor(
+                self.executor, self.score_fn, *args
+            )
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._slots.release()
+
+        for (_, future), score in zip(batch, scores.tolist()):
+            if not future.done():
+                future.set_result(score)
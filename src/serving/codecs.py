@@ -0,0 +1,213 @@
+import io
+import numpy as np
+
+JSON = "application/json"
+OCTET_STREAM = "application/octet-stream"
+NPY = "application/x-npy"
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+ARROW_FILE = "application/vnd.apache.arrow.file"
+
+BINARY_TYPES = (OCTET_STREAM, NPY, ARROW_STREAM, ARROW_FILE)
+SUPPORTED_TYPES = (JSON,) + BINARY_TYPES
+
+# "rows,cols" (or just "cols") for raw float32 payloads
+SHAPE_HEADER = "X-Shape"
+
+# dtype kinds convertible to float32: bool, signed/unsigned int, float
+NUMERIC_KINDS = "biuf"
+
+
+class PayloadError(ValueError):
+    """Raised when a request body cannot be decoded into a feature matrix"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def media_type(header):
+    """Strip parameters from a Content-Type header"""
+    return (header or JSON).split(";")[0].strip().lower()
+
+
+def negotiate(accept_header, default=JSON):
+    """Pick the response media type from an Accept header"""
+    for item in (accept_header or "").split(","):
+        candidate = media_type(item)
+        if candidate in SUPPORTED_TYPES:
+            return candidate
+        if candidate == "*/*":
+            return default
+    return default
+
+
+def decode_matrix(content_type, body, shape_header=None):
+    """Decode a binary request body into a 2-D float32 matrix.
+
+    Little-endian float32 raw buffers, C-ordered float32 ``.npy`` arrays and
+    Arrow batches with a single fixed-size-list<float32> column are viewed
+    in place without copying; other layouts are converted once.
+    """
+    if content_type == OCTET_STREAM:
+        return _decode_raw(body, shape_header)
+    if content_type == NPY:
+        return _decode_npy(body)
+    if content_type in (ARROW_STREAM, ARROW_FILE):
+        return _decode_arrow(body, content_type == ARROW_FILE)
+    raise PayloadError(
+        f"Unsupported content type: {content_type}", status_code=415
+    )
+
+
+def _decode_raw(body, shape_header):
+    if len(body) % 4:
+        raise PayloadError("Body length is not a multiple of 4 bytes")
+    if not shape_header:
+        raise PayloadError(
+            f"{SHAPE_HEADER} header is required for {OCTET_STREAM}"
+        )
+    try:
+        shape = tuple(int(part) for part in shape_header.split(","))
+    except ValueError:
+        raise PayloadError(f"Invalid {SHAPE_HEADER} header: {shape_header}")
+
+    if len(shape) == 1:
+        shape = (-1,) + shape
+    if len(shape) != 2 or shape[1] <= 0:
+        raise PayloadError(f"Invalid {SHAPE_HEADER} header: {shape_header}")
+
+    values = np.frombuffer(body, dtype="<f4")
+    try:
+        return values.reshape(shape)
+    except ValueError:
+        raise PayloadError(
+            f"{len(values)} values do not fit shape {shape_header}"
+        )
+
+
+def _npy_header(buffer):
+    """(shape, fortran_order, dtype) of an .npy payload"""
+    try:
+        version = np.lib.format.read_magic(buffer)
+        if version == (1, 0):
+            return np.lib.format.read_array_header_1_0(buffer)
+        return np.lib.format.read_array_header_2_0(buffer)
+    except ValueError as e:
+        raise PayloadError(f"Invalid .npy payload: {e}")
+
+
+def _decode_npy(body):
+    buffer = io.BytesIO(body)
+    shape, fortran_order, dtype = _npy_header(buffer)
+    if dtype.kind not in NUMERIC_KINDS:
+        raise PayloadError(
+            f"Only numeric arrays are accepted, got dtype {dtype}"
+        )
+    if len(shape) != 2:
+        raise PayloadError(f"Expected a 2-D array, got shape {shape}")
+
+    count = shape[0] * shape[1]
+    try:
+        values = np.frombuffer(
+            body, dtype=dtype, count=count, offset=buffer.tell()
+        )
+    except ValueError as e:
+        raise PayloadError(f"Invalid .npy payload: {e}")
+
+    try:
+        matrix = values.reshape(shape, order="F" if fortran_order else "C")
+        if matrix.dtype != np.float32 or not matrix.flags["C_CONTIGUOUS"]:
+            matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    except (ValueError, TypeError) as e:
+        raise PayloadError(f"Invalid .npy payload: {e}")
+    return matrix
+
+
+def _is_numeric_arrow(data_type):
+    import pyarrow as pa
+
+    return (
+        pa.types.is_integer(data_type)
+        or pa.types.is_floating(data_type)
+        or pa.types.is_boolean(data_type)
+    )
+
+
+def _read_arrow(body, file_format):
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise PayloadError("Arrow payloads require pyarrow", status_code=415)
+
+    try:
+        source = pa.py_buffer(body)
+        if file_format:
+            return pa.ipc.open_file(source).read_all()
+        return pa.ipc.open_stream(source).read_all()
+    except pa.ArrowInvalid as e:
+        raise PayloadError(f"Invalid Arrow payload: {e}")
+
+
+def _decode_arrow(body, file_format):
+    # Without pyarrow the payload is refused before the import below
+    table = _read_arrow(body, file_format)
+    import pyarrow as pa
+
+    # One fixed-size list column holds whole rows, otherwise one column per
+    # feature
+    first = table.schema.field(0).type if table.num_columns else None
+    is_list = table.num_columns == 1 and pa.types.is_fixed_size_list(first)
+    if is_list:
+        value_types = [first.value_type]
+    else:
+        value_types = [field.type for field in table.schema]
+    rejected = [str(data_type) for data_type in value_types
+                if not _is_numeric_arrow(data_type)]
+    if rejected:
+        raise PayloadError(
+            "Only numeric Arrow columns are accepted, "
+            f"got {', '.join(rejected)}"
+        )
+
+    try:
+        if is_list:
+            column = table.column(0).combine_chunks()
+            values = column.flatten().to_numpy(zero_copy_only=False)
+            values = np.ascontiguousarray(values, dtype=np.float32)
+            return values.reshape(-1, column.type.list_size)
+
+        matrix = np.empty(
+            (table.num_rows, table.num_columns), dtype=np.float32
+        )
+        for position, column in enumerate(table.columns):
+            matrix[:, position] = column.to_numpy(zero_copy_only=False)
+    except (pa.ArrowException, ValueError, TypeError) as e:
+        raise PayloadError(f"Invalid Arrow payload: {e}")
+    return matrix
+
+
+def encode_scores(scores, content_type):
+    """Serialize a 1-D score array in a binary media type"""
+    scores = np.ascontiguousarray(scores, dtype="<f4")
+    if content_type == OCTET_STREAM:
+        return scores.tobytes()
+    if content_type == NPY:
+        buffer = io.BytesIO()
+        np.save(buffer, scores, allow_pickle=False)
+        return buffer.getvalue()
+    if content_type in (ARROW_STREAM, ARROW_FILE):
+        import pyarrow as pa
+
+        batch = pa.RecordBatch.from_arrays([pa.array(scores)], names=["score"])
+        sink = pa.BufferOutputStream()
+        new_writer = (
+            pa.ipc.new_file
+            if content_type == ARROW_FILE
+            else pa.ipc.new_stream
+        )
+        with new_writer(sink, batch.schema) as writer:
+            writer.write_batch(batch)
+        return sink.getvalue().to_pybytes()
+    raise PayloadError(
+        f"Unsupported content type: {content_type}", status_code=406
+    )
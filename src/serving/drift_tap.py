@@ -0,0 +1,222 @@
+import itertools
+import os
+import threading
+
+import numpy as np
+from prometheus_client import Counter, Gauge
+
+from src.monitoring.sketches import DriftEngine, Histograms
+
+FEATURE_PSI = Gauge(
+    "credit_scoring_feature_psi",
+    "PSI of each input feature over the drift window against the training "
+    "reference",
+    ["feature"],
+)
+SCORE_PSI = Gauge(
+    "credit_scoring_score_psi",
+    "PSI of the predicted score over the drift window against the training "
+    "reference",
+)
+DRIFT_WINDOW_ROWS = Gauge(
+    "credit_scoring_drift_window_rows",
+    "Scored rows currently in the drift window",
+)
+DRIFT_DROPPED = Counter(
+    "credit_scoring_drift_dropped",
+    "Scored blocks overwritten in the drift ring buffer before they were "
+    "drained",
+)
+DRIFT_UNMATCHED = Counter(
+    "credit_scoring_drift_unmatched_rows",
+    "Scored rows left out of the drift window because their width is not the "
+    "bound model's",
+)
+
+
+class RingBuffer:
+    """Fixed-size, lock-free multi-producer / single-consumer ring of
+    references.
+
+    A producer takes a ticket from ``itertools.count`` (atomic under the GIL)
+    and stores ``(ticket, item)`` in slot ``ticket % capacity``; nothing is
+    copied and nothing waits. The consumer walks tickets in order, stops at a
+    slot whose writer has not finished yet and skips tickets that were
+    overwritten by producers lapping it.
+    """
+
+    def __init__(self, capacity=65536):
+        self.capacity = int(capacity)
+        self._slots = [None] * self.capacity
+        self._tickets = itertools.count()
+        self._read = 0
+        self.dropped = 0
+
+    def put(self, item):
+        ticket = next(self._tickets)
+        self._slots[ticket % self.capacity] = (ticket, item)
+
+    def drain(self, limit=None):
+        """Items published since the last drain, oldest first"""
+        items = []
+        while limit is None or len(items) < limit:
+            entry = self._slots[self._read % self.capacity]
+            if entry is None or entry[0] < self._read:
+                break
+            if entry[0] > self._read:
+                # Producers lapped the consumer: resume at the oldest ticket
+                # that can still be in the ring
+                oldest = entry[0] - self.capacity + 1
+                self.dropped += oldest - self._read
+                self._read = oldest
+                continue
+            items.append(entry[1])
+            self._read += 1
+        return items
+
+
+class DriftTap:
+    """Feeds scored rows into an in-process DriftEngine off the request path.
+
+    ``offer(features, scores)`` only stores references in a RingBuffer. A
+    daemon thread drains it every ``interval`` seconds, updates the sliding
+    window and publishes PSI per feature and for the score as gauges.
+    ``bind`` maps the model's input columns onto the reference features.
+    """
+
+    def __init__(
+        self,
+        reference,
+        window_seconds=3600.0,
+        slices=12,
+        interval=5.0,
+        capacity=65536,
+    ):
+        self.reference = reference
+        self.engine = DriftEngine(
+            reference, window_seconds=window_seconds, slices=slices
+        )
+        self.n_features = len(reference.spec.names) - 1
+        self.width = self.n_features
+        self.columns = None
+        self.interval = interval
+        self.buffer = RingBuffer(capacity)
+        self._feature_gauges = [
+            FEATURE_PSI.labels(name) for name in reference.spec.names[:-1]
+        ]
+        self._reported_dropped = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        reference, _ = Histograms.load(path)
+        return cls(reference, **kwargs)
+
+    def bind(self, names, n_features):
+        """Accept rows of a model with ``n_features`` inputs named ``names``.
+
+        Rows are projected onto the reference features by name. A model whose
+        inputs are unnamed (or named differently) must be exactly as wide as
+        the reference. Otherwise none of its rows could be compared and this
+        raises ValueError.
+        """
+        features = list(self.reference.spec.names[:-1])
+        names = list(names or [])
+        if names and all(name in names for name in features):
+            index = [names.index(name) for name in features]
+            in_order = index == list(range(n_features))
+            columns = None if in_order else np.array(index)
+        elif n_features == len(features):
+            columns = None
+        else:
+            message = (
+                f"the drift reference has {len(features)} features and the "
+                f"model takes {n_features} inputs"
+            )
+            if names:
+                missing = [name for name in features if name not in names]
+                message += f", without {missing[:5]}"
+            raise ValueError(message)
+        self.width, self.columns = n_features, columns
+
+    def offer(self, features, scores):
+        """Record a block of scored rows (2-D features, 1-D scores) or a
+        single row
+        """
+        self.buffer.put((features, scores))
+
+    def process(self):
+        """Drain the buffer into the engine and refresh the gauges"""
+        blocks = self.buffer.drain()
+        rows, scores = [], []
+        width, columns = self.width, self.columns
+        for features, block_scores in blocks:
+            features = np.asarray(features, dtype=np.float64)
+            if features.ndim == 1:
+                features = features[np.newaxis, :]
+            if features.shape[1] != width:
+                DRIFT_UNMATCHED.inc(len(features))
+                continue
+            rows.append(features if columns is None else features[:, columns])
+            scores.append(
+                np.asarray(block_scores, dtype=np.float64).reshape(-1)
+            )
+        if rows:
+            self.engine.observe(np.concatenate(rows), np.concatenate(scores))
+
+        window = self.engine.sliding.histograms()
+        if window.rows:
+            psi = window.psi(self.reference)
+            for gauge, value in zip(self._feature_gauges, psi[:-1]):
+                gauge.set(value)
+            SCORE_PSI.set(psi[-1])
+        DRIFT_WINDOW_ROWS.set(window.rows)
+        if self.buffer.dropped > self._reported_dropped:
+            DRIFT_DROPPED.inc(self.buffer.dropped - self._reported_dropped)
+            self._reported_dropped = self.buffer.dropped
+        return sum(len(block_scores) for block_scores in scores)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="drift-tap", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+        self.process()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.process()
+            except Exception as e:
+                print(f"Drift tap update failed: {e}")
+
+
+def drift_tap_from_env():
+    """DriftTap for ``DRIFT_REFERENCE_PATH``, or None when drift tracking is
+    off.
+
+    The reference is a ``Histograms.save`` file whose columns are the model
+    features followed by the score, e.g. the one ``make monitor`` caches.
+    """
+    path = os.getenv("DRIFT_REFERENCE_PATH")
+    if not path:
+        return None
+    try:
+        return DriftTap.from_file(
+            path,
+            window_seconds=float(os.getenv("DRIFT_WINDOW_SECONDS", "3600")),
+            interval=float(os.getenv("DRIFT_INTERVAL_SECONDS", "5")),
+            capacity=int(os.getenv("DRIFT_BUFFER_SIZE", "65536")),
+        )
+    except (OSError, KeyError, ValueError) as e:
+        print(f"Drift tracking disabled, cannot load reference {path}: {e}")
+        return None
@@ -0,0 +1,293 @@
+import asyncio
+import multiprocessing
+import os
+import signal
+import time
+from collections import OrderedDict
+from concurrent.futures import (
+    BrokenExecutor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+
+from prometheus_client import Counter, Gauge
+
+INFERENCE_IN_FLIGHT = Gauge(
+    "credit_scoring_inference_in_flight",
+    "Inference calls admitted to an executor and not finished, running or "
+    "queued",
+    ["executor"],
+)
+INFERENCE_REJECTED = Counter(
+    "credit_scoring_inference_rejected",
+    "Inference calls refused by reason: overloaded (queue full) or deadline",
+    ["executor", "reason"],
+)
+INFERENCE_POOL_RESTARTS = Counter(
+    "credit_scoring_inference_pool_restarts",
+    "Executor pools replaced after a worker died (OOM kill, crash)",
+    ["executor"],
+)
+
+# Relative time budget of one request in milliseconds, set by the caller
+DEADLINE_HEADER = "X-Deadline-Ms"
+
+
+class Rejected(Exception):
+    """Raised instead of running an inference call; carries the HTTP answer"""
+
+    status_code = 503
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+    @property
+    def headers(self):
+        return (
+            {"Retry-After": str(self.retry_after)}
+            if self.retry_after
+            else None
+        )
+
+
+class Overloaded(Rejected):
+    """The admission queue is full"""
+
+    status_code = 429
+
+
+class DeadlineExceeded(Rejected):
+    """The request's deadline passed before its scores were ready"""
+
+    status_code = 503
+
+
+class WorkerLost(Rejected):
+    """A worker died under the call; the pool is replaced for the next ones"""
+
+    status_code = 503
+
+
+def request_deadline(header_value=None, default_ms=0.0, now=None):
+    """Absolute ``time.monotonic()`` deadline of a request, or None.
+
+    The caller's ``X-Deadline-Ms`` budget applies when it is tighter than
+    the server default; 0 or a missing value means no limit from that side.
+    """
+    budgets = [float(default_ms or 0)]
+    if header_value:
+        try:
+            budgets.append(float(header_value))
+        except ValueError:
+            pass
+    budgets = [budget for budget in budgets if budget > 0]
+    if not budgets:
+        return None
+    return (now if now is not None else time.monotonic()) + min(budgets) / 1000
+
+
+def _init_worker():
+    # Forked workers inherit the server's handlers (uvicorn only sets a flag
+    # on SIGTERM), which would leave them running when the server is killed.
+    # Ctrl-C reaches the whole process group; the server shuts the pool down
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _run_before_deadline(deadline, fn, args):
+    # Checked again when a worker picks the call up: a request that waited
+    # past its deadline in the queue is not worth scoring any more.
+    # CLOCK_MONOTONIC is system-wide, so this also holds in worker processes
+    if deadline is not None and time.monotonic() >= deadline:
+        raise DeadlineExceeded("deadline exceeded in the inference queue")
+    return fn(*args)
+
+
+class InferenceExecutor:
+    """Bounded pool dedicated to inference, with admission control.
+
+    ``kind="thread"`` suits ONNX Runtime and NumPy, which release the GIL
+    while they compute; ``kind="process"`` runs pure-Python scoring in
+    forked worker processes. At most ``max_workers + max_queue`` calls are
+    admitted at once; further ones fail fast with Overloaded (HTTP 429)
+    instead of queueing without bound, and calls still waiting when their
+    deadline passes fail with DeadlineExceeded (HTTP 503). When a process
+    worker dies, the calls it broke fail with WorkerLost (HTTP 503) and a
+    new pool takes the following ones. Admission is
+    tracked on the event loop, so ``run`` must be awaited from one loop.
+    """
+
+    def __init__(
+        self, max_workers=1, max_queue=64, kind="thread", name="inference"
+    ):
+        if kind not in ("thread", "process"):
+            raise ValueError(
+                f"Unknown executor kind {kind!r}, "
+                "expected 'thread' or 'process'"
+            )
+        self.max_workers = max(1, int(max_workers))
+        self.max_queue = max(0, int(max_queue))
+        self.kind = kind
+        self.name = name
+        self._pending = 0
+        self._pool = None
+        self._in_flight = INFERENCE_IN_FLIGHT.labels(name)
+        self._overloaded = INFERENCE_REJECTED.labels(name, "overloaded")
+        self._expired = INFERENCE_REJECTED.labels(name, "deadline")
+
+    @property
+    def pool(self):
+        """The underlying concurrent.futures executor, (re)created on first
+        use
+        """
+        if self._pool is None:
+            if self.kind == "thread":
+                self._pool = ThreadPoolExecutor(
+                    self.max_workers, thread_name_prefix=self.name
+                )
+            else:
+                # fork: workers inherit the imported modules, so model loaders
+                # defined in the service module resolve without re-importing it
+                context = multiprocessing.get_context("fork")
+                self._pool = ProcessPoolExecutor(
+                    self.max_workers,
+                    mp_context=context,
+                    initializer=_init_worker,
+                )
+        return self._pool
+
+    @property
+    def pending(self):
+        """Calls admitted and not finished"""
+        return self._pending
+
+    @property
+    def capacity(self):
+        return self.max_workers + self.max_queue
+
+    def start(self):
+        """Start the workers now (process workers fork on first use
+        otherwise)
+        """
+        for future in [self.pool.submit(int) for _ in range(self.max_workers)]:
+            future.result()
+
+    async def run(self, fn, *args, deadline=None):
+        """``fn(*args)`` on the pool; raises Overloaded or DeadlineExceeded"""
+        if self._pending >= self.capacity:
+            self._overloaded.inc()
+            raise Overloaded(
+                f"{self.name}: {self._pending} calls in flight", retry_after=1
+            )
+        if deadline is not None and time.monotonic() >= deadline:
+            self._expired.inc()
+            raise DeadlineExceeded("deadline exceeded before inference")
+
+        self._pending += 1
+        self._in_flight.inc()
+        pool = self.pool
+        try:
+            future = asyncio.wrap_future(
+                pool.submit(_run_before_deadline, deadline, fn, args)
+            )
+            timeout = (
+                None
+                if deadline is None
+                else max(0.0, deadline - time.monotonic())
+            )
+            try:
+                # A call that has not started yet is cancelled on timeout
+                return await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError:
+                self._expired.inc()
+                raise DeadlineExceeded(
+                    "deadline exceeded during inference"
+                ) from None
+            except DeadlineExceeded:
+                self._expired.inc()
+                raise
+        except BrokenExecutor:
+            # A dead process worker breaks the whole ProcessPoolExecutor:
+            # without a new one every later call would fail the same way
+            self._replace(pool)
+            raise WorkerLost(
+                f"{self.name}: an inference worker died", retry_after=1
+            ) from None
+        finally:
+            self._pending -= 1
+            self._in_flight.dec()
+
+    def _replace(self, broken):
+        # Only the first of the calls failing on the same pool replaces it
+        if self._pool is not broken:
+            return
+        self._pool = None
+        INFERENCE_POOL_RESTARTS.labels(self.name).inc()
+        print(f"Inference pool {self.name} lost a worker, starting a new one")
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self, wait=False):
+        """Stop the workers; a later call starts a new pool"""
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=True)
+
+
+def inference_executor_from_env(
+    default_workers=None, default_kind="thread", name="inference", kind=None
+):
+    """InferenceExecutor configured by ``INFERENCE_*`` environment variables.
+
+    INFERENCE_EXECUTOR (thread or process; ignored when ``kind`` is given),
+    INFERENCE_WORKERS (default ``default_workers`` or the CPU count) and
+    INFERENCE_QUEUE_DEPTH (calls allowed to wait for a worker, default 64).
+    """
+    workers = (
+        int(os.getenv("INFERENCE_WORKERS", "0"))
+        or default_workers
+        or os.cpu_count()
+        or 1
+    )
+    return InferenceExecutor(
+        max_workers=workers,
+        max_queue=int(os.getenv("INFERENCE_QUEUE_DEPTH", "64")),
+        kind=kind or os.getenv("INFERENCE_EXECUTOR", default_kind),
+        name=name,
+    )
+
+
+# Models of process workers by (path, version): a model file replaced in
+# place keeps its path but gets a new version. Entries shared by the server
+# before its workers fork are inherited by them, already loaded
+_worker_models = OrderedDict()
+WORKER_KEEP_MODELS = 2
+
+
+def _keep_worker_model(key, model):
+    _worker_models[key] = model
+    _worker_models.move_to_end(key)
+    while len(_worker_models) > WORKER_KEEP_MODELS:
+        _worker_models.popitem(last=False)
+
+
+def share_worker_model(path, version, model):
+    """Hand the server's loaded ``model`` to process workers forked from now
+    on, so they score with it instead of loading ``path`` again
+    """
+    _keep_worker_model((path, version), model)
+
+
+def call_worker_model(loader, path, version, method, *args):
+    """``<model>.<method>(*args)`` in a worker process.
+
+    The model shared before the worker forked is used when its version
+    matches; a version the worker has not got (one activated after the
+    fork) is loaded with ``loader(path)`` once and kept.
+    """
+    key = (path, version)
+    model = _worker_models.get(key)
+    if model is None:
+        model = loader(path)
+    _keep_worker_model(key, model)
+    return getattr(model, method)(*args)
@@ -0,0 +1,215 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+from prometheus_client import REGISTRY, Counter, Gauge, Histogram
+from prometheus_client.core import HistogramMetricFamily
+
+# Names match the alerts in prometheus-rules.yaml
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+)
+ROW_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096, 16384)
+SCORE_BUCKETS = tuple(np.round(np.linspace(0.1, 1.0, 10), 2))
+
+PREDICTIONS = Counter(
+    "credit_scoring_predictions",
+    "Scored rows by outcome: success, invalid (bad input), overloaded "
+    "(shed under load or past the deadline) or error",
+    ["status", "model_version"],
+)
+PREDICTION_DURATION = Histogram(
+    "credit_scoring_prediction_duration_seconds",
+    "End-to-end time spent in a scoring endpoint",
+    ["endpoint"],
+    buckets=LATENCY_BUCKETS,
+)
+DESERIALIZATION_DURATION = Histogram(
+    "credit_scoring_deserialization_duration_seconds",
+    "Time to decode and validate a request body into a feature matrix",
+    ["endpoint"],
+    buckets=LATENCY_BUCKETS,
+)
+INFERENCE_DURATION = Histogram(
+    "credit_scoring_inference_duration_seconds",
+    "Time spent in session.run for one batch",
+    buckets=LATENCY_BUCKETS,
+)
+SERIALIZATION_DURATION = Histogram(
+    "credit_scoring_serialization_duration_seconds",
+    "Time to encode a response body",
+    ["endpoint"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUEST_ROWS = Histogram(
+    "credit_scoring_request_rows",
+    "Feature rows per scoring request",
+    ["endpoint"],
+    buckets=ROW_BUCKETS,
+)
+MODEL_LOADED = Gauge(
+    "credit_scoring_model_loaded",
+    "1 when a model is loaded and serving",
+)
+
+
+class BulkHistogram:
+    """Histogram collector that takes a whole array per observation.
+
+    prometheus_client histograms cost a Python call per value; scores of a
+    10k-row batch are instead binned with one ``np.searchsorted`` and added
+    to per-label count arrays.
+    """
+
+    def __init__(
+        self,
+        name,
+        documentation,
+        buckets,
+        label="model_version",
+        registry=REGISTRY,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.upper_bounds = np.asarray(buckets, dtype=np.float64)
+        self._bounds = tuple(float(bound) for bound in buckets)
+        self.label = label
+        self._series = {}
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def _get_series(self, label_value):
+        series = self._series.get(label_value)
+        if series is None:
+            series = self._series[label_value] = [
+                np.zeros(len(self._bounds) + 1, dtype=np.int64),
+                0.0,
+            ]
+        return series
+
+    def observe(self, value, label_value=""):
+        """Single value without the NumPy round trip (the /predict path)"""
+        value = float(value)
+        index = bisect.bisect_left(self._bounds, value)
+        with self._lock:
+            series = self._get_series(label_value)
+            series[0][index] += 1
+            series[1] += value
+
+    def observe_many(self, values, label_value=""):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if values.size == 0:
+            return
+        # Index of the first bucket whose upper bound is >= value
+        # (le semantics)
+        counts = np.bincount(
+            np.searchsorted(self.upper_bounds, values, side="left"),
+            minlength=len(self.upper_bounds) + 1,
+        )
+        total = float(values.sum())
+        with self._lock:
+            series = self._get_series(label_value)
+            series[0] += counts
+            series[1] += total
+
+    def collect(self):
+        family = HistogramMetricFamily(
+            self.name, self.documentation, labels=[self.label]
+        )
+        with self._lock:
+            snapshot = [
+                (key, counts.copy(), total)
+                for key, (counts, total) in self._series.items()
+            ]
+        for label_value, counts, total in snapshot:
+            cumulative = np.cumsum(counts)
+            buckets = [
+                (str(bound), int(count))
+                for bound, count in zip(self.upper_bounds, cumulative)
+            ]
+            buckets.append(("+Inf", int(cumulative[-1])))
+            family.add_metric([label_value], buckets, total)
+        yield family
+
+
+SCORES = BulkHistogram(
+    "credit_scoring_score",
+    "Distribution of predicted default scores",
+    SCORE_BUCKETS,
+)
+
+
+class PredictionMetrics:
+    """Per-service handle that caches labelled children for the hot path"""
+
+    def __init__(self):
+        self._counters = {}
+        self._endpoint_children = {}
+
+    def _counter(self, status, model_version):
+        key = (status, model_version)
+        counter = self._counters.get(key)
+        if counter is None:
+            counter = self._counters[key] = PREDICTIONS.labels(
+                status, model_version or "none"
+            )
+        return counter
+
+    def _endpoint(self, metric, endpoint):
+        key = (metric, endpoint)
+        child = self._endpoint_children.get(key)
+        if child is None:
+            child = self._endpoint_children[key] = metric.labels(endpoint)
+        return child
+
+    def count(self, status, model_version, rows=1):
+        if rows:
+            self._counter(status, model_version).inc(rows)
+
+    def observe_request(self, endpoint, rows, duration):
+        self._endpoint(PREDICTION_DURATION, endpoint).observe(duration)
+        self._endpoint(REQUEST_ROWS, endpoint).observe(rows)
+
+    def observe_score(self, score, model_version):
+        SCORES.observe(score, model_version or "none")
+
+    def observe_scores(self, scores, model_version):
+        SCORES.observe_many(scores, model_version or "none")
+
+    @contextmanager
+    def time_deserialization(self, endpoint):
+        start = time.perf_counter()
+        yield
+        self._endpoint(DESERIALIZATION_DURATION, endpoint).observe(
+            time.perf_counter() - start
+        )
+
+    @contextmanager
+    def time_serialization(self, endpoint):
+        start = time.perf_counter()
+        yield
+        self._endpoint(SERIALIZATION_DURATION, endpoint).observe(
+            time.perf_counter() - start
+        )
+
+    @staticmethod
+    def observe_inference(duration):
+        INFERENCE_DURATION.observe(duration)
+
+    @staticmethod
+    def set_model_loaded(loaded):
+        MODEL_LOADED.set(1 if loaded else 0)
@@ -0,0 +1,232 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+
+def current_rss():
+    """Resident set size of this process in bytes"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+
+        # Peak rather than current RSS, but the best portable fallback
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+@dataclass
+class ModelVersion:
+    version: str
+    path: str
+    model: object = field(repr=False)
+    loaded_at: float
+    load_seconds: float
+    rss_delta_bytes: int
+
+    def describe(self):
+        return {
+            "version": self.version,
+            "path": self.path,
+            "loaded_at": self.loaded_at,
+            "load_seconds": round(self.load_seconds, 4),
+            "rss_delta_bytes": self.rss_delta_bytes,
+        }
+
+
+def discover_version(source, model_filename=None):
+    """Return (version, model path) that ``source`` currently points to.
+
+    ``source`` may be
+      * a registry index ``*.json``:
+        {"active": "v2", "versions": {"v2": "v2/model.onnx"}}
+        with paths relative to the index; edit "active" to roll out or back;
+      * a directory of version subdirectories, each holding ``model_filename``;
+        the greatest version name wins (copy into a temporary name and rename
+        so half-written versions are never picked up);
+      * a single model file, versioned by its modification time (in ns) and
+        size, so a file that failed to load half-written is retried once it
+        is complete, even within the same second.
+    """
+    if source.endswith(".json"):
+        with open(source) as f:
+            index = json.load(f)
+        version = str(index["active"])
+        path = index["versions"][version]
+        if isinstance(path, dict):
+            path = path["path"]
+        return version, os.path.join(
+            os.path.dirname(os.path.abspath(source)), path
+        )
+
+    if os.path.isdir(source):
+        versions = sorted(
+            name
+            for name in os.listdir(source)
+            if not name.startswith(".")
+            and os.path.isfile(
+                os.path.join(source, name, model_filename or "")
+            )
+        )
+        if not versions:
+            raise FileNotFoundError(f"No model versions in {source}")
+        return versions[-1], os.path.join(source, versions[-1], model_filename)
+
+    stat = os.stat(source)
+    version = f"{os.path.basename(source)}@{stat.st_mtime_ns}-{stat.st_size}"
+    return version, source
+
+
+class ModelManager:
+    """Loads model versions in the background and swaps them atomically.
+
+    ``loader(path)`` builds a scoring object and ``warmup(model)`` (optional)
+    primes it before it takes traffic. Requests call ``get()`` once and keep
+    that reference, so in-flight work finishes on the version it started
+    with while new requests see the new one. The last ``keep_versions``
+    versions stay resident for instant rollback via ``activate``.
+    """
+
+    def __init__(self, loader, source, model_filename=None, warmup=None,
+                 keep_versions=2, poll_interval=0.0):
+        self.loader = loader
+        self.source = source
+        self.model_filename = model_filename
+        self.warmup = warmup
+        self.keep_versions = max(1, int(keep_versions))
+        self.poll_interval = poll_interval
+        self.active = None
+        self.resident = OrderedDict()
+        self.last_error = None
+        self._failed = None
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def get(self):
+        active = self.active
+        return active.model if active is not None else None
+
+    @property
+    def version(self):
+        active = self.active
+        return active.version if active is not None else None
+
+    def add_listener(self, callback):
+        """Call ``callback(new_version, old_version)`` after every swap"""
+        self._listeners.append(callback)
+
+    def _load(self, version, path):
+        rss_before = current_rss()
+        start = time.perf_counter()
+        model = self.loader(path)
+        if self.warmup is not None:
+            self.warmup(model)
+        return ModelVersion(
+            version=version,
+            path=path,
+            model=model,
+            loaded_at=time.time(),
+            load_seconds=time.perf_counter() - start,
+            rss_delta_bytes=current_rss() - rss_before,
+        )
+
+    def _swap(self, entry):
+        previous = self.active
+        self.resident[entry.version] = entry
+        self.resident.move_to_end(entry.version)
+        self.active = entry
+
+        while len(self.resident) > self.keep_versions:
+            evicted, _ = self.resident.popitem(last=False)
+            print(f"Model version {evicted} unloaded")
+
+        print(
+            f"Active model version: {entry.version} "
+            f"(loaded in {entry.load_seconds:.2f}s, "
+            f"+{entry.rss_delta_bytes / 2**20:.1f} MiB RSS, "
+            f"{len(self.resident)} resident, "
+            f"process RSS {current_rss() / 2**20:.1f} MiB)"
+        )
+        for callback in self._listeners:
+            callback(entry.version, previous.version if previous else None)
+
+    def check(self):
+        """Activate the version the source points to; True if it changed"""
+        with self._lock:
+            try:
+                version, path = discover_version(
+                    self.source, self.model_filename
+                )
+            except (OSError, ValueError, KeyError) as e:
+                self.last_error = f"Cannot read model source: {e}"
+                return False
+
+            if self.active is not None and self.active.version == version:
+                return False
+            if version in self.resident:
+                self._swap(self.resident[version])
+                return True
+            if self._failed == version:
+                return False
+
+            try:
+                entry = self._load(version, path)
+            except Exception as e:
+                self._failed = version
+                self.last_error = (
+                    f"Failed to load model version {version}: {e}"
+                )
+                print(self.last_error)
+                return False
+
+            self.last_error = None
+            self._swap(entry)
+            return True
+
+    def activate(self, version):
+        """Switch back to a resident version"""
+        with self._lock:
+            if version not in self.resident:
+                raise KeyError(f"Model version {version} is not resident")
+            self._swap(self.resident[version])
+
+    def start(self):
+        """Poll the source every ``poll_interval`` seconds in a daemon
+        thread
+        """
+        running = self._thread is not None and self._thread.is_alive()
+        if self.poll_interval <= 0 or running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._poll, name="model-manager", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval + 1)
+
+    def _poll(self):
+        while not self._stop.wait(self.poll_interval):
+            self.check()
+
+    def status(self):
+        active = self.active
+        return {
+            "active_version": active.version if active else None,
+            "resident_versions": [
+                entry.describe() for entry in self.resident.values()
+            ],
+            "resident_rss_delta_bytes": sum(
+                entry.rss_delta_bytes for entry in self.resident.values()
+            ),
+            "process_rss_bytes": current_rss(),
+            "last_error": self.last_error,
+        }
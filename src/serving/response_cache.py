@@ -0,0 +1,242 @@
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from prometheus_client import Counter, Gauge
+
+CACHE_REQUESTS = Counter(
+    "credit_scoring_response_cache_requests",
+    "Response cache lookups by result: hit, shared_hit or miss",
+    ["result"],
+)
+CACHE_EVICTIONS = Counter(
+    "credit_scoring_response_cache_evictions",
+    "Entries dropped from the local response cache by reason: capacity, "
+    "expired or invalidated",
+    ["reason"],
+)
+CACHE_ENTRIES = Gauge(
+    "credit_scoring_response_cache_entries",
+    "Entries in the local response cache",
+)
+
+
+def cache_key(features, model_version, dtype=np.float32):
+    """Digest of a feature vector, as the model consumes it, and the model
+    version.
+
+    Values are cast to ``dtype`` (payloads that differ only below the model's
+    input precision get the same key) and -0.0 is folded into 0.0.
+    """
+    row = np.ascontiguousarray(features, dtype=dtype) + dtype(0)
+    digest = hashlib.blake2b(str(model_version).encode(), digest_size=16)
+    digest.update(row.tobytes())
+    return digest.hexdigest()
+
+
+class InMemoryStore:
+    """Local stand-in for a shared key-value store such as Redis.
+
+    Implements the ``get(name)`` / ``set(name, value, ex=seconds)`` subset
+    RemoteBackend uses, with expiry, so several caches in one process (or
+    tests) can share it the way pods share a Redis instance.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._items = {}
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        with self._lock:
+            item = self._items.get(name)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at is not None and self.clock() >= expires_at:
+                del self._items[name]
+                return None
+            return value
+
+    def set(self, name, value, ex=None):
+        with self._lock:
+            self._items[name] = (
+                bytes(value),
+                self.clock() + ex if ex else None,
+            )
+        return True
+
+    def flushdb(self):
+        with self._lock:
+            self._items.clear()
+
+
+class RemoteBackend:
+    """Shared second tier over a Redis-like client; failures count as misses"""
+
+    def __init__(self, client, prefix="credit-scoring:response:", ttl=None):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+        self.errors = 0
+
+    def get(self, key):
+        try:
+            return self.client.get(self.prefix + key)
+        except Exception:
+            self.errors += 1
+            return None
+
+    def set(self, key, value):
+        try:
+            self.client.set(
+                self.prefix + key,
+                value,
+                ex=int(self.ttl) if self.ttl else None,
+            )
+        except Exception:
+            self.errors += 1
+
+
+class ResponseCache:
+    """Serialized responses of ``/predict`` keyed by features and model
+    version.
+
+    The local tier is an LRU of at most ``maxsize`` entries that expire after
+    ``ttl`` seconds; ``backend`` (optional, e.g. RemoteBackend) is looked up
+    on a local miss and filled on every store, so pods share repeat traffic.
+    Keys include the model version, and ``bind(manager)`` also clears the
+    local tier on every model swap. Async handlers use ``aget``/``aset``,
+    which make the shared tier's blocking calls in a worker thread.
+    """
+
+    def __init__(
+        self, maxsize=10_000, ttl=300.0, backend=None, clock=time.monotonic
+    ):
+        self.maxsize = int(maxsize)
+        self.ttl = ttl
+        self.backend = backend
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = CACHE_REQUESTS.labels("hit")
+        self._shared_hits = CACHE_REQUESTS.labels("shared_hit")
+        self._misses = CACHE_REQUESTS.labels("miss")
+
+    key = staticmethod(cache_key)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Cached response body for ``key``, or None"""
+        now = self.clock()
+        body = self._get_local(key, now)
+        if body is None and self.backend is not None:
+            body = self._shared(key, self.backend.get(key), now)
+        if body is None:
+            self._misses.inc()
+        return body
+
+    async def aget(self, key):
+        """``get`` for the event loop: a local hit never leaves it"""
+        now = self.clock()
+        body = self._get_local(key, now)
+        if body is None and self.backend is not None:
+            body = self._shared(
+                key, await asyncio.to_thread(self.backend.get, key), now
+            )
+        if body is None:
+            self._misses.inc()
+        return body
+
+    def set(self, key, body):
+        self._store_local(key, body, self.clock())
+        if self.backend is not None:
+            self.backend.set(key, body)
+
+    async def aset(self, key, body):
+        """``set`` for the event loop"""
+        self._store_local(key, body, self.clock())
+        if self.backend is not None:
+            await asyncio.to_thread(self.backend.set, key, body)
+
+    def _get_local(self, key, now):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            body, expires_at = entry
+            if expires_at is None or now < expires_at:
+                self._entries.move_to_end(key)
+                self._hits.inc()
+                return body
+            del self._entries[key]
+        CACHE_EVICTIONS.labels("expired").inc()
+        return None
+
+    def _shared(self, key, body, now):
+        # Hit in the shared tier: keep a local copy for the next lookups
+        if body is not None:
+            self._store_local(key, body, now)
+            self._shared_hits.inc()
+        return body
+
+    def _store_local(self, key, body, now):
+        with self._lock:
+            self._entries[key] = (body, now + self.ttl if self.ttl else None)
+            self._entries.move_to_end(key)
+            evicted = 0
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                evicted += 1
+            size = len(self._entries)
+        if evicted:
+            CACHE_EVICTIONS.labels("capacity").inc(evicted)
+        CACHE_ENTRIES.set(size)
+
+    def invalidate(self):
+        """Drop all local entries (shared entries carry the old version in
+        their key)
+        """
+        with self._lock:
+            dropped = len(self._entries)
+            self._entries.clear()
+        if dropped:
+            CACHE_EVICTIONS.labels("invalidated").inc(dropped)
+        CACHE_ENTRIES.set(0)
+
+    def bind(self, manager):
+        """Invalidate on every swap of a ModelManager (or PolicyStore)"""
+        manager.add_listener(
+            lambda new_version, old_version: self.invalidate()
+        )
+        return self
+
+
+def response_cache_from_env():
+    """ResponseCache configured by ``RESPONSE_CACHE_*``, or None when disabled.
+
+    RESPONSE_CACHE_SIZE (entries, 0 disables), RESPONSE_CACHE_TTL_SECONDS and
+    RESPONSE_CACHE_REDIS_URL (optional shared tier, needs the redis package).
+    """
+    size = int(os.getenv("RESPONSE_CACHE_SIZE", "0"))
+    if size <= 0:
+        return None
+    ttl = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "300"))
+    backend = None
+    url = os.getenv("RESPONSE_CACHE_REDIS_URL")
+    if url:
+        try:
+            import redis
+
+            backend = RemoteBackend(
+                redis.Redis.from_url(url, socket_timeout=0.05), ttl=ttl
+            )
+        except ImportError:
+            print("redis is not installed, response cache stays process-local")
+    return ResponseCache(size, ttl, backend)
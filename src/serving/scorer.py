@@ -0,0 +1,73 @@
+import numpy as np
+
+# Output name skl2onnx gives the class-probability matrix
+PROBABILITY_OUTPUT = "probabilities"
+
+ONNX_DTYPES = {
+    "tensor(float)": np.float32,
+    "tensor(double)": np.float64,
+    "tensor(int64)": np.int64,
+    "tensor(int32)": np.int32,
+}
+
+
+class OnnxScorer:
+    """Float32 feature matrix in, 1-D default scores out.
+
+    Handles both model layouts the service may be given: a single anonymous
+    [batch, n_features] input (credit_model.onnx) and one named [batch, 1]
+    input per feature (pipelines exported by src.models.onnx_model). For the
+    latter the score is the positive-class column of ``probabilities``.
+    """
+
+    def __init__(self, session, batch_size=32):
+        self.session = session
+        self.batch_size = max(1, int(batch_size))
+
+        inputs = session.get_inputs()
+        self.input_names = [item.name for item in inputs]
+        self.input_dtypes = [
+            ONNX_DTYPES.get(item.type, np.float32) for item in inputs
+        ]
+        self.per_feature_inputs = len(inputs) > 1
+        if self.per_feature_inputs:
+            self.n_features = len(inputs)
+        else:
+            width = inputs[0].shape[-1]
+            self.n_features = width if isinstance(width, int) else None
+
+        output_names = [item.name for item in session.get_outputs()]
+        if PROBABILITY_OUTPUT in output_names:
+            self.output_name, self.output_column = PROBABILITY_OUTPUT, 1
+        else:
+            self.output_name, self.output_column = output_names[0], 0
+
+    def feed(self, matrix):
+        if not self.per_feature_inputs:
+            return {self.input_names[0]: matrix}
+        return {
+            name: matrix[:, position:position + 1].astype(dtype, copy=False)
+            for position, (name, dtype) in enumerate(
+                zip(self.input_names, self.input_dtypes)
+            )
+        }
+
+    def _run(self, matrix):
+        output = self.session.run([self.output_name], self.feed(matrix))[0]
+        return output.reshape(len(matrix), -1)[:, self.output_column]
+
+    def score(self, matrix):
+        """Score a matrix with as few session.run calls as batch_size allows"""
+        n_rows = matrix.shape[0]
+        if n_rows == 0:
+            return np.empty(0, dtype=np.float32)
+        if n_rows <= self.batch_size:
+            return self._run(matrix)
+
+        scores = np.empty(n_rows, dtype=np.float32)
+        for start in range(0, n_rows, self.batch_size):
+            stop = start + self.batch_size
+            scores[start:stop] = self._run(matrix[start:stop])
+        return scores
+
+    __call__ = score
@@ -0,0 +1,201 @@
+import hashlib
+import itertools
+import json
+import os
+from dataclasses import dataclass, fields
+
+import onnxruntime as ort
+
+EXECUTION_MODES = {
+    "sequential": ort.ExecutionMode.ORT_SEQUENTIAL,
+    "parallel": ort.ExecutionMode.ORT_PARALLEL,
+}
+
+OPTIMIZATION_LEVELS = {
+    "disable": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+
+# Environment variable for every SessionConfig field
+ENV_PREFIX = "ORT_"
+CONFIG_FILE_ENV = "ORT_CONFIG_FILE"
+
+
+@dataclass
+class SessionConfig:
+    """ONNX Runtime session settings; 0 threads means the ORT default"""
+
+    intra_op_threads: int = 0
+    inter_op_threads: int = 0
+    execution_mode: str = "sequential"
+    optimization_level: str = "all"
+    optimized_model_path: str = ""
+    enable_cpu_mem_arena: bool = True
+    enable_mem_pattern: bool = True
+    pool_size: int = 1
+    log_severity_level: int = 3
+
+    def __post_init__(self):
+        if self.execution_mode not in EXECUTION_MODES:
+            raise ValueError(f"Unknown execution_mode: {self.execution_mode}")
+        if self.optimization_level not in OPTIMIZATION_LEVELS:
+            raise ValueError(
+                f"Unknown optimization_level: {self.optimization_level}"
+            )
+        if self.pool_size < 1:
+            raise ValueError("pool_size must be at least 1")
+
+    @classmethod
+    def from_env(cls, environ=None):
+        """Read settings from ORT_CONFIG_FILE (JSON), then ORT_* overrides"""
+        environ = os.environ if environ is None else environ
+        values = {}
+
+        config_file = environ.get(CONFIG_FILE_ENV)
+        if config_file:
+            with open(config_file) as f:
+                values.update(json.load(f))
+
+        for field in fields(cls):
+            raw = environ.get(ENV_PREFIX + field.name.upper())
+            if raw is not None:
+                values[field.name] = raw
+
+        unknown = set(values) - {field.name for field in fields(cls)}
+        if unknown:
+            raise ValueError(f"Unknown session settings: {sorted(unknown)}")
+
+        return cls(**{
+            field.name: _coerce(values[field.name], field.type)
+            for field in fields(cls) if field.name in values
+        })
+
+
+def _coerce(value, field_type):
+    if field_type is bool and isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return field_type(value)
+
+
+def build_session_options(config):
+    """Translate a SessionConfig into ort.SessionOptions"""
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = config.intra_op_threads
+    options.inter_op_num_threads = config.inter_op_threads
+    options.execution_mode = EXECUTION_MODES[config.execution_mode]
+    options.graph_optimization_level = OPTIMIZATION_LEVELS[
+        config.optimization_level
+    ]
+    options.enable_cpu_mem_arena = config.enable_cpu_mem_arena
+    options.enable_mem_pattern = config.enable_mem_pattern
+    options.log_severity_level = config.log_severity_level
+    return options
+
+
+def source_digest(model_path):
+    """SHA-256 of a model file and its external-data file (``<model>.data``)"""
+    digest = hashlib.sha256()
+    for path in (model_path, model_path + ".data"):
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+    return digest.hexdigest()
+
+
+def optimized_cache_path(optimized_model_path, model_path):
+    """Cache file of one source model: ``optimized_model_path`` plus a key of
+    the source path
+    """
+    root, ext = os.path.splitext(optimized_model_path)
+    key = hashlib.sha256(os.path.abspath(model_path).encode()).hexdigest()[:12]
+    return f"{root}.{key}{ext or '.onnx'}"
+
+
+def resolve_model_path(model_path, config):
+    """Return the model to load, the options to load it with and the digest
+    to record once the session has written the optimized graph (or None).
+
+    With ``optimized_model_path`` set, the first start writes the optimized
+    graph (and its own external-data file) next to it, in a file named after
+    the source model, with the SHA-256 of the source in ``<cache>.sha256``.
+    Later starts load the cache with graph optimization disabled as long as
+    the recorded hash matches the source; any other content (a rollback to
+    an older version, a model replaced in place) rebuilds it.
+    """
+    options = build_session_options(config)
+    if not config.optimized_model_path:
+        return model_path, options, None
+
+    cached = optimized_cache_path(config.optimized_model_path, model_path)
+    digest = source_digest(model_path)
+    try:
+        with open(cached + ".sha256") as f:
+            recorded = f.read().strip()
+    except OSError:
+        recorded = None
+    if recorded == digest and os.path.exists(cached):
+        options.graph_optimization_level = OPTIMIZATION_LEVELS["disable"]
+        return cached, options, None
+
+    os.makedirs(os.path.dirname(os.path.abspath(cached)), exist_ok=True)
+    # The old hash goes first, so a half-written cache is never trusted
+    if recorded is not None:
+        os.remove(cached + ".sha256")
+    options.optimized_model_filepath = cached
+    options.add_session_config_entry(
+        "session.optimized_model_external_initializers_file_name",
+        os.path.basename(cached) + ".data",
+    )
+    return model_path, options, digest
+
+
+def create_session(model_path, config=None):
+    """Create one InferenceSession from a SessionConfig"""
+    config = config or SessionConfig()
+    path, options, digest = resolve_model_path(model_path, config)
+    session = ort.InferenceSession(
+        path, options, providers=["CPUExecutionProvider"]
+    )
+    if digest is not None:
+        # The session has written the optimized graph: record its source
+        stamp = options.optimized_model_filepath + ".sha256"
+        with open(stamp + ".tmp", "w") as f:
+            f.write(digest)
+        os.replace(stamp + ".tmp", stamp)
+    return session
+
+
+class SessionPool:
+    """N identical sessions with round-robin dispatch.
+
+    Exposes the subset of the InferenceSession API the services use, so it
+    can stand in for a single session.
+    """
+
+    def __init__(self, model_path, config=None):
+        self.config = config or SessionConfig()
+        self.model_path = model_path
+        self.sessions = [create_session(model_path, self.config)]
+        # Sessions after the first load the optimized graph it cached
+        self.sessions.extend(
+            create_session(model_path, self.config)
+            for _ in range(self.config.pool_size - 1)
+        )
+        self._next_session = itertools.cycle(self.sessions)
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def run(self, output_names, input_feed, run_options=None):
+        return next(self._next_session).run(
+            output_names, input_feed, run_options
+        )
+
+    def get_inputs(self):
+        return self.sessions[0].get_inputs()
+
+    def get_outputs(self):
+        return self.sessions[0].get_outputs()
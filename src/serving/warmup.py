@@ -0,0 +1,37 @@
+import time
+import numpy as np
+from prometheus_client import Gauge
+
+WARMUP_DURATION = Gauge(
+    "credit_scoring_warmup_duration_seconds",
+    "Duration of the last model warm-up",
+)
+
+
+def parse_batch_sizes(value, default=(1,)):
+    """Parse a comma-separated list of batch sizes such as "1,8,32" """
+    sizes = sorted(
+        {int(item) for item in str(value or "").split(",") if item.strip()}
+    )
+    return tuple(size for size in sizes if size > 0) or tuple(default)
+
+
+def warm_up(score, n_features, batch_sizes=(1,), rounds=3, seed=0):
+    """Run synthetic batches of every expected size through ``score``.
+
+    The first runs at a given shape allocate arena memory and pick kernels;
+    doing that here keeps the cost off the first real requests. Returns the
+    duration in seconds, which is also exported as a gauge.
+    """
+    start = time.perf_counter()
+    if n_features is not None:
+        rng = np.random.default_rng(seed)
+        for batch_size in batch_sizes:
+            batch = rng.standard_normal((batch_size, n_features)).astype(
+                np.float32
+            )
+            for _ in range(rounds):
+                score(batch)
+    duration = time.perf_counter() - start
+    WARMUP_DURATION.set(duration)
+    return duration
@@ -0,0 +1,231 @@
+"""Multi-process serving with a preloaded application.
+
+The master process binds the listening socket, imports the application
+once and forks ``--workers`` uvicorn servers that accept on the shared
+socket. Libraries, the parsed application and anything the module loads at
+import time (the sklearn pipeline of src/api/app.py) are shared copy-on-write,
+so a worker starts in milliseconds and adds little memory. ONNX Runtime
+sessions are not fork-safe and are created by each worker in its lifespan,
+so every worker holds a private copy of the ONNX weights: memory grows with
+the worker count. Workers that exit are replaced.
+
+Without ``--workers`` or SERVING_WORKERS (0 means the same) there is one
+worker per whole CPU of the container's cgroup limit, at least one: a pod
+limited to 500m CPU runs a single worker instead of several competing for
+half a core.
+
+Each worker serves its own /metrics; Prometheus sees one worker per scrape.
+
+Usage: python -m src.serving.workers src.app:app [--workers N]
+           [--host 0.0.0.0] [--port 8000] [--no-preload]
+"""
+import argparse
+import importlib
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+
+# Per-worker defaults: parallelism comes from the worker count, so each
+# worker scores on one thread instead of every worker using every core
+WORKER_DEFAULTS = {
+    "ORT_INTRA_OP_THREADS": "1",
+    "INFERENCE_EXECUTOR": "thread",
+    "INFERENCE_WORKERS": "1",
+}
+
+
+# CPU limit of the container: cgroup v2, then v1
+CGROUP_CPU_MAX = "/sys/fs/cgroup/cpu.max"
+CGROUP_CFS_QUOTA = "/sys/fs/cgroup/cpu/cpu.cfs_quota_us"
+CGROUP_CFS_PERIOD = "/sys/fs/cgroup/cpu/cpu.cfs_period_us"
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read().split()
+    except OSError:
+        return None
+
+
+def cpu_limit():
+    """CPUs granted by the cgroup quota (may be fractional), or None"""
+    fields = _read(CGROUP_CPU_MAX)
+    if fields is None:
+        quota, period = _read(CGROUP_CFS_QUOTA), _read(CGROUP_CFS_PERIOD)
+        fields = quota + period if quota and period else None
+    # "max" (v2) or -1 (v1) means no quota
+    if not fields or len(fields) < 2 or fields[0] in ("max", "-1"):
+        return None
+    try:
+        return int(fields[0]) / int(fields[1])
+    except (ValueError, ZeroDivisionError):
+        return None
+
+
+def default_workers():
+    """One worker per whole CPU of the cgroup limit or of the machine"""
+    cpus = os.cpu_count() or 1
+    limit = cpu_limit()
+    if limit is not None:
+        cpus = min(cpus, int(limit))
+    return max(1, cpus)
+
+
+def load_app(target):
+    """The object named by ``module:attribute``"""
+    module_name, _, attribute = target.partition(":")
+    return getattr(importlib.import_module(module_name), attribute or "app")
+
+
+def bind_socket(host, port, backlog=2048):
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    # Accepted connections inherit it; without it small responses wait for
+    # the client's delayed ACK (about 40 ms each)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+class Supervisor:
+    """Fork and watch the worker processes of one application"""
+
+    def __init__(
+        self,
+        target,
+        workers=1,
+        host="0.0.0.0",
+        port=8000,
+        preload=True,
+        log_level="info",
+    ):
+        self.target = target
+        self.workers = max(1, int(workers))
+        self.host = host
+        self.port = port
+        self.preload = preload
+        self.log_level = log_level
+        self.app = None
+        self.sock = None
+        self.children = {}
+        self.stopping = False
+
+    def _serve(self):
+        import uvicorn
+
+        app = self.app if self.app is not None else load_app(self.target)
+        config = uvicorn.Config(
+            app, log_level=self.log_level, access_log=False, lifespan="on"
+        )
+        uvicorn.Server(config).run(sockets=[self.sock])
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            # uvicorn installs its own handlers for a graceful shutdown
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            code = 0
+            try:
+                self._serve()
+            except BaseException:
+                traceback.print_exc()
+                code = 1
+            finally:
+                os._exit(code)
+        self.children[pid] = time.monotonic()
+        return pid
+
+    def stop(self, signum=None, frame=None):
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self):
+        for name, value in WORKER_DEFAULTS.items():
+            os.environ.setdefault(name, value)
+        self.sock = bind_socket(self.host, self.port)
+        if self.preload:
+            start = time.perf_counter()
+            self.app = load_app(self.target)
+            elapsed = time.perf_counter() - start
+            print(f"Preloaded {self.target} in {elapsed:.2f}s")
+
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for _ in range(self.workers):
+            self.spawn()
+        print(
+            f"Serving {self.target} on {self.host}:{self.port} "
+            f"with {self.workers} workers "
+            f"(master {os.getpid()}, workers {sorted(self.children)})"
+        )
+
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            started = self.children.pop(pid, None)
+            if self.stopping or started is None:
+                continue
+            print(
+                f"Worker {pid} exited with status {status}, starting a new one"
+            )
+            # A worker that dies right away would otherwise be respawned in a
+            # busy loop
+            if time.monotonic() - started < 1:
+                time.sleep(1)
+            self.spawn()
+        self.sock.close()
+        return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        "app", help="application as module:attribute, e.g. src.app:app"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("SERVING_WORKERS", "0")),
+        help="worker processes; 0 sizes them from the CPU limit",
+    )
+    parser.add_argument("--host", default=os.getenv("SERVING_HOST", "0.0.0.0"))
+    parser.add_argument(
+        "--port", type=int, default=int(os.getenv("SERVING_PORT", "8000"))
+    )
+    parser.add_argument(
+        "--no-preload",
+        dest="preload",
+        action="store_false",
+        help="import the application in every worker after the fork",
+    )
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+    return Supervisor(
+        args.app,
+        args.workers or default_workers(),
+        args.host,
+        args.port,
+        args.preload,
+        args.log_level,
+    ).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
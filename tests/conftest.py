@@ -0,0 +1,84 @@
+import os
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+MODEL_PATH = os.path.join(ROOT_DIR, "credit_model.onnx")
+
+# src.app загружает ONNX модель при импорте
+os.environ.setdefault("MODEL_PATH", MODEL_PATH)
+
+
+@pytest.fixture
+def model_path():
+    return MODEL_PATH
+
+
+@pytest.fixture(scope="session")
+def onnx_client():
+    """TestClient для src.app после загрузки и прогрева модели"""
+    import time
+
+    pytest.importorskip("onnxruntime")
+    from fastapi.testclient import TestClient
+
+    import src.app
+
+    with TestClient(src.app.app) as client:
+        deadline = time.monotonic() + 30
+        while client.get("/startup").status_code != 200:
+            assert time.monotonic() < deadline, "model did not start"
+            time.sleep(0.05)
+        yield client
+
+
+def make_credit_frame(n_rows=2000, seed=0):
+    """Синтетические данные в формате data/processed/*.csv"""
+    import numpy as np
+    import pandas as pd
+
+    from src.features.schema import FEATURE_COLUMNS, TARGET_COLUMN
+
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame(
+        {
+            "LIMIT_BAL": rng.integers(10, 500, n_rows) * 1000.0,
+            "SEX": rng.integers(1, 3, n_rows),
+            "EDUCATION": rng.integers(1, 5, n_rows),
+            "MARRIAGE": rng.integers(1, 4, n_rows),
+            "AGE": rng.integers(21, 70, n_rows),
+            **{
+                f"PAY_{i}": rng.integers(-2, 6, n_rows)
+                for i in (0, 2, 3, 4, 5, 6)
+            },
+            **{
+                f"BILL_AMT{i}": rng.normal(50000, 30000, n_rows).round()
+                for i in range(1, 7)
+            },
+            **{
+                f"PAY_AMT{i}": np.abs(rng.normal(5000, 4000, n_rows)).round()
+                for i in range(1, 7)
+            },
+        }
+    )[FEATURE_COLUMNS]
+    logit = (
+        0.8 * frame["PAY_0"]
+        - frame["LIMIT_BAL"] / 2e5
+        + rng.normal(0, 1, n_rows)
+        - 1
+    )
+    frame[TARGET_COLUMN] = (logit > 0).astype(int)
+    return frame
+
+
+@pytest.fixture(scope="session")
+def credit_frame():
+    return make_credit_frame()
+
+
+@pytest.fixture(scope="session")
+def credit_frame_factory():
+    return make_credit_frame
@@ -0,0 +1,128 @@
+"""Тесты артефакта модели: манифест + сырые массивы вместо pickle"""
+import numpy as np
+import pytest
+
+pytest.importorskip("sklearn")
+import joblib  # noqa: E402
+from sklearn.ensemble import (  # noqa: E402
+    GradientBoostingClassifier,
+    HistGradientBoostingClassifier,
+)
+from sklearn.linear_model import LogisticRegression  # noqa: E402
+from sklearn.pipeline import Pipeline  # noqa: E402
+
+from src.features.behavior import BehaviorFeatures, FeatureCache  # noqa: E402
+from src.features.build_features import create_feature_pipeline  # noqa: E402
+from src.models.artifact import (  # noqa: E402
+    describe_artifact,
+    load_artifact,
+    load_compiled,
+    read_manifest,
+    save_artifact,
+)
+from src.models.compiled import (  # noqa: E402
+    CompiledLinear,
+    CompiledTrees,
+    compile_pipeline,
+)
+
+
+def fit(frame, classifier, behavior=False):
+    X = frame.drop(columns="DEFAULT")
+    steps = [("behavior", BehaviorFeatures())] if behavior else []
+    features = BehaviorFeatures().fit_transform(X) if behavior else X
+    steps += [
+        ("preprocessor", create_feature_pipeline(features)),
+        ("classifier", classifier),
+    ]
+    return Pipeline(steps).fit(X, frame["DEFAULT"])
+
+
+@pytest.mark.parametrize(
+    "classifier, compiled_type, behavior",
+    [
+        (LogisticRegression(max_iter=1000), CompiledLinear, False),
+        (
+            GradientBoostingClassifier(
+                n_estimators=30, max_depth=3, random_state=0
+            ),
+            CompiledTrees,
+            False,
+        ),
+        (
+            GradientBoostingClassifier(
+                n_estimators=30, max_depth=3, random_state=0
+            ),
+            CompiledTrees,
+            True,
+        ),
+    ],
+)
+def test_artifact_scores_like_the_pipeline(
+    credit_frame, tmp_path, classifier, compiled_type, behavior
+):
+    pipeline = fit(credit_frame, classifier, behavior)
+    path = str(tmp_path / "model.artifact")
+    save_artifact(pipeline, path, metrics={"roc_auc": 0.75})
+
+    X = credit_frame.drop(columns="DEFAULT").to_numpy(dtype=np.float64)
+    X[::7, 0] = np.nan
+    compiled = compile_pipeline(pipeline)
+    for mmap in (True, False):
+        model = load_artifact(
+            path,
+            mmap=mmap,
+            feature_cache=FeatureCache(100) if behavior else None,
+        )
+        assert isinstance(model, compiled_type)
+        np.testing.assert_array_equal(
+            model.predict_proba(X), compiled.predict_proba(X)
+        )
+        np.testing.assert_array_equal(model.predict(X), compiled.predict(X))
+
+    manifest = describe_artifact(path)
+    assert manifest["estimator"] == type(classifier).__name__
+    assert manifest["columns"] == list(pipeline.feature_names_in_)
+    assert (
+        manifest["dtypes"]["LIMIT_BAL"] == "float64"
+        and manifest["dtypes"]["SEX"] == "int64"
+    )
+    assert bool(manifest["derived_columns"]) == behavior
+    assert manifest["metrics"] == {"roc_auc": 0.75}
+    assert manifest["risk_bands"]["labels"] == ["low", "medium", "high"]
+
+
+def test_corrupted_artifact_is_refused(credit_frame, tmp_path):
+    path = str(tmp_path / "model.artifact")
+    save_artifact(fit(credit_frame, LogisticRegression(max_iter=1000)), path)
+    manifest, start = read_manifest(path)
+    offset = start + manifest["arrays"]["weights"]["offset"]
+
+    with open(path, "r+b") as f:
+        f.seek(offset)
+        f.write(b"\xff" * 8)
+    with pytest.raises(ValueError, match="checksum"):
+        load_artifact(path)
+    # Без проверки файл загружается: контрольная сумма - единственная защита
+    assert np.isnan(load_artifact(path, verify=False).weights[0])
+
+    with open(path, "r+b") as f:
+        f.write(b"not a model")
+    with pytest.raises(ValueError, match="not a model artifact"):
+        load_artifact(path)
+
+
+def test_pipelines_without_a_compiled_form_stay_pickles(
+    credit_frame, tmp_path
+):
+    pipeline = fit(credit_frame, HistGradientBoostingClassifier(max_iter=10))
+    with pytest.raises(ValueError, match="joblib pickle"):
+        save_artifact(pipeline, str(tmp_path / "model.artifact"))
+
+    path = str(tmp_path / "model.pkl")
+    joblib.dump(pipeline, path)
+    X = credit_frame.drop(columns="DEFAULT")
+    np.testing.assert_allclose(
+        load_compiled(path).predict_proba(X.to_numpy(dtype=np.float64)),
+        pipeline.predict_proba(X)[:, 1],
+    )
@@ -0,0 +1,258 @@
+"""Тесты пакетного скоринга ONNX сервиса"""
+import numpy as np
+import pytest
+
+from src.serving import build_feature_matrix
+
+
+@pytest.fixture(scope="module")
+def client(onnx_client):
+    return onnx_client
+
+
+@pytest.fixture(scope="module")
+def scorer(onnx_client):
+    import src.app
+    return src.app.manager.get()
+
+
+def test_build_feature_matrix_reports_bad_rows():
+    rows = [
+        [1.0, 2.0],
+        [1.0],
+        "oops",
+        [3, float("nan")],
+        [5, 6],
+        [1e300, 0],
+        [-(10**39), 0],
+    ]
+    matrix, valid, errors = build_feature_matrix(rows, 2)
+    assert matrix.dtype == np.float32 and matrix.flags["C_CONTIGUOUS"]
+    assert valid == [0, 4]
+    # 1e300 конечно как float, но в float32 стало бы inf
+    assert sorted(errors) == [1, 2, 3, 5, 6] and "float32" in errors[5]
+    np.testing.assert_array_equal(matrix, [[1, 2], [5, 6]])
+
+
+def test_batch_matches_single_predictions(client, scorer):
+    rng = np.random.default_rng(0)
+    rows = rng.normal(size=(70, scorer.n_features)).round(3).tolist()
+    rows.insert(3, [1.0, 2.0])
+
+    response = client.post("/predict/batch", json={"instances": rows})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["scored"] == 70 and body["failed"] == 1
+    assert body["predictions"][3]["error"] is not None
+
+    for index in (0, 10, 70):
+        single = client.post("/predict", json={"features": rows[index]}).json()
+        assert body["predictions"][index]["index"] == index
+        assert body["predictions"][index]["score"] == pytest.approx(
+            single["score"], abs=1e-6
+        )
+
+
+def test_values_beyond_float32_are_rejected(client, scorer):
+    row = [0.5] * scorer.n_features
+    row[0] = 1e300
+    response = client.post("/predict", json={"features": row})
+    assert (
+        response.status_code == 400 and "finite" in response.json()["detail"]
+    )
+
+    response = client.post(
+        "/predict/batch", json={"instances": [row, [0.5] * scorer.n_features]}
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["failed"] == 1 and body["predictions"][0]["score"] is None
+
+
+def test_microbatching_does_not_change_scores(scorer):
+    import asyncio
+    from src.serving import MicroBatcher
+
+    rng = np.random.default_rng(1)
+    rows = rng.normal(size=(100, scorer.n_features)).astype(np.float32)
+    batcher = MicroBatcher(scorer.score, max_batch_size=16, window_ms=5)
+
+    async def score_all():
+        return await asyncio.gather(*(batcher.submit(row) for row in rows))
+
+    coalesced = asyncio.run(score_all())
+    expected = [scorer.score(row[np.newaxis, :])[0] for row in rows]
+    np.testing.assert_array_equal(
+        np.array(coalesced, dtype=np.float32), expected
+    )
+
+
+@pytest.mark.parametrize(
+    "content_type", ["application/octet-stream", "application/x-npy"]
+)
+def test_binary_payloads_match_json(client, scorer, content_type):
+    import io
+    rows = (
+        np.random.default_rng(2)
+        .normal(size=(20, scorer.n_features))
+        .astype(np.float32)
+    )
+    rows[5, 0] = np.nan
+
+    if content_type == "application/x-npy":
+        buffer = io.BytesIO()
+        np.save(buffer, rows)
+        body, headers = buffer.getvalue(), {}
+    else:
+        body, headers = rows.tobytes(), {
+            "X-Shape": f"{rows.shape[0]},{rows.shape[1]}"
+        }
+
+    response = client.post(
+        "/predict/batch",
+        content=body,
+        headers={
+            "Content-Type": content_type,
+            "Accept": content_type,
+            **headers,
+        },
+    )
+    assert response.status_code == 200
+    assert response.headers["X-Failed-Rows"] == "1"
+    if content_type == "application/x-npy":
+        scores = np.load(io.BytesIO(response.content))
+    else:
+        scores = np.frombuffer(response.content, dtype="<f4")
+
+    as_json = client.post(
+        "/predict/batch", json={"instances": rows[[0, 19]].tolist()}
+    ).json()
+    assert np.isnan(scores[5])
+    assert scores[[0, 19]].tolist() == [
+        p["score"] for p in as_json["predictions"]
+    ]
+
+
+def test_probes_after_warm_up(client):
+    assert client.get("/startup").json()["status"] == "started"
+    assert client.get("/ready").json()["status"] == "ready"
+    assert (
+        "credit_scoring_warmup_duration_seconds" in client.get("/metrics").text
+    )
+
+
+def test_prediction_metrics_exported(client, scorer):
+    client.post(
+        "/predict/batch",
+        json={"instances": [[0.0] * scorer.n_features, [1.0]]},
+    )
+    text = client.get("/metrics").text
+
+    assert 'credit_scoring_predictions_total{model_version=' in text
+    assert 'status="success"' in text and 'status="invalid"' in text
+    assert ('credit_scoring_prediction_duration_seconds_bucket'
+            '{endpoint="predict_batch"' in text)
+    assert "credit_scoring_model_loaded 1.0" in text
+    assert "credit_scoring_score_bucket" in text
+
+
+def non_numeric_payload(kind, n_features):
+    import io
+    if kind.startswith("npy"):
+        buffer = io.BytesIO()
+        np.save(
+            buffer,
+            np.full(
+                (2, n_features),
+                "1.5",
+                dtype="U3" if kind == "npy-str" else "S3",
+            ),
+        )
+        return "application/x-npy", buffer.getvalue()
+
+    pa = pytest.importorskip("pyarrow")
+    if kind == "arrow-column":
+        table = pa.table(
+            {
+                f"f{i}": ["1.5", "x"] if i == 0 else [1.0, 2.0]
+                for i in range(n_features)
+            }
+        )
+    else:
+        values = pa.array(["1.5"] * (2 * n_features))
+        table = pa.table(
+            {"features": pa.FixedSizeListArray.from_arrays(values, n_features)}
+        )
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return "application/vnd.apache.arrow.stream", sink.getvalue().to_pybytes()
+
+
+@pytest.mark.parametrize(
+    "kind", ["npy-str", "npy-bytes", "arrow-column", "arrow-list"]
+)
+def test_non_numeric_binary_payloads_are_client_errors(client, scorer, kind):
+    # Строки и байты - ошибка клиента (400), а не сбой сервиса (500)
+    content_type, body = non_numeric_payload(kind, scorer.n_features)
+    response = client.post(
+        "/predict/batch", content=body, headers={"Content-Type": content_type}
+    )
+    assert response.status_code == 400
+    assert "numeric" in response.json()["detail"]
+
+
+@pytest.mark.parametrize("layout", ["list", "columns"])
+@pytest.mark.parametrize(
+    "content_type",
+    [
+        "application/vnd.apache.arrow.stream",
+        "application/vnd.apache.arrow.file",
+    ],
+)
+def test_arrow_payloads_match_json(client, scorer, content_type, layout):
+    pa = pytest.importorskip("pyarrow")
+    rows = (
+        np.random.default_rng(3)
+        .normal(size=(20, scorer.n_features))
+        .astype(np.float32)
+    )
+    if layout == "list":
+        # Строка целиком в одном столбце фиксированной длины
+        values = pa.array(rows.ravel())
+        table = pa.table(
+            {
+                "features": pa.FixedSizeListArray.from_arrays(
+                    values, scorer.n_features
+                )
+            }
+        )
+    else:
+        table = pa.table(
+            {f"f{i}": rows[:, i] for i in range(scorer.n_features)}
+        )
+    is_file = content_type.endswith(".file")
+    new_writer = pa.ipc.new_file if is_file else pa.ipc.new_stream
+    sink = pa.BufferOutputStream()
+    with new_writer(sink, table.schema) as writer:
+        writer.write_table(table)
+
+    response = client.post(
+        "/predict/batch",
+        content=sink.getvalue().to_pybytes(),
+        headers={"Content-Type": content_type, "Accept": content_type},
+    )
+    assert response.status_code == 200
+    assert response.headers["X-Failed-Rows"] == "0"
+    source = pa.py_buffer(response.content)
+    if is_file:
+        scores = pa.ipc.open_file(source).read_all()
+    else:
+        scores = pa.ipc.open_stream(source).read_all()
+
+    as_json = client.post(
+        "/predict/batch", json={"instances": rows.tolist()}
+    ).json()
+    assert scores.column("score").to_pylist() == [
+        p["score"] for p in as_json["predictions"]
+    ]
@@ -0,0 +1,159 @@
+"""Тесты производных признаков платежного поведения"""
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+
+from src.features.behavior import (
+    DERIVED_COLUMNS,
+    BehaviorFeatures,
+    FeatureCache,
+    derive_features,
+)
+from src.features.build_features import create_feature_pipeline
+from src.features.schema import FEATURE_COLUMNS
+from src.models.compiled import CompiledLinear, CompiledTrees, compile_pipeline
+from src.models.search import default_specs, run_search
+
+
+def reference_row(row):
+    """Построчная реализация тех же формул"""
+    limit = row["LIMIT_BAL"]
+    status = [row[f"PAY_{m}"] for m in (0, 2, 3, 4, 5, 6)]
+    bills = [row[f"BILL_AMT{m}"] for m in range(1, 7)]
+    ratios = [
+        (
+            min(max(row[f"PAY_AMT{m}"] / row[f"BILL_AMT{m + 1}"], 0.0), 1.0)
+            if row[f"BILL_AMT{m + 1}"] > 0
+            else 1.0
+        )
+        for m in range(1, 6)
+    ]
+    streak = 0
+    for value in status:
+        if value <= 0:
+            break
+        streak += 1
+    slope = np.polyfit(np.arange(6), bills[::-1], 1)[0]
+    return [
+        bills[0] / limit, np.mean(bills) / limit, max(bills) / limit,
+        ratios[0], np.mean(ratios),
+        sum(value > 0 for value in status), streak, max(max(status), 0),
+        slope / limit,
+    ]
+
+
+def test_matches_row_by_row_formulas(credit_frame):
+    X = credit_frame[FEATURE_COLUMNS]
+    expected = np.array(
+        [reference_row(row) for _, row in X.head(300).iterrows()]
+    )
+    np.testing.assert_allclose(
+        derive_features(X.head(300).to_numpy()),
+        expected,
+        rtol=1e-9,
+        atol=1e-12,
+    )
+
+    # Порядок столбцов задается явно
+    shuffled = list(reversed(FEATURE_COLUMNS))
+    np.testing.assert_array_equal(
+        derive_features(X[shuffled].to_numpy(), shuffled),
+        derive_features(X.to_numpy()),
+    )
+    with pytest.raises(ValueError, match="LIMIT_BAL"):
+        derive_features(
+            X.drop(columns="LIMIT_BAL").to_numpy(), FEATURE_COLUMNS[1:]
+        )
+
+
+@pytest.mark.parametrize(
+    "classifier, compiled_type",
+    [
+        (LogisticRegression(max_iter=1000), CompiledLinear),
+        (
+            GradientBoostingClassifier(
+                n_estimators=30, max_depth=3, random_state=42
+            ),
+            CompiledTrees,
+        ),
+    ],
+)
+def test_compiled_pipeline_derives_features(
+    credit_frame, classifier, compiled_type
+):
+    X = credit_frame[FEATURE_COLUMNS]
+    features = BehaviorFeatures()
+    pipeline = Pipeline([
+        ("features", features),
+        ("preprocessor", create_feature_pipeline(features.fit_transform(X))),
+        ("classifier", classifier),
+    ]).fit(X, credit_frame["DEFAULT"])
+    assert (
+        list(pipeline[0].get_feature_names_out())
+        == FEATURE_COLUMNS + DERIVED_COLUMNS
+    )
+
+    for cache in (None, FeatureCache()):
+        compiled = compile_pipeline(pipeline, feature_cache=cache)
+        assert isinstance(compiled, compiled_type)
+        # Сервис по-прежнему передает только исходные столбцы
+        assert compiled.columns == FEATURE_COLUMNS
+        np.testing.assert_allclose(
+            compiled.predict_proba(X.to_numpy()),
+            pipeline.predict_proba(X)[:, 1],
+            rtol=0,
+            atol=1e-12,
+        )
+        np.testing.assert_allclose(
+            compiled.predict_proba(compiled.row(X.iloc[0].to_dict())),
+            pipeline.predict_proba(X.head(1))[:, 1],
+            atol=1e-12,
+        )
+
+
+def test_feature_cache_reuses_and_evicts(credit_frame):
+    X = credit_frame[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+    cache = FeatureCache(maxsize=100)
+
+    np.testing.assert_array_equal(
+        cache.derive(X[:60]), derive_features(X[:60])
+    )
+    assert (cache.hits, cache.misses) == (0, 60)
+    np.testing.assert_array_equal(
+        cache.derive(X[30:90]), derive_features(X[30:90])
+    )
+    assert (cache.hits, cache.misses) == (30, 90)
+    assert len(cache) == 90
+
+    cache.derive(X[90:120])
+    assert len(cache) == 100
+    # Самые старые строки вытеснены
+    cache.derive(X[:5])
+    assert cache.hits == 30
+
+    # Явные ключи (клиент, месяц)
+    keyed = FeatureCache()
+    keyed.derive(X[:2], keys=[("c1", "2005-09"), ("c2", "2005-09")])
+    np.testing.assert_array_equal(
+        keyed.derive(X[:1], keys=[("c1", "2005-09")]), derive_features(X[:1])
+    )
+    assert keyed.hits == 1
+
+
+def test_search_with_derived_features(credit_frame):
+    frame = credit_frame.head(600)
+    spec = default_specs(["logistic_regression"])[0]
+    result = run_search(
+        spec, frame[FEATURE_COLUMNS], frame["DEFAULT"], derived_features=True
+    )
+
+    assert isinstance(result.estimator[0], BehaviorFeatures)
+    compiled = compile_pipeline(result.estimator)
+    assert isinstance(compiled, CompiledLinear)
+    np.testing.assert_allclose(
+        compiled.predict_proba(frame[FEATURE_COLUMNS].to_numpy()),
+        result.estimator.predict_proba(frame[FEATURE_COLUMNS])[:, 1],
+        atol=1e-12,
+    )
@@ -0,0 +1,52 @@
+"""Тесты скомпилированного (NumPy) пути скоринга sklearn пайплайна"""
+import numpy as np
+import pytest
+
+pytest.importorskip("sklearn")
+from sklearn.ensemble import GradientBoostingClassifier  # noqa: E402
+from sklearn.linear_model import LogisticRegression  # noqa: E402
+from sklearn.pipeline import Pipeline  # noqa: E402
+
+from src.features.build_features import create_feature_pipeline  # noqa: E402
+from src.models.compiled import (  # noqa: E402
+    CompiledLinear,
+    CompiledTrees,
+    compile_pipeline,
+)
+
+
+@pytest.mark.parametrize(
+    "classifier, compiled_type",
+    [
+        (LogisticRegression(max_iter=1000), CompiledLinear),
+        (
+            GradientBoostingClassifier(
+                n_estimators=50, max_depth=3, random_state=42
+            ),
+            CompiledTrees,
+        ),
+    ],
+)
+def test_compiled_pipeline_matches_sklearn(
+    credit_frame, classifier, compiled_type
+):
+    X = credit_frame.drop(columns="DEFAULT")
+    y = credit_frame["DEFAULT"]
+    pipeline = Pipeline([
+        ("preprocessor", create_feature_pipeline(X)),
+        ("classifier", classifier),
+    ]).fit(X, y)
+
+    X_missing = X.astype(float)
+    X_missing.iloc[::5, 3] = np.nan
+
+    compiled = compile_pipeline(pipeline)
+    assert isinstance(compiled, compiled_type)
+    np.testing.assert_allclose(
+        compiled.predict_proba(X_missing.to_numpy()),
+        pipeline.predict_proba(X_missing)[:, 1],
+        rtol=0, atol=1e-12,
+    )
+    np.testing.assert_array_equal(
+        compiled.predict(X_missing.to_numpy()), pipeline.predict(X_missing)
+    )
@@ -0,0 +1,74 @@
+"""Тесты колоночного слоя данных"""
+import os
+import time
+
+import numpy as np
+import pytest
+
+pytest.importorskip("pyarrow")
+from src.data import dataset  # noqa: E402
+from src.features.schema import FEATURE_COLUMNS  # noqa: E402
+
+
+@pytest.fixture
+def processed(tmp_path, credit_frame):
+    dataset.clear_cache()
+    credit_frame.to_csv(tmp_path / "train.csv", index=False)
+    yield tmp_path
+    dataset.clear_cache()
+
+
+def test_csv_is_converted_once_to_compact_parquet(processed, credit_frame):
+    frame = dataset.load_dataset("train", root=str(processed))
+
+    assert (processed / "train.parquet").exists()
+    assert (
+        frame["SEX"].dtype == np.int8
+        and frame["LIMIT_BAL"].dtype == np.float32
+    )
+    np.testing.assert_array_equal(
+        frame.to_numpy(np.float64), credit_frame.to_numpy(np.float64)
+    )
+    assert (
+        frame.memory_usage(deep=True).sum()
+        < credit_frame.memory_usage(deep=True).sum() / 3
+    )
+
+    mtime = os.path.getmtime(processed / "train.parquet")
+    dataset.clear_cache()
+    dataset.load_dataset("train", root=str(processed))
+    assert os.path.getmtime(processed / "train.parquet") == mtime
+
+
+def test_column_subset_and_process_cache(processed):
+    subset = dataset.load_dataset(
+        "train", columns=["AGE", "PAY_0"], root=str(processed)
+    )
+    assert subset.columns.tolist() == ["AGE", "PAY_0"]
+
+    first = dataset.load_dataset("train", root=str(processed))
+    first["AGE"] = 0  # копия не портит кэш
+    again = dataset.load_dataset("train", root=str(processed))
+    assert (again["AGE"] > 0).all()
+
+
+def test_stale_parquet_is_rebuilt(processed, credit_frame):
+    dataset.load_dataset("train", root=str(processed))
+    changed = credit_frame.head(10).copy()
+    changed["AGE"] = 300  # не помещается в int8
+    time.sleep(0.01)
+    changed.to_csv(processed / "train.csv", index=False)
+    os.utime(processed / "train.csv", (time.time() + 5, time.time() + 5))
+
+    frame = dataset.load_dataset("train", root=str(processed))
+    assert len(frame) == 10
+    assert frame["AGE"].dtype == np.int16 and (frame["AGE"] == 300).all()
+
+
+def test_compact_frame_trains_the_same_pipeline(credit_frame):
+    from src.features.build_features import create_feature_pipeline
+
+    compact = dataset.to_compact(credit_frame)
+    X = compact.drop(columns="DEFAULT")
+    preprocessor = create_feature_pipeline(X).fit(X)
+    assert preprocessor.transformers_[0][2] == FEATURE_COLUMNS
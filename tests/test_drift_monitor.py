@@ -0,0 +1,112 @@
+"""Тесты потокового мониторинга дрейфа"""
+import sys
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+
+from src.features.build_features import create_feature_pipeline
+from src.monitoring.drift_monitor import DriftMonitor, calculate_psi
+from src.serving.model_manager import ModelManager
+
+
+@pytest.fixture(scope="module")
+def drift_setup(tmp_path_factory, credit_frame_factory):
+    root = tmp_path_factory.mktemp("drift")
+    train = credit_frame_factory(3000, seed=0)
+    X = train.drop(columns="DEFAULT")
+    pipeline = Pipeline([
+        ("preprocessor", create_feature_pipeline(X)),
+        ("classifier", LogisticRegression(max_iter=1000)),
+    ]).fit(X, train["DEFAULT"])
+
+    joblib.dump(pipeline, root / "model.pkl")
+    train.to_csv(root / "train.csv", index=False)
+    production = credit_frame_factory(5000, seed=1)
+    production["LIMIT_BAL"] *= 3
+    production.to_csv(root / "production.csv", index=False)
+    return root, pipeline
+
+
+def make_monitor(root, **kwargs):
+    return DriftMonitor(
+        train_data_path=str(root / "train.csv"),
+        model_path=str(root / "model.pkl"),
+        cache_dir=str(root / "cache"),
+        chunksize=1200,
+        **kwargs,
+    )
+
+
+def test_local_streaming_report_and_reference_cache(drift_setup):
+    root, _ = drift_setup
+    report = make_monitor(root).monitor_drift(
+        production_path=str(root / "production.csv")
+    )
+
+    assert report["rows"] == 5000 and report["failed_rows"] == 0
+    assert (
+        report["feature_psi"]["LIMIT_BAL"]
+        > 0.25
+        > report["feature_psi"]["AGE"]
+    )
+    assert report["feature_drift"]["LIMIT_BAL"]["drift_detected"]
+    assert len(report["feature_drift"]) == 23
+    assert len(list((root / "cache").glob("reference-*.npz"))) == 1
+
+    # Второй запуск берет эталон из кэша и дает тот же отчет
+    assert (
+        make_monitor(root).monitor_drift(
+            production_path=str(root / "production.csv")
+        )
+        == report
+    )
+
+
+def test_api_scoring_matches_local(drift_setup, credit_frame_factory):
+    httpx = pytest.importorskip("httpx")
+    import src.api.app  # noqa: F401
+    api = sys.modules["src.api.app"]
+
+    root, pipeline = drift_setup
+    manager = ModelManager(api.load_scorer, str(root / "model.pkl"))
+    manager.check()
+    original, api.manager = api.manager, manager
+    try:
+        monitor = make_monitor(
+            root,
+            api_url="http://testserver",
+            batch_size=500,
+            transport=httpx.ASGITransport(app=api.app),
+        )
+        data = credit_frame_factory(1300, seed=2)
+        scores = monitor.get_api_predictions(data)
+        report = monitor.monitor_drift(
+            production_path=str(root / "production.csv")
+        )
+    finally:
+        api.manager = original
+
+    np.testing.assert_allclose(
+        scores,
+        pipeline.predict_proba(data.drop(columns="DEFAULT"))[:, 1],
+        atol=1e-12,
+    )
+    assert (
+        report["model_version"] == manager.version
+        and report["failed_rows"] == 0
+    )
+    assert report["psi_score"] == pytest.approx(
+        make_monitor(root).monitor_drift(
+            production_path=str(root / "production.csv")
+        )["psi_score"]
+    )
+
+
+def test_calculate_psi_detects_shift():
+    rng = np.random.default_rng(0)
+    expected = rng.normal(size=10_000)
+    assert calculate_psi(expected, rng.normal(size=5_000)) < 0.02
+    assert calculate_psi(expected, rng.normal(1.0, size=5_000)) > 0.25
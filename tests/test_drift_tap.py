@@ -0,0 +1,155 @@
+"""Тесты встроенного в сервис мониторинга дрейфа"""
+import sys
+
+import numpy as np
+import pytest
+
+from src.monitoring.sketches import DriftEngine
+from src.serving.drift_tap import DriftTap, RingBuffer
+
+
+def test_ring_buffer_keeps_order_and_counts_overwrites():
+    ring = RingBuffer(capacity=4)
+    for item in range(3):
+        ring.put(item)
+    assert ring.drain() == [0, 1, 2]
+    assert ring.drain() == []
+
+    for item in range(3, 13):
+        ring.put(item)
+    assert ring.drain() == [9, 10, 11, 12]
+    assert ring.dropped == 6
+
+
+def test_tap_publishes_psi_gauges():
+    from prometheus_client import REGISTRY
+
+    rng = np.random.default_rng(0)
+    reference = DriftEngine.reference_from(
+        rng.normal(size=(5_000, 2)), rng.random(5_000), ["tap_a", "tap_b"]
+    )
+    tap = DriftTap(reference, interval=60)
+
+    shifted = rng.normal(size=(2_000, 2)) + [2.0, 0.0]
+    for start in range(0, 2_000, 100):
+        tap.offer(shifted[start:start + 100], rng.random(100))
+    tap.offer(shifted[0], 0.5)
+    tap.offer(np.zeros((1, 5)), [0.5])  # чужая ширина игнорируется
+
+    assert tap.process() == 2_001
+    psi_a = REGISTRY.get_sample_value(
+        "credit_scoring_feature_psi", {"feature": "tap_a"}
+    )
+    psi_b = REGISTRY.get_sample_value(
+        "credit_scoring_feature_psi", {"feature": "tap_b"}
+    )
+    assert psi_a > 1.0 > 0.05 > psi_b
+    assert REGISTRY.get_sample_value("credit_scoring_score_psi") < 0.05
+    assert (
+        REGISTRY.get_sample_value("credit_scoring_drift_window_rows") == 2_001
+    )
+
+
+def test_bind_projects_model_columns_onto_reference():
+    rng = np.random.default_rng(2)
+    features = rng.normal(size=(1_000, 2))
+    reference = DriftEngine.reference_from(
+        features, rng.random(1_000), ["bind_b", "bind_a"]
+    )
+
+    # У модели больше входов и другой порядок: берутся столбцы эталона по
+    # именам
+    tap = DriftTap(reference, interval=60)
+    tap.bind(["bind_a", "extra", "bind_b"], 3)
+    wide = np.column_stack([features[:, 1], np.zeros(1_000), features[:, 0]])
+    tap.offer(wide, rng.random(1_000))
+    tap.offer(features, rng.random(1_000))  # ширина эталона, но не модели
+    assert tap.process() == 1_000
+    psi = tap.engine.sliding.histograms().psi(reference)
+    assert np.all(psi[:-1] < 0.05)
+
+    # Без имен годится только модель той же ширины
+    tap.bind([], 2)
+    assert tap.columns is None
+    with pytest.raises(ValueError, match="2 features and the model takes 34"):
+        tap.bind([], 34)
+    with pytest.raises(ValueError, match="bind_b"):
+        tap.bind(["bind_a", "extra", "other"], 3)
+
+
+def test_scoring_service_feeds_tap(onnx_client, monkeypatch):
+    import src.app  # noqa: F401
+    app_module = sys.modules["src.app"]
+    n_features = app_module.manager.get().n_features
+
+    rng = np.random.default_rng(1)
+    names = [f"f{i}" for i in range(n_features)]
+    reference = DriftEngine.reference_from(
+        rng.normal(size=(2_000, n_features)), rng.random(2_000), names
+    )
+    tap = DriftTap(reference, interval=60)
+    monkeypatch.setattr(app_module, "drift_tap", tap)
+
+    rows = rng.normal(size=(20, n_features)).round(3).tolist()
+    assert (
+        onnx_client.post(
+            "/predict/batch", json={"instances": rows + [[1.0]]}
+        ).status_code
+        == 200
+    )
+    assert (
+        onnx_client.post("/predict", json={"features": rows[0]}).status_code
+        == 200
+    )
+
+    assert tap.process() == 21
+    assert "credit_scoring_score_psi" in onnx_client.get("/metrics").text
+
+
+def mismatched_tap():
+    rng = np.random.default_rng(3)
+    reference = DriftEngine.reference_from(
+        rng.normal(size=(100, 2)), rng.random(100), ["other_a", "other_b"]
+    )
+    return DriftTap(reference, interval=60)
+
+
+def test_onnx_service_reports_reference_mismatch_on_startup(
+    onnx_client, monkeypatch
+):
+    import threading
+
+    import src.app  # noqa: F401
+    app_module = sys.modules["src.app"]
+    monkeypatch.setattr(app_module, "drift_tap", mismatched_tap())
+    monkeypatch.setattr(app_module, "startup_complete", threading.Event())
+
+    app_module.start_model()
+    assert onnx_client.get("/startup").status_code == 503
+
+
+def test_api_reports_reference_mismatch_on_health(tmp_path, monkeypatch):
+    from types import SimpleNamespace
+
+    from fastapi.testclient import TestClient
+
+    import src.api.app  # noqa: F401
+    from src.serving.model_manager import ModelManager
+
+    api = sys.modules["src.api.app"]
+    model_file = tmp_path / "model.pkl"
+    model_file.write_text("")
+    manager = ModelManager(
+        lambda path: SimpleNamespace(columns=["LIMIT_BAL", "SEX", "AGE"]),
+        str(model_file),
+    )
+    monkeypatch.setattr(api, "manager", manager)
+    monkeypatch.setattr(api, "drift_tap", mismatched_tap())
+    monkeypatch.setattr(api, "startup_error", None)
+
+    # Сервис не падает при импорте, а отвечает 503 на пробу
+    api.start_model()
+    response = TestClient(api.app).get("/health")
+    assert response.status_code == 503
+    assert "Drift reference" in response.json()["detail"]
+    assert manager.get() is not None
@@ -0,0 +1,206 @@
+"""Тесты выделенного пула инференса, очереди допуска и дедлайнов"""
+import asyncio
+import os
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from src.serving import MicroBatcher
+from src.serving.executor import (
+    DeadlineExceeded,
+    InferenceExecutor,
+    Overloaded,
+    WorkerLost,
+    call_worker_model,
+    request_deadline,
+    share_worker_model,
+)
+
+
+def read_text(path):
+    with open(path) as f:
+        return f.read()
+
+
+def die():
+    # Воркер падает так же, как при OOM kill: без исключения и без ответа
+    os._exit(1)
+
+
+def test_request_deadline_takes_the_tighter_budget():
+    assert request_deadline(None, 0, now=10.0) is None
+    assert request_deadline("250", 0, now=10.0) == pytest.approx(10.25)
+    assert request_deadline("250", 100, now=10.0) == pytest.approx(10.1)
+    assert request_deadline("oops", 100, now=10.0) == pytest.approx(10.1)
+
+
+def test_queue_full_is_refused_and_expired_calls_are_not_run():
+    executor = InferenceExecutor(max_workers=1, max_queue=1, name="test")
+    release = threading.Event()
+    ran = []
+
+    def blocking(tag):
+        release.wait(5)
+        ran.append(tag)
+        return tag
+
+    async def run():
+        first = asyncio.ensure_future(executor.run(blocking, "first"))
+        queued = asyncio.ensure_future(
+            executor.run(blocking, "queued", deadline=time.monotonic() + 0.05)
+        )
+        await asyncio.sleep(0.01)
+        assert executor.pending == 2
+        with pytest.raises(Overloaded) as refused:
+            await executor.run(blocking, "third")
+        assert refused.value.status_code == 429 and refused.value.headers == {
+            "Retry-After": "1"
+        }
+
+        # Дедлайн вышел, пока вызов ждал в очереди
+        with pytest.raises(DeadlineExceeded):
+            await queued
+        release.set()
+        assert await first == "first"
+        assert executor.pending == 0
+
+    asyncio.run(run())
+    executor.shutdown(wait=True)
+    assert ran == ["first"]
+
+
+def test_process_workers_load_each_version_once(tmp_path):
+    path = tmp_path / "model.txt"
+    path.write_text("first")
+    executor = InferenceExecutor(
+        max_workers=1, kind="process", name="test-process"
+    )
+
+    async def upper(version):
+        return await executor.run(
+            call_worker_model, read_text, str(path), version, "upper"
+        )
+
+    try:
+        assert asyncio.run(upper("v1")) == "FIRST"
+        # Файл заменен на месте: путь тот же, версия новая
+        path.write_text("second")
+        assert asyncio.run(upper("v1")) == "FIRST"
+        assert asyncio.run(upper("v2")) == "SECOND"
+    finally:
+        executor.shutdown(wait=True)
+
+
+def test_process_workers_use_model_shared_before_fork(tmp_path):
+    path = tmp_path / "model.txt"
+    path.write_text("second")
+    # Модель уже загружена сервером: воркер не должен читать файл заново
+    share_worker_model(str(path), "v1", "first")
+    executor = InferenceExecutor(
+        max_workers=1, kind="process", name="test-shared"
+    )
+
+    async def upper(version):
+        return await executor.run(
+            call_worker_model, read_text, str(path), version, "upper"
+        )
+
+    try:
+        executor.start()
+        assert asyncio.run(upper("v1")) == "FIRST"
+        # Версия, активированная после fork, загружается воркером из файла
+        assert asyncio.run(upper("v2")) == "SECOND"
+    finally:
+        executor.shutdown(wait=True)
+
+
+def test_dead_worker_answers_503_and_pool_is_replaced():
+    executor = InferenceExecutor(
+        max_workers=1, kind="process", name="test-broken"
+    )
+
+    async def run():
+        with pytest.raises(WorkerLost) as lost:
+            await executor.run(die)
+        assert lost.value.status_code == 503
+        assert executor.pending == 0
+        # Следующий вызов идет уже в новый пул
+        return await executor.run(abs, -3)
+
+    try:
+        broken = executor.pool
+        assert asyncio.run(run()) == 3
+        assert executor.pool is not broken
+    finally:
+        executor.shutdown(wait=True)
+
+
+def test_microbatcher_refuses_and_expires_rows():
+    started = threading.Event()
+    release = threading.Event()
+
+    def score(matrix):
+        started.set()
+        release.wait(5)
+        return matrix[:, 0]
+
+    batcher = MicroBatcher(score, max_batch_size=1, window_ms=0, max_pending=1)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        running = asyncio.ensure_future(batcher.submit(np.array([1.0])))
+        await loop.run_in_executor(None, started.wait, 5)
+        waiting = asyncio.ensure_future(
+            batcher.submit(np.array([2.0]), deadline=time.monotonic() + 0.05)
+        )
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded):
+            await batcher.submit(np.array([3.0]))
+        with pytest.raises(DeadlineExceeded):
+            await waiting
+        release.set()
+        assert await running == 1.0
+
+    asyncio.run(run())
+
+
+def test_microbatcher_scores_rows_with_their_own_model():
+    calls = []
+
+    def score(matrix, model):
+        calls.append((model, len(matrix)))
+        return matrix[:, 0] * model
+
+    batcher = MicroBatcher(score, max_batch_size=8, window_ms=20)
+
+    async def run():
+        # Модель сменилась между запросами: строки старой версии не
+        # смешиваются с новыми и считаются своей моделью
+        rows = [(np.array([float(i)]), 1 if i < 3 else 10) for i in range(6)]
+        return await asyncio.gather(
+            *(batcher.submit(row, model=model) for row, model in rows)
+        )
+
+    assert asyncio.run(run()) == [0.0, 1.0, 2.0, 30.0, 40.0, 50.0]
+    assert calls == [(1, 3), (10, 3)]
+
+
+def test_predict_past_deadline_answers_503(onnx_client):
+    import src.app
+
+    features = [0.0] * src.app.manager.get().n_features
+    response = onnx_client.post(
+        "/predict",
+        json={"features": features},
+        headers={"X-Deadline-Ms": "0.001"},
+    )
+    assert response.status_code == 503
+    assert "deadline" in response.json()["detail"]
+    # Сброс нагрузки не смешивается с неверным вводом в метриках
+    assert 'status="overloaded"' in onnx_client.get("/metrics").text
+    assert (
+        onnx_client.post("/predict", json={"features": features}).status_code
+        == 200
+    )
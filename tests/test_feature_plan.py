@@ -0,0 +1,113 @@
+"""Тесты компиляции препроцессинга в плоские массивы (FeaturePlan)"""
+import numpy as np
+import pytest
+from sklearn.compose import ColumnTransformer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import MinMaxScaler
+
+from src.features.build_features import (
+    create_feature_pipeline,
+    create_tree_pipeline,
+)
+from src.features.plan import FeaturePlan, compile_preprocessor
+from src.models.compiled import CompiledLinear, compile_pipeline
+
+
+@pytest.fixture
+def mixed_frame(credit_frame):
+    """Числовые признаки с пропусками и строковый категориальный столбец"""
+    frame = credit_frame.drop(columns="DEFAULT").astype("float64")
+    frame.iloc[::7, 0] = np.nan
+    frame.iloc[::11, 4] = np.nan
+    rng = np.random.default_rng(1)
+    frame["REGION"] = rng.choice(
+        ["north", "south", "east"], len(frame)
+    ).astype(object)
+    frame.loc[frame.index[::13], "REGION"] = None
+    return frame
+
+
+def unseen(frame):
+    """Те же строки с неизвестными при обучении категориями"""
+    frame = frame.copy()
+    frame.loc[frame.index[::5], "REGION"] = "west"
+    return frame
+
+
+@pytest.mark.parametrize(
+    "build", [create_feature_pipeline, create_tree_pipeline]
+)
+def test_plan_matches_transform(mixed_frame, build):
+    preprocessor = build(mixed_frame).fit(mixed_frame)
+    plan = compile_preprocessor(preprocessor, list(mixed_frame.columns))
+    assert isinstance(plan, FeaturePlan) and not plan.affine
+
+    # Маленькие пакеты ищут категории через dict, большие через pandas
+    for frame in (unseen(mixed_frame), unseen(mixed_frame).head(10)):
+        expected = np.asarray(preprocessor.transform(frame), dtype=np.float64)
+        for X in (frame, frame.to_numpy()):
+            np.testing.assert_allclose(
+                plan.transform(X), expected, rtol=0, atol=1e-12
+            )
+        np.testing.assert_allclose(
+            plan.transform(frame, dtype=np.float32),
+            expected,
+            rtol=1e-6,
+            atol=1e-6,
+        )
+
+
+def test_numeric_plan_is_affine(credit_frame):
+    X = credit_frame.drop(columns="DEFAULT")
+    preprocessor = create_feature_pipeline(X).fit(X)
+    plan = compile_preprocessor(preprocessor, list(X.columns))
+    assert plan.affine
+
+    X_missing = X.astype("float64")
+    X_missing.iloc[::3, 5] = np.nan
+    np.testing.assert_allclose(
+        plan.transform(X_missing.to_numpy()),
+        preprocessor.transform(X_missing),
+        rtol=0,
+        atol=1e-12,
+    )
+
+
+def test_plan_round_trips_through_npz(tmp_path, mixed_frame):
+    preprocessor = create_feature_pipeline(mixed_frame).fit(mixed_frame)
+    plan = compile_preprocessor(preprocessor, list(mixed_frame.columns))
+    plan.save(str(tmp_path / "plan.npz"))
+    restored = FeaturePlan.load(str(tmp_path / "plan.npz"))
+
+    frame = unseen(mixed_frame)
+    np.testing.assert_array_equal(
+        restored.transform(frame), plan.transform(frame)
+    )
+
+
+def test_unsupported_steps_fall_back(credit_frame):
+    X = credit_frame.drop(columns="DEFAULT")
+    preprocessor = ColumnTransformer(
+        [("num", MinMaxScaler(), list(X.columns))]
+    ).fit(X)
+    assert compile_preprocessor(preprocessor, list(X.columns)) is None
+
+
+def test_compiled_linear_with_one_hot_matches_sklearn(
+    credit_frame, mixed_frame
+):
+    pipeline = Pipeline([
+        ("preprocessor", create_feature_pipeline(mixed_frame)),
+        ("classifier", LogisticRegression(max_iter=1000)),
+    ]).fit(mixed_frame, credit_frame["DEFAULT"])
+
+    compiled = compile_pipeline(pipeline)
+    assert isinstance(compiled, CompiledLinear)
+    frame = unseen(mixed_frame)
+    np.testing.assert_allclose(
+        compiled.predict_proba(frame.to_numpy()),
+        pipeline.predict_proba(frame)[:, 1],
+        rtol=0,
+        atol=1e-12,
+    )
@@ -0,0 +1,83 @@
+"""Граф импорта сервисов: холодный старт не должен тянуть обучение.
+
+Каждый импорт выполняется в свежем интерпретаторе. Если тест упал, найдите,
+какой импорт привел тяжелую библиотеку
+(python -X importtime -c "import src.app").
+"""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Библиотеки обучения и анализа данных, которых не должно быть после импорта
+TRAINING_ONLY = [
+    "mlflow",
+    "matplotlib",
+    "pandas",
+    "sklearn",
+    "scipy",
+    "skl2onnx",
+    "onnx",
+    "pyarrow",
+]
+
+HEAVY = {
+    # ONNX Runtime нужен сервису сразу
+    "src.app": TRAINING_ONLY,
+    # Модель sklearn загружается позже импорта; ONNX Runtime только с
+    # MODEL_BACKEND=onnx
+    "src.api.app": TRAINING_ONLY + ["onnxruntime"],
+}
+
+PROBE = (
+    "import importlib, json, sys; importlib.import_module(sys.argv[1]); "
+    "print(json.dumps(sorted(sys.modules)))"
+)
+
+
+def imported_modules(module, tmp_path):
+    env = dict(
+        os.environ,
+        PYTHONPATH=ROOT_DIR,
+        MODEL_PATH=os.path.join(ROOT_DIR, "credit_model.onnx"),
+        MLFLOW_DISABLE_AGENT_HINT="1",
+        # Граф импорта, без загрузки модели при импорте src.api.app
+        PIPELINE_MODEL_PATH=str(tmp_path / "missing.pkl"),
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE, module],
+        cwd=ROOT_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return set(json.loads(result.stdout.strip().splitlines()[-1]))
+
+
+@pytest.mark.parametrize("module", sorted(HEAVY))
+def test_serving_import_leaves_heavy_libraries_out(module, tmp_path):
+    modules = imported_modules(module, tmp_path)
+
+    heavy = [name for name in HEAVY[module] if name in modules]
+    assert not heavy, f"{module} imports {heavy}"
+
+
+def test_packages_import_names_on_first_use(tmp_path):
+    # Пакеты не импортируют подмодули, пока их имена не понадобились
+    for package in ("src.models", "src.features", "src.serving"):
+        modules = imported_modules(package, tmp_path)
+        assert not [name for name in modules if name.startswith(package + ".")]
+
+    import src.models
+    from src.models import load_model
+    from src.models.predict_model import load_model as direct
+
+    assert load_model is direct
+    assert "ModelTrainer" in dir(src.models)
+    with pytest.raises(AttributeError):
+        src.models.missing_name
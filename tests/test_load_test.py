@@ -0,0 +1,104 @@
+"""Тесты нагрузочного стенда benchmarks/load_test.py"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        "benchmarks",
+    ),
+)
+
+import load_test  # noqa: E402
+
+
+def make_row(p99_ms=10.0, throughput=100.0, error_rate=0.0, mode="closed"):
+    return {
+        "target": "onnx",
+        "scenario": "predict_json",
+        "mode": mode,
+        "level": 8,
+        "p99_ms": p99_ms,
+        "throughput": throughput,
+        "error_rate": error_rate,
+    }
+
+
+def test_summarize_percentiles():
+    recorder = load_test.Recorder(measure_from=1.0)
+    recorder.add(0.5, 9.0, True)  # до конца прогрева не считается
+    for i in range(1, 1001):
+        recorder.add(2.0, i / 1000, True)
+    recorder.add(2.0, 0.0, False)
+
+    row = load_test.summarize(
+        recorder,
+        duration=10.0,
+        target="onnx",
+        scenario="s",
+        mode="closed",
+        level=1,
+    )
+    assert row["requests"] == 1001 and row["errors"] == 1
+    assert row["throughput"] == 100.0
+    assert row["p50_ms"] == pytest.approx(500.5)
+    assert row["p99_ms"] < row["p999_ms"] <= 1000.0
+
+
+def test_compare_flags_regressions_only():
+    baseline = [make_row()]
+    assert (
+        load_test.compare([make_row(p99_ms=12.0, throughput=80.0)], baseline)
+        == []
+    )
+
+    messages = load_test.compare(
+        [make_row(p99_ms=13.0, throughput=70.0, error_rate=0.05)], baseline
+    )
+    assert len(messages) == 3
+    assert any("p99" in message for message in messages)
+
+    # В открытом цикле пропускную способность задает частота запросов
+    open_baseline = [make_row(mode="open")]
+    assert (
+        load_test.compare(
+            [make_row(throughput=10.0, mode="open")], open_baseline
+        )
+        == []
+    )
+    # Сценарии без эталона не сравниваются
+    assert load_test.compare([make_row()], []) == []
+
+
+def test_closed_and_open_loop_against_asgi_app():
+    httpx = pytest.importorskip("httpx")
+    from fastapi import FastAPI
+
+    app = FastAPI()
+
+    @app.post("/predict")
+    async def predict(body: dict):
+        return {"score": 0.5}
+
+    requests = [("/predict", {"json": {"features": [1.0]}})]
+
+    async def run():
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            await load_test.check_scenario(client, "predict_json", requests)
+            closed = await load_test.closed_loop(
+                client, requests, concurrency=4, duration=0.3, warmup=0.05
+            )
+            opened = await load_test.open_loop(
+                client, requests, rate=100, duration=0.3, warmup=0.05
+            )
+        return closed, opened
+
+    closed, opened = asyncio.run(run())
+    assert closed.errors == 0 and len(closed.latencies) > 10
+    assert opened.errors == 0 and 5 < len(opened.latencies) < 80
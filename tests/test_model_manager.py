@@ -0,0 +1,94 @@
+"""Тесты горячей перезагрузки моделей"""
+import json
+import os
+
+from src.serving.model_manager import ModelManager
+
+
+def load_text_model(path):
+    with open(path) as f:
+        return f.read()
+
+
+def write_version(root, version, content):
+    version_dir = root / version
+    version_dir.mkdir()
+    (version_dir / "model.txt").write_text(content)
+
+
+def test_directory_source_swaps_and_rolls_back(tmp_path):
+    write_version(tmp_path, "v001", "first")
+    swaps = []
+    manager = ModelManager(
+        load_text_model,
+        str(tmp_path),
+        model_filename="model.txt",
+        keep_versions=2,
+    )
+    manager.add_listener(lambda new, old: swaps.append((new, old)))
+
+    assert manager.check() is True
+    in_flight = manager.get()
+
+    write_version(tmp_path, "v002", "second")
+    assert manager.check() is True
+    assert manager.version == "v002" and manager.get() == "second"
+    assert in_flight == "first"
+    assert manager.check() is False
+
+    manager.activate("v001")
+    assert manager.get() == "first"
+    assert swaps == [("v001", None), ("v002", "v001"), ("v001", "v002")]
+
+
+def test_index_source_and_failed_version(tmp_path):
+    write_version(tmp_path, "a", "model a")
+    index = tmp_path / "registry.json"
+    index.write_text(
+        json.dumps(
+            {
+                "active": "a",
+                "versions": {"a": "a/model.txt", "b": "b/model.txt"},
+            }
+        )
+    )
+
+    manager = ModelManager(load_text_model, str(index), keep_versions=1)
+    manager.check()
+    assert manager.version == "a"
+
+    # Битая версия не должна сбрасывать активную
+    index.write_text(
+        json.dumps(
+            {
+                "active": "b",
+                "versions": {"a": "a/model.txt", "b": "b/model.txt"},
+            }
+        )
+    )
+    assert manager.check() is False
+    assert manager.version == "a" and "b" in manager.last_error
+    assert [
+        entry["version"] for entry in manager.status()["resident_versions"]
+    ] == ["a"]
+
+
+def test_single_file_retried_when_completed_within_a_second(tmp_path):
+    def load_complete_model(path):
+        content = load_text_model(path)
+        if not content.endswith("end"):
+            raise ValueError("truncated model file")
+        return content
+
+    path = tmp_path / "model.txt"
+    path.write_text("weights")
+    os.utime(path, ns=(10**18, 10**18))
+    manager = ModelManager(load_complete_model, str(path))
+    assert manager.check() is False
+    assert "truncated" in manager.last_error
+
+    # Файл дописан в ту же секунду: ключ версии все равно меняется
+    path.write_text("weights end")
+    os.utime(path, ns=(10**18, 10**18 + 1000))
+    assert manager.check() is True
+    assert manager.get() == "weights end" and manager.last_error is None
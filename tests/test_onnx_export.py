@@ -0,0 +1,37 @@
+"""Тесты экспорта sklearn пайплайна в ONNX"""
+import numpy as np
+import pytest
+
+pytest.importorskip("skl2onnx")
+from sklearn.linear_model import LogisticRegression  # noqa: E402
+from sklearn.pipeline import Pipeline  # noqa: E402
+
+from src.features.build_features import create_feature_pipeline  # noqa: E402
+from src.models.onnx_model import export_onnx, load_onnx_model  # noqa: E402
+from src.serving import OnnxScorer  # noqa: E402
+
+
+def test_exported_pipeline_matches_sklearn(tmp_path, credit_frame):
+    X = credit_frame.drop(columns="DEFAULT")
+    y = credit_frame["DEFAULT"]
+    pipeline = Pipeline([
+        ("preprocessor", create_feature_pipeline(X)),
+        ("classifier", LogisticRegression(max_iter=1000)),
+    ]).fit(X, y)
+
+    model_path = str(tmp_path / "best_model.onnx")
+    export = export_onnx(pipeline, X, model_path=model_path)
+    assert export["max_abs_diff"] < 1e-4
+
+    onnx_model = load_onnx_model(model_path)
+    assert onnx_model.columns == list(X.columns)
+    np.testing.assert_array_equal(
+        onnx_model.predict(X.to_numpy()), pipeline.predict(X)
+    )
+
+    # Тот же артефакт через ONNX сервис (src/app.py)
+    scorer = OnnxScorer(onnx_model.session, batch_size=256)
+    scores = scorer.score(X.to_numpy(dtype=np.float32))
+    np.testing.assert_allclose(
+        scores, pipeline.predict_proba(X)[:, 1], atol=1e-4
+    )
@@ -0,0 +1,311 @@
+"""Тесты решающей политики: пороги и уровни риска по сегментам"""
+import json
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.models.policy import PolicyStore, compile_policy, load_policy
+
+SEGMENTED = {
+    "threshold": 0.5,
+    "segments": [
+        {
+            "name": "young",
+            "when": {"AGE": {"min": 21, "max": 25}},
+            "threshold": 0.4,
+            "bands": {
+                "edges": [0.2, 0.4, 0.7],
+                "labels": ["low", "medium", "high", "very_high"],
+            },
+        },
+        {
+            "name": "graduate_school",
+            "when": {"EDUCATION": [1], "PRODUCT": ["card"]},
+            "threshold": 0.6,
+        },
+        {
+            "name": "graduate_school_any",
+            "when": {"EDUCATION": 1},
+            "threshold": 0.55,
+        },
+    ],
+}
+
+
+def reference(table, probability, row):
+    # Построчная реализация таблицы, с которой сравнивается векторная
+    for segment in table["segments"]:
+        matches = True
+        for column, rule in segment["when"].items():
+            if isinstance(rule, dict):
+                matches &= (
+                    rule.get("min", -np.inf)
+                    <= row[column]
+                    < rule.get("max", np.inf)
+                )
+            else:
+                matches &= row[column] in (
+                    rule if isinstance(rule, list) else [rule]
+                )
+        if matches:
+            break
+    else:
+        segment = {}
+    bands = segment.get(
+        "bands", {"edges": [0.3, 0.7], "labels": ["low", "medium", "high"]}
+    )
+    band = sum(probability >= edge for edge in bands["edges"])
+    threshold = segment.get("threshold", table["threshold"])
+    return int(probability > threshold), bands["labels"][band]
+
+
+def test_default_policy_matches_former_if_chain():
+    probabilities = np.concatenate(
+        [np.random.default_rng(0).random(1000), [0.0, 0.3, 0.5, 0.7, 1.0]]
+    )
+    decisions = compile_policy().apply(probabilities)
+
+    expected = [
+        "low" if p < 0.3 else "medium" if p < 0.7 else "high"
+        for p in probabilities
+    ]
+    assert decisions.risk_levels().tolist() == expected
+    np.testing.assert_array_equal(decisions.prediction, probabilities > 0.5)
+    assert set(decisions.segment_names()) == {"default"}
+
+
+def test_segments_match_row_by_row_reference(credit_frame):
+    frame = credit_frame.assign(
+        PRODUCT=np.where(np.arange(len(credit_frame)) % 3, "card", "loan")
+    )
+    probabilities = np.random.default_rng(1).random(len(frame))
+    policy = compile_policy(SEGMENTED)
+    assert policy.columns == ["AGE", "EDUCATION", "PRODUCT"]
+
+    decisions = policy.apply(
+        probabilities,
+        {column: frame[column].to_numpy() for column in policy.columns},
+    )
+    expected = [
+        reference(SEGMENTED, p, row)
+        for p, row in zip(probabilities, frame.to_dict("records"))
+    ]
+    assert decisions.prediction.tolist() == [
+        prediction for prediction, _ in expected
+    ]
+    assert decisions.risk_levels().tolist() == [level for _, level in expected]
+    # Первый подходящий сегмент важнее следующих
+    names = decisions.segment_names()
+    assert set(names) == {
+        "young",
+        "graduate_school",
+        "graduate_school_any",
+        "default",
+    }
+    assert not np.any(
+        (names == "graduate_school_any")
+        & (frame["PRODUCT"] == "card").to_numpy()
+    )
+
+    # Столбцы из матрицы признаков и скаляр одной строки
+    matrix = frame[["EDUCATION", "AGE"]].to_numpy(dtype=np.float64)
+    no_product = compile_policy({"segments": SEGMENTED["segments"][::2]})
+    single = no_product.apply(
+        probabilities[5], no_product.select(matrix[5], ["EDUCATION", "AGE"])
+    )
+    batch = no_product.apply(
+        probabilities, no_product.select(matrix, ["EDUCATION", "AGE"])
+    )
+    assert single.risk_levels()[0] == batch.risk_levels()[5]
+    with pytest.raises(ValueError, match="PRODUCT"):
+        policy.apply(
+            probabilities, policy.select(matrix, ["EDUCATION", "AGE"])
+        )
+
+
+def test_long_band_lists_use_binary_search(credit_frame):
+    # Больше MAX_COMPARISONS границ: np.searchsorted по строкам сегмента
+    edges = np.linspace(0.05, 0.95, 12).tolist()
+    table = {
+        "threshold": 0.5,
+        "segments": [
+            {
+                "name": "fine",
+                "when": {"EDUCATION": [1, 2]},
+                "bands": {
+                    "edges": edges,
+                    "labels": [f"band_{i}" for i in range(13)],
+                },
+            },
+        ],
+    }
+    probabilities = np.random.default_rng(2).random(len(credit_frame))
+    probabilities[:3] = [np.nan, edges[0], edges[-1]]
+    decisions = compile_policy(table).apply(
+        probabilities, {"EDUCATION": credit_frame["EDUCATION"].to_numpy()}
+    )
+
+    rows = credit_frame.to_dict("records")
+    expected = [
+        reference(table, p, row) for p, row in zip(probabilities[1:], rows[1:])
+    ]
+    assert decisions.risk_levels()[1:].tolist() == [
+        level for _, level in expected
+    ]
+    # NaN попадает в самую верхнюю полосу сегмента в обоих путях
+    assert decisions.risk_levels()[0] == (
+        "band_12" if rows[0]["EDUCATION"] in (1, 2) else "high"
+    )
+    assert compile_policy().apply(
+        [np.nan, 0.3, 0.7]
+    ).risk_levels().tolist() == ["high", "medium", "high"]
+
+
+@pytest.mark.parametrize(
+    "table, message",
+    [
+        (
+            {"bands": {"edges": [0.3, 0.7], "labels": ["low", "high"]}},
+            "labels",
+        ),
+        (
+            {"bands": {"edges": [0.7, 0.3], "labels": ["a", "b", "c"]}},
+            "increasing",
+        ),
+        ({"threshold": 1.5}, "probability"),
+        ({"segments": [{"name": "any", "threshold": 0.4}]}, "when"),
+        ({"segments": [{"when": {"AGE": {"above": 30}}}]}, "min"),
+        ({"cutoff": 0.4}, "unknown keys"),
+    ],
+)
+def test_invalid_tables_are_refused(table, message):
+    with pytest.raises(ValueError, match=message):
+        compile_policy(table)
+
+
+def test_store_reloads_changed_file_and_keeps_last_good(tmp_path):
+    path = tmp_path / "policy.json"
+    path.write_text(json.dumps({"threshold": 0.5}))
+    store = PolicyStore(str(path), poll_interval=0)
+    changes = []
+    store.add_listener(
+        lambda new_version, old_version: changes.append(
+            (new_version, old_version)
+        )
+    )
+    first = store.version
+    assert store.get().apply([0.45]).prediction.tolist() == [0]
+
+    path.write_text(json.dumps({"threshold": 0.4}))
+    os.utime(path, ns=(1, 10**18))
+    assert store.get().apply([0.45]).prediction.tolist() == [1]
+    assert changes == [(store.version, first)]
+
+    # Ошибка в файле: в силе остается последняя корректная политика
+    path.write_text("{\"threshold\": ")
+    assert store.get().version == changes[-1][0]
+    assert "Cannot load policy" in store.status()["last_error"]
+    assert len(changes) == 1
+
+    assert PolicyStore(None).get().version == "default"
+
+
+class FakeManager:
+    """Минимальный ModelManager: активная модель и слушатели смены версии"""
+
+    def __init__(self, threshold):
+        self.model = SimpleNamespace(threshold=threshold)
+        self.listeners = []
+
+    def get(self):
+        return self.model
+
+    def add_listener(self, callback):
+        self.listeners.append(callback)
+
+    def swap(self, threshold):
+        self.model = SimpleNamespace(threshold=threshold)
+        for callback in self.listeners:
+            callback("new", "old")
+
+
+@pytest.mark.parametrize("with_file", [False, True])
+def test_store_follows_threshold_of_active_model(tmp_path, with_file):
+    path = None
+    if with_file:
+        path = tmp_path / "policy.json"
+        path.write_text(json.dumps({"bands": {"edges": [0.5],
+                                              "labels": ["low", "high"]}}))
+    store = PolicyStore(path and str(path), poll_interval=0)
+    manager = FakeManager(0.7)
+    store.bind(manager)
+    # Как в пакетном скоринге: порог берется у модели, а не DEFAULT_THRESHOLD
+    assert store.get().apply([0.6]).prediction.tolist() == [0]
+
+    # Новая версия модели со своим порогом
+    manager.swap(0.4)
+    assert store.get().apply([0.6]).prediction.tolist() == [1]
+    assert store.status()["segments"][0]["threshold"] == 0.4
+
+
+def test_store_keeps_threshold_set_by_policy_file(tmp_path):
+    path = tmp_path / "policy.json"
+    path.write_text(json.dumps({"threshold": 0.5}))
+    store = PolicyStore(str(path), poll_interval=0).bind(FakeManager(0.7))
+    assert store.get().apply([0.6]).prediction.tolist() == [1]
+
+
+def test_bulk_scorer_applies_policy_on_pass_through_columns(
+    tmp_path, credit_frame
+):
+    pytest.importorskip("sklearn")
+    import joblib
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import Pipeline
+
+    from src.features.build_features import create_feature_pipeline
+    from src.models.score_model import score_file
+
+    X = credit_frame.drop(columns="DEFAULT")
+    pipeline = Pipeline(
+        [
+            ("preprocessor", create_feature_pipeline(X)),
+            ("classifier", LogisticRegression(max_iter=1000)),
+        ]
+    ).fit(X, credit_frame["DEFAULT"])
+    joblib.dump(pipeline, tmp_path / "model.pkl")
+    applicants = X.assign(
+        PRODUCT=np.where(np.arange(len(X)) % 2, "card", "loan")
+    )
+    applicants.to_parquet(tmp_path / "applicants.parquet", index=False)
+    (tmp_path / "policy.json").write_text(json.dumps(SEGMENTED))
+
+    summary = score_file(
+        str(tmp_path / "applicants.parquet"),
+        str(tmp_path / "out"),
+        str(tmp_path / "model.pkl"),
+        workers=1,
+        chunksize=700,
+        policy_path=str(tmp_path / "policy.json"),
+    )
+    scored = pd.read_parquet(tmp_path / "out")
+    assert (
+        summary["policy"] == load_policy(str(tmp_path / "policy.json")).version
+    )
+    assert scored.columns.tolist() == [
+        "PRODUCT",
+        "score",
+        "prediction",
+        "risk_level",
+    ]
+    expected = [
+        reference(SEGMENTED, p, row)
+        for p, row in zip(scored["score"], applicants.to_dict("records"))
+    ]
+    assert scored["risk_level"].tolist() == [level for _, level in expected]
+    assert scored["prediction"].tolist() == [
+        prediction for prediction, _ in expected
+    ]
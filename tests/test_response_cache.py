@@ -0,0 +1,152 @@
+"""Тесты кэша ответов /predict"""
+import asyncio
+import threading
+import time
+
+import numpy as np
+
+from src.serving.model_manager import ModelManager
+from src.serving.response_cache import (
+    InMemoryStore,
+    RemoteBackend,
+    ResponseCache,
+    cache_key,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_key_depends_on_values_and_version():
+    row = np.array([1.0, -0.0, 3.5])
+    assert cache_key(row, "v1") == cache_key([1.0, 0.0, 3.5], "v1")
+    assert cache_key(row, "v1") != cache_key(row, "v2")
+    assert cache_key(row, "v1") != cache_key([1.0, 0.0, 3.6], "v1")
+    # Разница ниже точности float32 не различается
+    assert cache_key([0.1], "v1") == cache_key([0.1 + 1e-12], "v1")
+    assert cache_key([0.1], "v1", np.float64) != cache_key(
+        [0.1 + 1e-12], "v1", np.float64
+    )
+
+
+def test_lru_capacity_and_ttl():
+    clock = FakeClock()
+    cache = ResponseCache(maxsize=2, ttl=10, clock=clock)
+    cache.set("a", b"1")
+    cache.set("b", b"2")
+    assert cache.get("a") == b"1"
+    cache.set("c", b"3")  # вытесняет давно не читанный "b"
+    assert cache.get("b") is None
+    assert len(cache) == 2
+
+    clock.now = 10.0
+    assert cache.get("a") is None and cache.get("c") is None
+    assert len(cache) == 0
+
+
+def test_model_swap_invalidates_local_entries(tmp_path):
+    (tmp_path / "v001").mkdir()
+    (tmp_path / "v001" / "model.txt").write_text("first")
+    manager = ModelManager(
+        lambda path: open(path).read(),
+        str(tmp_path),
+        model_filename="model.txt",
+    )
+    cache = ResponseCache().bind(manager)
+    manager.check()
+
+    cache.set(cache.key([1.0], manager.version), b"old")
+    (tmp_path / "v002").mkdir()
+    (tmp_path / "v002" / "model.txt").write_text("second")
+    assert manager.check() is True
+    assert len(cache) == 0
+
+
+def test_shared_tier_between_caches():
+    store = InMemoryStore()
+    first = ResponseCache(backend=RemoteBackend(store, ttl=60))
+    second = ResponseCache(backend=RemoteBackend(store, ttl=60))
+
+    first.set("k", b"body")
+    assert second.get("k") == b"body"
+    # Попадание во второй уровень заполняет локальный
+    store.flushdb()
+    assert second.get("k") == b"body"
+
+
+def test_async_lookups_keep_the_event_loop_free():
+    class SlowStore(InMemoryStore):
+        # Сетевой вызов Redis: блокирует вызывающий поток
+        def get(self, name):
+            self.threads.append(threading.get_ident())
+            time.sleep(0.2)
+            return super().get(name)
+
+    store = SlowStore()
+    store.threads = []
+    cache = ResponseCache(backend=RemoteBackend(store, ttl=60))
+
+    async def run():
+        await cache.aset("k", b"body")
+        cache.invalidate()
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        assert await cache.aget("k") == b"body"
+        task.cancel()
+        # Пока ждали общий уровень, цикл событий продолжал работать
+        assert ticks >= 5
+        # Второе чтение - локальное попадание, без обращения к store
+        calls = len(store.threads)
+        assert await cache.aget("k") == b"body" and len(store.threads) == calls
+
+    asyncio.run(run())
+    assert threading.get_ident() not in store.threads
+
+
+def test_backend_errors_are_misses():
+    class Broken:
+        def get(self, name):
+            raise ConnectionError("down")
+
+        def set(self, name, value, ex=None):
+            raise ConnectionError("down")
+
+    backend = RemoteBackend(Broken())
+    cache = ResponseCache(backend=backend)
+    assert cache.get("k") is None
+    cache.set("k", b"body")
+    assert cache.get("k") == b"body"
+    assert backend.errors == 2
+
+
+def test_predict_repeats_are_served_from_cache(onnx_client, monkeypatch):
+    import src.app
+
+    cache = ResponseCache(maxsize=16)
+    monkeypatch.setattr(src.app, "response_cache", cache)
+    scorer = src.app.manager.get()
+    features = (
+        np.random.default_rng(0)
+        .normal(size=scorer.n_features)
+        .round(3)
+        .tolist()
+    )
+
+    first = onnx_client.post("/predict", json={"features": features})
+    second = onnx_client.post("/predict", json={"features": features})
+    assert first.status_code == second.status_code == 200
+    assert first.content == second.content
+    assert first.json()["features_used"] == scorer.n_features
+    assert len(cache) == 1
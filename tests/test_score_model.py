@@ -0,0 +1,100 @@
+"""Тесты офлайн пакетного скоринга"""
+import json
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.pipeline import Pipeline
+
+from src.features.build_features import create_feature_pipeline
+from src.models.score_model import CHECKPOINT_FILE, iter_chunks, score_file
+
+
+@pytest.fixture(scope="module")
+def bulk_setup(tmp_path_factory, credit_frame_factory):
+    root = tmp_path_factory.mktemp("bulk")
+    train = credit_frame_factory(2000, seed=0)
+    X = train.drop(columns="DEFAULT")
+    pipeline = Pipeline(
+        [
+            ("preprocessor", create_feature_pipeline(X)),
+            (
+                "classifier",
+                GradientBoostingClassifier(n_estimators=30, random_state=0),
+            ),
+        ]
+    ).fit(X, train["DEFAULT"])
+    joblib.dump(pipeline, root / "model.pkl")
+
+    applicants = credit_frame_factory(2500, seed=1)
+    applicants.insert(0, "ID", np.arange(len(applicants)))
+    applicants.to_csv(root / "applicants.csv", index=False)
+    applicants.to_parquet(root / "applicants.parquet", index=False)
+    expected = pipeline.predict_proba(applicants[X.columns])[:, 1]
+    return root, expected
+
+
+@pytest.mark.parametrize(
+    "input_name, workers", [("applicants.csv", 1), ("applicants.parquet", 2)]
+)
+def test_bulk_scores_in_input_order(bulk_setup, tmp_path, input_name, workers):
+    root, expected = bulk_setup
+    summary = score_file(
+        str(root / input_name),
+        str(tmp_path / "out"),
+        str(root / "model.pkl"),
+        workers=workers,
+        chunksize=400,
+    )
+
+    scored = pd.read_parquet(tmp_path / "out")
+    assert summary["rows_total"] == 2500 and summary["parts"] == 7
+    assert scored.columns.tolist() == [
+        "ID",
+        "score",
+        "prediction",
+        "risk_level",
+    ]
+    np.testing.assert_array_equal(scored["ID"], np.arange(2500))
+    np.testing.assert_allclose(scored["score"], expected, atol=1e-12)
+
+
+def test_resume_continues_after_last_part(bulk_setup, tmp_path):
+    root, expected = bulk_setup
+    out = tmp_path / "out"
+    args = (str(root / "applicants.csv"), str(out), str(root / "model.pkl"))
+    score_file(*args, workers=1, chunksize=400)
+
+    # Имитация сбоя после третьей части
+    checkpoint = json.loads((out / CHECKPOINT_FILE).read_text())
+    checkpoint.update(chunks_done=3, rows_done=1200)
+    (out / CHECKPOINT_FILE).write_text(json.dumps(checkpoint))
+    for index in range(3, 7):
+        (out / f"part-{index:06d}.parquet").unlink()
+
+    with pytest.raises(FileExistsError):
+        score_file(*args, workers=1, chunksize=400)
+    summary = score_file(*args, workers=1, chunksize=400, resume=True)
+
+    assert summary["rows_scored"] == 1300 and summary["rows_total"] == 2500
+    np.testing.assert_allclose(
+        pd.read_parquet(out)["score"], expected, atol=1e-12
+    )
+
+
+def test_csv_resume_skips_records_not_lines(tmp_path):
+    # Комментарии в кавычках занимают несколько строк файла
+    frame = pd.DataFrame(
+        {"ID": range(10), "NOTE": [f"line one\nline {i}" for i in range(10)]}
+    )
+    path = tmp_path / "notes.csv"
+    frame.to_csv(path, index=False)
+    path.write_text(
+        path.read_text() + "\n"
+    )  # пустая строка в конце не считается записью
+
+    resumed = pd.concat(iter_chunks(str(path), 3, skip_chunks=2))
+    assert resumed["ID"].tolist() == [6, 7, 8, 9]
+    assert resumed["NOTE"].tolist() == frame["NOTE"].tolist()[6:]
@@ -0,0 +1,134 @@
+"""Тесты поиска гиперпараметров методом последовательного деления"""
+import pickle
+
+import numpy as np
+import pytest
+from sklearn.linear_model import LogisticRegression
+from threadpoolctl import threadpool_info
+
+from src.models.compiled import CompiledTrees, compile_pipeline
+from src.models.search import (
+    MODEL_FAMILIES,
+    SearchSpec,
+    default_specs,
+    register_family,
+    run_searches,
+)
+
+
+@pytest.fixture(scope="module")
+def search_results(credit_frame):
+    frame = credit_frame.head(1500)
+    X = frame.drop(columns="DEFAULT")
+    return run_searches(default_specs(), X, frame["DEFAULT"], n_jobs=2), X
+
+
+def test_all_families_are_searched_with_halving(search_results):
+    results, _ = search_results
+    assert list(results) == [
+        "logistic_regression",
+        "gradient_boosting",
+        "hist_gradient_boosting",
+    ]
+
+    for name in ("gradient_boosting", "hist_gradient_boosting"):
+        boosting = results[name]
+        assert boosting.n_candidates == [16, 4, 1]
+        assert (
+            boosting.n_resources[-1] > 1400 and boosting.n_resources[0] < 200
+        )
+    for result in results.values():
+        assert 0.5 < result.best_score <= 1.0
+        assert result.wall_seconds > 0 and result.cpu_seconds > 0
+
+
+def test_best_estimators_are_standalone(search_results):
+    results, X = search_results
+    for result in results.values():
+        # Кэш препроцессинга не должен попадать в сохраненную модель
+        assert result.estimator.memory is None
+        restored = pickle.loads(pickle.dumps(result.estimator))
+        np.testing.assert_array_equal(
+            restored.predict_proba(X), result.estimator.predict_proba(X)
+        )
+
+    compiled = compile_pipeline(results["gradient_boosting"].estimator)
+    assert isinstance(compiled, CompiledTrees)
+    np.testing.assert_allclose(
+        compiled.predict_proba(X.to_numpy()),
+        results["gradient_boosting"].estimator.predict_proba(X)[:, 1],
+        atol=1e-12,
+    )
+
+
+def test_hist_gradient_boosting_uses_categories_and_early_stopping(
+    search_results,
+):
+    results, X = search_results
+    pipeline = results["hist_gradient_boosting"].estimator
+    classifier = pipeline[-1]
+    assert list(classifier.feature_names_in_) == list(X.columns)
+    assert [
+        name
+        for name, categorical in zip(X.columns, classifier.is_categorical_)
+        if categorical
+    ] == ["SEX", "EDUCATION", "MARRIAGE"]
+    # Остановка по валидационной выборке задолго до max_iter
+    assert classifier.n_iter_ < classifier.max_iter
+
+    # Пропуски обрабатываются самой моделью, без импутации
+    with_missing = X.head(20).astype("float64")
+    with_missing.iloc[::2, 0] = np.nan
+    assert np.isfinite(pipeline.predict_proba(with_missing)).all()
+
+
+def test_family_registry():
+    with pytest.raises(ValueError, match="Unknown model families"):
+        default_specs(["random_forest"])
+
+    @register_family("constant")
+    def constant_spec():
+        from sklearn.dummy import DummyClassifier
+
+        return SearchSpec(
+            "constant", DummyClassifier(), {"classifier__strategy": ["prior"]}
+        )
+
+    try:
+        assert [
+            spec.name
+            for spec in default_specs(["constant", "logistic_regression"])
+        ] == ["constant", "logistic_regression"]
+    finally:
+        del MODEL_FAMILIES["constant"]
+
+
+class OpenMPProbe(LogisticRegression):
+    """Запоминает лимит потоков OpenMP, действующий во время обучения"""
+
+    def fit(self, X, y, **params):
+        self.openmp_threads_ = {
+            pool["num_threads"]
+            for pool in threadpool_info()
+            if pool["user_api"] == "openmp"
+        }
+        return super().fit(X, y, **params)
+
+
+def test_openmp_threads_are_capped_per_family(credit_frame):
+    frame = credit_frame.head(600)
+    X = frame.drop(columns="DEFAULT")
+    specs = [
+        SearchSpec(name, OpenMPProbe(max_iter=1000), {"classifier__C": [1]})
+        for name in ("probe_a", "probe_b")
+    ]
+
+    # Бюджет 6 на два семейства: по 3 потока OpenMP на обучение в процессе
+    results = run_searches(specs, X, frame["DEFAULT"], n_jobs=6)
+    for result in results.values():
+        assert result.estimator[-1].openmp_threads_ == {3}
+    assert all(
+        pool["num_threads"] != 3
+        for pool in threadpool_info()
+        if pool["user_api"] == "openmp"
+    )
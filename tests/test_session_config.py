@@ -0,0 +1,100 @@
+"""Тесты настроек ONNX Runtime сессии"""
+import json
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip("onnxruntime")
+from src.serving.session import (  # noqa: E402
+    SessionConfig,
+    SessionPool,
+    create_session,
+    optimized_cache_path,
+    source_digest,
+)
+
+
+def test_env_overrides_config_file(tmp_path):
+    config_file = tmp_path / "ort.json"
+    config_file.write_text(
+        json.dumps({"intra_op_threads": 4, "optimization_level": "basic"})
+    )
+
+    config = SessionConfig.from_env({
+        "ORT_CONFIG_FILE": str(config_file),
+        "ORT_INTRA_OP_THREADS": "1",
+        "ORT_ENABLE_CPU_MEM_ARENA": "false",
+    })
+
+    assert config.intra_op_threads == 1
+    assert config.optimization_level == "basic"
+    assert config.enable_cpu_mem_arena is False
+    with pytest.raises(ValueError):
+        SessionConfig.from_env({"ORT_EXECUTION_MODE": "turbo"})
+
+
+def test_optimized_model_cache_is_reused(tmp_path, model_path):
+    config = SessionConfig(
+        optimized_model_path=str(tmp_path / "optimized.onnx"), pool_size=2
+    )
+    pool = SessionPool(model_path, config)
+    cached = optimized_cache_path(config.optimized_model_path, model_path)
+    assert os.path.exists(cached) and os.path.exists(cached + ".data")
+    assert open(cached + ".sha256").read() == source_digest(model_path)
+
+    batch = np.ones((3, pool.get_inputs()[0].shape[-1]), dtype=np.float32)
+    feed = {pool.get_inputs()[0].name: batch}
+    first, second = pool.run(None, feed)[0], pool.run(None, feed)[0]
+    np.testing.assert_array_equal(first, second)
+
+
+def constant_model(path, value):
+    """Модель [batch, 2] -> x * 0 + value"""
+    onnx = pytest.importorskip("onnx")
+    from onnx import TensorProto, helper
+
+    graph = helper.make_graph(
+        [
+            helper.make_node("Mul", ["x", "zero"], ["m"]),
+            helper.make_node("Add", ["m", "value"], ["y"]),
+        ],
+        "constant",
+        [helper.make_tensor_value_info("x", TensorProto.FLOAT, [None, 2])],
+        [helper.make_tensor_value_info("y", TensorProto.FLOAT, [None, 2])],
+        [
+            helper.make_tensor("zero", TensorProto.FLOAT, [], [0.0]),
+            helper.make_tensor("value", TensorProto.FLOAT, [], [float(value)]),
+        ],
+    )
+    model = helper.make_model(
+        graph, opset_imports=[helper.make_opsetid("", 13)]
+    )
+    model.ir_version = 8
+    onnx.save(model, str(path))
+
+
+def test_optimized_cache_follows_the_source_model(tmp_path):
+    # Откат на старую версию не должен получить кэш новой
+    v1, v2 = tmp_path / "v1.onnx", tmp_path / "v2.onnx"
+    constant_model(v1, 1)
+    constant_model(v2, 100)
+    os.utime(v1, (1, 1))
+    config = SessionConfig(
+        optimized_model_path=str(tmp_path / "cache" / "optimized.onnx")
+    )
+    x = {"x": np.ones((1, 2), dtype=np.float32)}
+
+    assert create_session(str(v2), config).run(None, x)[0].tolist() == [
+        [100, 100]
+    ]
+    assert create_session(str(v1), config).run(None, x)[0].tolist() == [[1, 1]]
+    assert create_session(str(v2), config).run(None, x)[0].tolist() == [
+        [100, 100]
+    ]
+
+    # Файл заменен на месте со старым временем изменения: хэш не совпал,
+    # кэш пересобран
+    constant_model(v1, 7)
+    os.utime(v1, (1, 1))
+    assert create_session(str(v1), config).run(None, x)[0].tolist() == [[7, 7]]
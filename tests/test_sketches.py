@@ -0,0 +1,104 @@
+"""Тесты гистограммных скетчей для онлайн-мониторинга дрейфа"""
+import json
+
+import numpy as np
+import pytest
+from scipy.stats import ks_2samp
+
+from src.monitoring.sketches import (
+    BinSpec,
+    DriftEngine,
+    Histograms,
+    SlidingWindow,
+    TumblingWindow,
+    merge_snapshots,
+)
+
+
+@pytest.fixture
+def spec():
+    rng = np.random.default_rng(0)
+    reference = np.column_stack(
+        [rng.normal(size=20_000), rng.integers(0, 5, 20_000)]
+    )
+    return BinSpec.from_reference(reference, ["x", "k"], bins=20), reference
+
+
+def test_binned_ks_bounds_exact_ks(spec):
+    spec, reference_rows = spec
+    rng = np.random.default_rng(1)
+    current_rows = np.column_stack(
+        [rng.normal(0.3, size=5_000), rng.integers(0, 6, 5_000)]
+    )
+    reference, current = Histograms(spec), Histograms(spec)
+    reference.update(reference_rows)
+    for chunk in np.array_split(current_rows, 7):
+        current.update(chunk)
+
+    for j in range(2):
+        exact = ks_2samp(reference_rows[:, j], current_rows[:, j]).statistic
+        assert exact - 0.03 <= current.ks(reference)[j] <= exact + 1e-12
+    assert current.psi(reference)[0] > 0.05
+    assert current.ks_p_value(reference)[0] < 1e-6
+
+
+def test_missing_values_are_counted_separately(spec):
+    spec, _ = spec
+    histograms = Histograms(spec)
+    histograms.update([[np.nan, 1.0], [0.0, np.nan], [0.5, 2.0]])
+    assert histograms.missing.tolist() == [1, 1]
+    assert histograms.counts.sum(axis=1).tolist() == [2, 2]
+
+
+def test_sliding_window_expires_old_slices(spec):
+    spec, _ = spec
+    window = SlidingWindow(spec, width=60, slices=6)
+    window.update(np.zeros((100, 2)), now=0)
+    window.update(np.zeros((10, 2)), now=55)
+    assert window.histograms(now=59).rows == 110
+    assert window.histograms(now=65).rows == 10
+    assert window.histograms(now=1_000).rows == 0
+    window.update(np.zeros((3, 2)), now=1_001)
+    assert window.histograms(now=1_001).rows == 3
+
+
+def test_tumbling_window_closes_on_boundary(spec):
+    spec, _ = spec
+    window = TumblingWindow(spec, width=10)
+    window.update(np.zeros((4, 2)), now=0)
+    assert window.completed(now=9) is None
+    window.update(np.zeros((2, 2)), now=12)
+    assert window.completed(now=12).rows == 4
+    assert window.completed(now=25).rows == 2
+    assert window.completed(now=100).rows == 0
+
+
+def test_snapshots_merge_across_pods():
+    rng = np.random.default_rng(2)
+    reference = DriftEngine.reference_from(
+        rng.normal(size=(5_000, 3)), rng.random(5_000), ["a", "b", "c"]
+    )
+    pods = [
+        DriftEngine(reference, window_seconds=60, clock=lambda: 0.0)
+        for _ in range(3)
+    ]
+    rows = rng.normal(size=(3_000, 3))
+    scores = rng.random(3_000)
+    for pod, rows_part, scores_part in zip(
+        pods, np.array_split(rows, 3), np.array_split(scores, 3)
+    ):
+        pod.observe(rows_part, scores_part)
+
+    snapshots = [json.loads(json.dumps(pod.snapshot())) for pod in pods]
+    merged_reference, merged = merge_snapshots(snapshots)
+
+    single = DriftEngine(reference, window_seconds=60, clock=lambda: 0.0)
+    single.observe(rows, scores)
+    np.testing.assert_array_equal(
+        merged.counts, single.sliding.histograms().counts
+    )
+    np.testing.assert_allclose(
+        merged.psi(merged_reference),
+        single.sliding.histograms().psi(reference),
+    )
+    assert set(single.report()["sliding"]) == {"a", "b", "c", "score"}
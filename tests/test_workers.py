@@ -0,0 +1,133 @@
+"""Тесты многопроцессного режима обслуживания (src/serving/workers.py)"""
+import os
+import signal
+import subprocess
+import sys
+import textwrap
+import time
+
+import pytest
+
+from src.serving import workers
+from src.serving.workers import bind_socket, load_app
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Минимальное ASGI-приложение: отвечает pid процесса-воркера
+PID_APP = textwrap.dedent("""
+    import os
+
+    async def app(scope, receive, send):
+        if scope["type"] != "http":
+            return
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": []})
+        await send({"type": "http.response.body",
+                    "body": str(os.getpid()).encode()})
+""")
+
+
+def test_load_app_and_bind_socket():
+    assert load_app("src.serving.workers:bind_socket") is bind_socket
+
+    sock = bind_socket("127.0.0.1", 0)
+    try:
+        assert sock.get_inheritable()
+        assert sock.getsockname()[1] > 0
+    finally:
+        sock.close()
+
+
+@pytest.mark.parametrize(
+    "cpu_max, cfs, expected",
+    [
+        # Лимит пода 500m: один воркер, а не несколько на полядра
+        ("50000 100000", None, 1),
+        ("250000 100000", None, 2),
+        (None, ("300000", "100000"), 3),
+        ("max 100000", None, None),
+        (None, ("-1", "100000"), None),
+        (None, None, None),
+    ],
+)
+def test_default_workers_follow_cgroup_cpu_limit(
+    tmp_path, monkeypatch, cpu_max, cfs, expected
+):
+    def cgroup_file(name, content):
+        path = tmp_path / name
+        if content is not None:
+            path.write_text(content + "\n")
+        return str(path)
+
+    quota, period = cfs or (None, None)
+    monkeypatch.setattr(
+        workers, "CGROUP_CPU_MAX", cgroup_file("cpu.max", cpu_max)
+    )
+    monkeypatch.setattr(
+        workers, "CGROUP_CFS_QUOTA", cgroup_file("cfs_quota_us", quota)
+    )
+    monkeypatch.setattr(
+        workers, "CGROUP_CFS_PERIOD", cgroup_file("cfs_period_us", period)
+    )
+    monkeypatch.setattr(workers.os, "cpu_count", lambda: 8)
+
+    assert workers.default_workers() == (expected or 8)
+
+
+def test_supervisor_forks_workers_and_replaces_dead_ones(tmp_path):
+    httpx = pytest.importorskip("httpx")
+    pytest.importorskip("uvicorn")
+    (tmp_path / "pid_app.py").write_text(PID_APP)
+
+    with bind_socket("127.0.0.1", 0) as probe:
+        port = probe.getsockname()[1]
+    env = dict(
+        os.environ, PYTHONPATH=os.pathsep.join([str(tmp_path), ROOT_DIR])
+    )
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "src.serving.workers",
+            "pid_app:app",
+            "--workers",
+            "2",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ],
+        cwd=ROOT_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+    def worker_pids(n_answers=20):
+        pids, answers = set(), 0
+        deadline = time.monotonic() + 30
+        while answers < n_answers and time.monotonic() < deadline:
+            try:
+                # Новое соединение на каждый запрос: их принимают разные
+                # воркеры
+                pids.add(
+                    int(httpx.get(f"http://127.0.0.1:{port}/", timeout=5).text)
+                )
+                answers += 1
+            except httpx.HTTPError:
+                time.sleep(0.1)
+        return pids
+
+    try:
+        pids = worker_pids()
+        assert pids and process.pid not in pids
+        # Упавший воркер заменяется новым
+        victim = pids.pop()
+        os.kill(victim, signal.SIGKILL)
+        time.sleep(0.5)
+        assert victim not in worker_pids()
+    finally:
+        process.terminate()
+        assert process.wait(30) == 0